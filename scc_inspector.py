@@ -1,119 +1,66 @@
 # -*- coding: utf-8 -*-
 # ruff: noqa: F405
+import bisect
+import io
 import sys
 import os
+import threading
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 from Npp import *  # noqa: F403
-from scc_data import VALID_BYTES
-from scc_decoder import (
-    iter_hex_words,
-    parse_scc_code,
-    decode_single_code,
-    TIMESTAMP_PATTERN,
-    is_eoc,
-    is_rcl,
-    is_enm,
-    is_edm,
+from scc_lines import TextLines, parse_line
+from scc_document import FULL, analyze, buffer_snapshot, decode_full_line, find_errors, level_for_size, restore  # noqa: F401 (decode_full_line, find_errors are re-exported)
+from scc_analysis import build_time_map_lines
+from scc_navigation import parse_goto_timecode
+from scc_diff import ADDED, REMOVED, RETIMED, CHANGED, diff_texts, format_entry, summarize
+from scc_schedule import EditScheduler
+from scc_render import (
+    STYLE_ANNOTATION,
+    STYLE_ANNOTATION_ITALIC,
+    STYLE_ANNOTATION_TIMING,
+    STYLE_ANNOTATION_NEWLINE,
+    STYLE_ANNOTATION_DIFF,
+    STYLE_ANNOTATION_ERROR_SUMMARY,
+    STYLE_ANNOTATION_XDS,
+    STYLE_ANNOTATION_QC,
+    annotation_changes,
 )
-from scc_tooltip import format_tooltip
-from scc_timecode import (
-    parse_timestamp_str,
-    add_frames,
-    detect_frame_rate,
-    validate_timestamp,
-    compare_timestamps,
-    packet_difference,
-)
-from scc_buffer_format import render_line_annotation
+from scc_cache import AnalysisCache
+from scc_mpegts import open_stream, write_scc
+from scc_retime import retime_text
+from scc_report import JsonLinesWriter, SarifWriter
+from scc_rules import RULES
+from scc_data import FRAME_RATES
 
 # Configuration
 MAX_SCAN_DEPTH = 1000  # Max lines to scan backwards for buffer state (prevents UI freeze)
-
-
-def decode_full_line(line_text):
-    """Decode a full SCC line and return rendered caption segments (fast single-pass)."""
-    return render_line_annotation(line_text)
-
-
-def check_parity_fast(hex_str):
-    """Fast parity check using precomputed lookup table."""
-    try:
-        val = int(hex_str, 16)
-        return ((val >> 8) in VALID_BYTES) and ((val & 0xFF) in VALID_BYTES)
-    except (ValueError, TypeError):
-        return False
-
-
-def check_overflow_from_map(line_num, timestamp_map, frame_rate):
-    """Check overflow using pre-built timestamp map. Returns (is_overflow, packet_overflow_count)."""
-    if line_num not in timestamp_map or not frame_rate:
-        return False, 0
-
-    next_line = line_num + 2
-    if next_line not in timestamp_map:
-        return False, 0
-
-    try:
-        ts_str, packet_count = timestamp_map[line_num]
-        next_ts_str, _ = timestamp_map[next_line]
-
-        ts = parse_timestamp_str(ts_str)
-        last_pkt_time, _ = add_frames(ts.hours, ts.minutes, ts.seconds, ts.frames, packet_count - 1, frame_rate)
-        if compare_timestamps(last_pkt_time, next_ts_str) >= 0:
-            diff = packet_difference(last_pkt_time, next_ts_str, frame_rate) + 1
-            return True, diff
-        return False, 0
-    except (ValueError, TypeError):
-        return False, 0
-
-
-def find_errors(line_text, line_num=None, timestamp_map=None, frame_rate=None):
-    """Find all errors in a line (invalid timestamps, parity errors, CC buffer overflow)."""
-    errors = []
-
-    ts_match = TIMESTAMP_PATTERN.search(line_text)
-    if ts_match:
-        if not validate_timestamp(ts_match.group(0)):
-            errors.append((ts_match.start(), ts_match.end(), "invalid_timestamp", None))
-
-        if line_num is not None and timestamp_map is not None:
-            try:
-                is_overflow, overflow_count = check_overflow_from_map(line_num, timestamp_map, frame_rate)
-            except Exception:
-                is_overflow, overflow_count = False, 0
-
-            if is_overflow:
-                # Mark timestamp for overflow message
-                errors.append((ts_match.start(), ts_match.end(), "cc_buffer_overflow_tc", overflow_count))
-
-                # Mark the overflowing packets with red squiggles
-                packet_idx = 0
-                total_packets = sum(1 for _ in iter_hex_words(line_text))
-                for word in iter_hex_words(line_text):
-                    is_second = word.is_paired and word.start > word.pair_start
-                    if not is_second and packet_idx >= total_packets - overflow_count:
-                        errors.append((word.pair_start, word.pair_end, "cc_buffer_overflow_packet", overflow_count))
-                    packet_idx += 1
-
-    for word in iter_hex_words(line_text):
-        if not check_parity_fast(word.text):
-            errors.append((word.start, word.end, "parity_error", None))
-
-    return errors
+ANALYSIS_CACHE_ENABLED = True  # Keep analyses of saved files on disk so reopening them skips the analysis
+ANALYSIS_CACHE_MAX_BYTES = 512 * 1024 * 1024
+LIVE_ANALYSIS = True  # Re-analyze a .scc buffer once edits pause (bursts of edits are coalesced into one run)
+LIVE_ANALYSIS_QUIET = 0.5  # Seconds without edits before the re-analysis starts
+LIVE_ANALYSIS_BUDGET = 0.02  # Seconds of editor updates per tick; the rest waits for the next tick
+LIVE_ANALYSIS_TICK = 0.05  # Seconds between ticks while edits are pending
+RENDER_BATCH = 200  # Editor calls between budget checks while a render plan is applied
+ANALYSIS_LEVEL = None  # "quick", "standard" or "full"; None picks by file size (full up to 1 MB, standard up to 4 MB)
+DISABLED_RULES = ()  # Validation rules to skip, e.g. ("timecode_gap", "never_displayed"); see show_rule_stats()
 
 
 INDICATOR_ERROR = 0
 INDICATOR_PAIR = 1
 INDICATOR_PARITY = 2
-STYLE_ANNOTATION = 20
-STYLE_ANNOTATION_ITALIC = 21
-STYLE_ANNOTATION_TIMING = 22
-STYLE_ANNOTATION_NEWLINE = 23
-STYLE_ANNOTATION_ERROR_SUMMARY = 25
+INDICATOR_QC = 3
 
-buffer_state = {}  # {buffer_id: {'hash': int, 'frame_rate': str, 'timestamp_map': dict, 'line_texts': dict, 'time_map': dict}}
+# {buffer_id: {'hash': int, 'result': AnalysisResult, 'shown': RenderPlan fully displayed, or None}}
+buffer_state = {}
+for _rule_name in DISABLED_RULES:
+    if _rule_name in RULES:
+        RULES.enable(_rule_name, False)
+    else:
+        console.writeError("ERROR: Unknown rule in DISABLED_RULES: {0}\n".format(_rule_name))
+# Cached analyses depend on the enabled rules, so each rule configuration has its own entries
+analysis_cache = AnalysisCache(max_bytes=ANALYSIS_CACHE_MAX_BYTES, variant=RULES.signature()) if ANALYSIS_CACHE_ENABLED else None
+last_search_query = ""
 
 
 def setup_indicators():
@@ -126,6 +73,9 @@ def setup_indicators():
     editor.indicSetStyle(INDICATOR_PARITY, INDICATORSTYLE.STRAIGHTBOX)
     editor.indicSetFore(INDICATOR_PARITY, (255, 0, 0))
     editor.indicSetUnder(INDICATOR_PARITY, False)
+    editor.indicSetStyle(INDICATOR_QC, INDICATORSTYLE.DOTBOX)
+    editor.indicSetFore(INDICATOR_QC, (255, 160, 0))
+    editor.indicSetUnder(INDICATOR_QC, True)
 
     editor.styleSetFore(STYLE_ANNOTATION, (220, 220, 220))
     editor.styleSetBack(STYLE_ANNOTATION, (30, 30, 30))
@@ -140,495 +90,111 @@ def setup_indicators():
     editor.styleSetFore(STYLE_ANNOTATION_NEWLINE, (100, 100, 100))
     editor.styleSetBack(STYLE_ANNOTATION_NEWLINE, (30, 30, 30))
 
+    editor.styleSetFore(STYLE_ANNOTATION_DIFF, (240, 200, 90))
+    editor.styleSetBack(STYLE_ANNOTATION_DIFF, (50, 40, 10))
+
     editor.styleSetFore(STYLE_ANNOTATION_ERROR_SUMMARY, (255, 100, 100))
     editor.styleSetBack(STYLE_ANNOTATION_ERROR_SUMMARY, (60, 20, 20))
     editor.styleSetBold(STYLE_ANNOTATION_ERROR_SUMMARY, True)
 
+    editor.styleSetFore(STYLE_ANNOTATION_XDS, (140, 190, 240))
+    editor.styleSetBack(STYLE_ANNOTATION_XDS, (20, 30, 45))
+
+    editor.styleSetFore(STYLE_ANNOTATION_QC, (255, 170, 60))
+    editor.styleSetBack(STYLE_ANNOTATION_QC, (50, 35, 15))
+
     editor.annotationSetVisible(ANNOTATIONVISIBLE.STANDARD)
 
 
-def build_time_map(frame_rate):
+def document_text():
+    """The current document, read once from Scintilla's own buffer.
+
+    getCharacterPointer() hands over the document's characters without the extra
+    null-terminated copy getText() makes; callers split it with TextLines rather than
+    splitlines(), so analyzing a document holds one copy of it.
+    """
+    return editor.getCharacterPointer()
+
+
+def build_time_map(frame_rate, qc=None, line_cache=None):
     """Single-pass state machine to map line numbers to start/end times.
 
+    If qc (a QcMetrics) is given, caption QC metrics are collected in the same pass.
+    If line_cache (a LineCache) is given, it is filled with every line's ParsedLine.
+
     Returns: (time_map, timestamp_map, line_texts)
         time_map: dict { line_num: [start_time, end_time] }
         timestamp_map: dict { line_num: (timestamp_str, packet_count) }
         line_texts: dict { line_num: str } for all non-empty lines
     """
-    all_lines = editor.getText().splitlines(True)
-    line_map = {}
-    timestamp_map = {}
-    line_texts = {}
-    pending_lines = []
-    active_lines = []
-
-    for line_num, line_text in enumerate(all_lines):
-        if not line_text or line_text.isspace():
-            continue
-        line_texts[line_num] = line_text
-
-        ts_match = TIMESTAMP_PATTERN.search(line_text)
-        if not ts_match:
-            continue
-
-        base_ts = ts_match.group(0)
-        try:
-            ts = parse_timestamp_str(base_ts)
-        except (ValueError, TypeError):
-            continue
-
-        word_idx = 0
-        packet_count = 0
-        has_added_pending = False
-
-        for word in iter_hex_words(line_text):
-            packet_count += 1
-            if word.is_paired and word.start > word.pair_start:
-                continue
-
-            evt = parse_scc_code(word.text, word.is_paired)
-            if evt["type"] in ("TEXT", "PAC") and not has_added_pending:
-                pending_lines.append(line_num)
-                has_added_pending = True
-
-            if is_eoc(word.text):
-                try:
-                    start_time_str, _ = add_frames(
-                        ts.hours,
-                        ts.minutes,
-                        ts.seconds,
-                        ts.frames,
-                        word_idx,
-                        frame_rate,
-                    )
-                except (ValueError, TypeError):
-                    start_time_str = None
-
-                for a_line in active_lines:
-                    if a_line in line_map:
-                        line_map[a_line][1] = start_time_str
-
-                for p_line in pending_lines:
-                    if p_line not in line_map:
-                        line_map[p_line] = [None, None]
-                    line_map[p_line][0] = start_time_str
-
-                active_lines = list(pending_lines)
-                pending_lines = []
-                has_added_pending = False
-
-            elif is_edm(word.text):
-                try:
-                    end_time_str, _ = add_frames(
-                        ts.hours,
-                        ts.minutes,
-                        ts.seconds,
-                        ts.frames,
-                        word_idx,
-                        frame_rate,
-                    )
-                except (ValueError, TypeError):
-                    end_time_str = None
-
-                for a_line in active_lines:
-                    if a_line in line_map:
-                        line_map[a_line][1] = end_time_str
-
-                active_lines = []
-
-            elif is_enm(word.text):
-                pending_lines = []
-                has_added_pending = False
-
-            word_idx += 1
-
-        # Collect timestamp info for overflow detection (piggyback on this loop)
-        timestamp_map[line_num] = (base_ts, packet_count)
-
-    return line_map, timestamp_map, line_texts
-
-
-def apply_annotation(line_num, segments, start_time=None, end_time=None, never_displayed=False):
-    """Apply styled annotation to line showing decoded caption text."""
-    if not segments:
-        return
-
-    final_segments = []
-    if never_displayed:
-        final_segments.append((" | ", "timing"))
-        final_segments.append((u"⚠ never displayed", "error_summary"))  # fmt: skip
-        final_segments.append((" | ", "timing"))
-    elif start_time and end_time:
-        final_segments.append((" | {0} -> {1} | ".format(start_time, end_time), "timing"))
-
-    for text, style_info in segments:
-        if style_info == "newline":
-            final_segments.append((text, "newline"))
-        elif "\n" in text:
-            parts = text.split("\n")
-            for j, part in enumerate(parts):
-                if j > 0:
-                    final_segments.append(("\u23ce", "newline"))
-                if part:
-                    final_segments.append((part, style_info))
-        else:
-            final_segments.append((text, style_info))
-
-    full_text_bytes = b""
-    style_bytes = bytearray()
-
-    for text, style_info in final_segments:
-        chunk_bytes = text.encode("utf-8")
-        full_text_bytes += chunk_bytes
-
-        if style_info == "timing":
-            style_id = STYLE_ANNOTATION_TIMING
-        elif style_info == "error_summary":
-            style_id = STYLE_ANNOTATION_ERROR_SUMMARY
-        elif style_info == "newline":
-            style_id = STYLE_ANNOTATION_NEWLINE
-        elif style_info:
-            style_id = STYLE_ANNOTATION_ITALIC
-        else:
-            style_id = STYLE_ANNOTATION
-
-        for _ in range(len(chunk_bytes)):
-            style_bytes.append(style_id)
+    return build_time_map_lines(TextLines(document_text()), frame_rate, qc, line_cache)
 
-    editor.annotationSetText(line_num, full_text_bytes)
-    editor.annotationSetStyles(line_num, bytes(style_bytes))
 
+def render_steps(plan, previous=None):
+    """Apply a render plan's annotations and indicators, yielding after every RENDER_BATCH editor calls.
 
-def apply_all_indicators(frame_rate, time_map, timestamp_map, line_texts):
-    """Apply indicators and annotations to all lines in the file (batched for performance)."""
+    With previous (the plan currently displayed, on the same line layout) only annotations
+    that changed are set.
+    """
     setup_indicators()
 
-    # Phase 1: Collect all ranges (pure Python, fast)
-    error_ranges = []
-    parity_ranges = []
-    pair_ranges = []
-    parity_count = 0
-    overflow_count = 0
-    never_displayed_count = 0
-    error_timecodes = []
-
-    total_lines = editor.getLineCount()
-
-    for line_num in range(total_lines):
-        text = line_texts.get(line_num)
-        if text is None:
-            continue
-
-        line_start_pos = editor.positionFromLine(line_num)
-
-        # Single iter_hex_words pass: errors + pairs + annotation
-        ts_match = TIMESTAMP_PATTERN.search(text)
-        is_overflow, overflow_cnt = check_overflow_from_map(line_num, timestamp_map, frame_rate) if ts_match else (False, 0)
-
-        if ts_match and not validate_timestamp(ts_match.group(0)):
-            error_ranges.append((line_start_pos + ts_match.start(), ts_match.end() - ts_match.start()))
-            error_timecodes.append(ts_match.group(0))
-
-        if is_overflow:
-            error_ranges.append((line_start_pos + ts_match.start(), ts_match.end() - ts_match.start()))
-            overflow_count += 1
-            error_timecodes.append(ts_match.group(0))
-
-        total_packets = sum(1 for _ in iter_hex_words(text))
-        seen_pairs = set()
-        packet_idx = 0
-
-        for word in iter_hex_words(text):
-            is_second = word.is_paired and word.start > word.pair_start
-            if not is_second:
-                if not check_parity_fast(word.text):
-                    parity_ranges.append((line_start_pos + word.start, word.end - word.start))
-                    parity_count += 1
-                if is_overflow and packet_idx >= total_packets - overflow_cnt:
-                    error_ranges.append((line_start_pos + word.pair_start, word.pair_end - word.pair_start))
-            packet_idx += 1
-            if word.is_paired and word.pair_start not in seen_pairs:
-                pair_ranges.append((line_start_pos + word.pair_start, word.pair_end - word.pair_start))
-                seen_pairs.add(word.pair_start)
-
-        segments = decode_full_line(text)
-        if segments:
-            times = time_map.get(line_num)
-            is_never_displayed = times is None or times[1] is None
-            if is_never_displayed:
-                never_displayed_count += 1
-                if ts_match:
-                    error_timecodes.append(ts_match.group(0))
-            apply_annotation(line_num, segments, times[0] if times else None, times[1] if times else None, is_never_displayed)
-
-    # Phase 2: Apply all indicators in batches (minimize API calls)
+    calls = 0
+    for line_num, text_bytes, style_bytes in annotation_changes(plan, previous):
+        editor.annotationSetText(line_num, text_bytes)
+        if text_bytes is not None:
+            editor.annotationSetStyles(line_num, style_bytes)
+        calls += 1
+        if calls % RENDER_BATCH == 0:
+            yield
+
     doc_length = editor.getLength()
-    for indicator in (INDICATOR_ERROR, INDICATOR_PAIR, INDICATOR_PARITY):
+    for indicator in (INDICATOR_ERROR, INDICATOR_PAIR, INDICATOR_PARITY, INDICATOR_QC):
         editor.setIndicatorCurrent(indicator)
         editor.indicatorClearRange(0, doc_length)
 
-    editor.setIndicatorCurrent(INDICATOR_ERROR)
-    for pos, length in error_ranges:
-        editor.indicatorFillRange(pos, length)
-
-    editor.setIndicatorCurrent(INDICATOR_PARITY)
-    for pos, length in parity_ranges:
-        editor.indicatorFillRange(pos, length)
-
-    editor.setIndicatorCurrent(INDICATOR_PAIR)
-    for pos, length in pair_ranges:
-        editor.indicatorFillRange(pos, length)
-
-    # Error summary annotation
-    if parity_count or overflow_count or never_displayed_count:
-        summary_parts = []
-        if parity_count:
-            summary_parts.append("{0} parity error{1}".format(parity_count, "s" if parity_count > 1 else ""))
-        if overflow_count:
-            summary_parts.append("{0} buffer overflow{1}".format(overflow_count, "s" if overflow_count > 1 else ""))
-        if never_displayed_count:
-            summary_parts.append("{0} never displayed caption{1}".format(never_displayed_count, "s" if never_displayed_count > 1 else ""))
-        summary = "ERRORS: " + ", ".join(summary_parts)
-        if error_timecodes:
-            summary += "\nErrors at: " + ", ".join(error_timecodes)
-        summary_bytes = summary.encode("utf-8")
-        style_bytes = bytearray([STYLE_ANNOTATION_ERROR_SUMMARY] * len(summary_bytes))
-        editor.annotationSetText(0, summary_bytes)
-        editor.annotationSetStyles(0, bytes(style_bytes))
-
-
-def build_buffer_snapshot(line_text, target_word_idx, line_num=None):
-    """Build caption buffer state at target word position.
+    indicator_ranges = ((INDICATOR_ERROR, plan.error_ranges), (INDICATOR_PARITY, plan.parity_ranges), (INDICATOR_PAIR, plan.pair_ranges), (INDICATOR_QC, plan.qc_ranges))
+    for indicator, ranges in indicator_ranges:
+        editor.setIndicatorCurrent(indicator)
+        for i in range(0, len(ranges), 2):
+            editor.indicatorFillRange(ranges[i], ranges[i + 1])
+            calls += 1
+            if calls % RENDER_BATCH == 0:
+                yield
+                editor.setIndicatorCurrent(indicator)
+
 
+def replay_render_plan(plan):
+    """Apply a render plan's annotations and indicators (batched to minimize API calls).
+
+    The error summary (counts plus the first few locations per type) is shown on line 0.
+    """
+    for _ in render_steps(plan):
+        pass
+
+
+def build_buffer_snapshot(line, target_word_idx, line_num=None, line_cache=None):
+    """Build caption buffer state at target word position (see scc_document.buffer_snapshot).
+
+    Earlier lines are read from line_cache when it has them, otherwise from the editor.
     Returns: (buffer_text, highlight_start, highlight_end)
     """
-    buf_text = ""
-    row, col, color = None, None, None
-    initial_state = None
-    highlight_start = -1
-    highlight_end = -1
-
-    # Look backwards to build persistent buffer state
-    if line_num is not None:
-        lines_to_process = []
-        search_limit = max(-1, line_num - MAX_SCAN_DEPTH)
-        for search_line in range(line_num - 1, search_limit, -1):
+
+    def earlier_line(search_line):
+        parsed = line_cache.lines.get(search_line) if line_cache is not None else None
+        if parsed is None:
             try:
-                search_text = editor.getLine(search_line)
+                parsed = parse_line(editor.getLine(search_line))
             except Exception:
-                break
-            found_enm = False
-
-            for word in iter_hex_words(search_text):
-                if word.is_paired and word.start > word.pair_start:
-                    continue
-                if is_enm(word.text):
-                    found_enm = True
-                    break
-
-            lines_to_process.append(search_text)
-            if found_enm:
-                break
-
-        lines_to_process.reverse()
-        for line_text_prev in lines_to_process:
-            for word in iter_hex_words(line_text_prev):
-                if word.is_paired and word.start > word.pair_start:
-                    continue
-
-                evt = parse_scc_code(word.text, word.is_paired)
-                if evt["type"] == "PAC":
-                    if initial_state is None:
-                        initial_state = (evt["row"], evt["col"], evt["color"][:3])
-                    else:
-                        buf_text += "{R%02d C%02d %s}" % (
-                            evt["row"],
-                            evt["col"],
-                            evt["color"][:3],
-                        )
-                    row, col, color = evt["row"], evt["col"], evt["color"][:3]
-                elif evt["type"] == "TEXT":
-                    buf_text += evt["text"]
-                elif evt["type"] == "MIDROW":
-                    buf_text += "<i>"
-                elif evt["type"] == "CONTROL":
-                    if evt.get("is_backspace") and buf_text:
-                        buf_text = buf_text[:-1]
-                    elif is_enm(word.text) or is_rcl(word.text):
-                        buf_text = ""
-                        row, col, color = None, None, None
-                        initial_state = None
-
-    # Process current line
-    logical_idx = 0
-    for word in iter_hex_words(line_text):
-        if word.is_paired and word.start > word.pair_start:
-            continue
-        idx = logical_idx
-        logical_idx += 1
-        if idx > target_word_idx:
-            break
-        evt = parse_scc_code(word.text, word.is_paired)
-
-        if evt["type"] == "PAC":
-            if idx == target_word_idx:
-                state_str = "{R%02d C%02d %s}" % (
-                    evt["row"],
-                    evt["col"],
-                    evt["color"][:3],
-                )
-                if initial_state is None:
-                    return state_str, 0, len(state_str)
-                else:
-                    row_i, col_i, color_i = initial_state
-                    prefix = "{R%02d C%02d %s}" % (row_i, col_i, color_i)
-                    return (
-                        prefix + buf_text + state_str,
-                        len(prefix) + len(buf_text),
-                        len(prefix) + len(buf_text) + len(state_str),
-                    )
-            if initial_state is None:
-                initial_state = (evt["row"], evt["col"], evt["color"][:3])
-            else:
-                buf_text += "{R%02d C%02d %s}" % (
-                    evt["row"],
-                    evt["col"],
-                    evt["color"][:3],
-                )
-            row, col, color = evt["row"], evt["col"], evt["color"][:3]
-        elif evt["type"] == "TEXT":
-            if idx == target_word_idx:
-                highlight_start = len(buf_text)
-            buf_text += evt["text"]
-            if idx == target_word_idx:
-                highlight_end = len(buf_text)
-        elif evt["type"] == "MIDROW":
-            color = evt["color"][:3]
-            if idx == target_word_idx:
-                highlight_start = len(buf_text)
-                buf_text += "<i>"
-                highlight_end = len(buf_text)
-            else:
-                buf_text += "<i>"
-        elif evt["type"] == "INDENT":
-            spaces = " " * evt["spaces"]
-            if idx == target_word_idx:
-                highlight_start = len(buf_text)
-            buf_text += spaces
-            if idx == target_word_idx:
-                highlight_end = len(buf_text)
-        elif evt["type"] == "CONTROL":
-            if evt.get("is_backspace") and buf_text:
-                buf_text = buf_text[:-1]
-            elif is_enm(word.text) or is_rcl(word.text):
-                buf_text = ""
-                row, col, color = None, None, None
-                initial_state = None
-
-    # Return buffer state even without PAC for annotation purposes
-    if buf_text and initial_state is None:
-        # Text without positioning - return as-is for annotation
-        if highlight_start >= 0:
-            return buf_text, highlight_start, highlight_end
-        return buf_text, -1, -1
-
-    if initial_state is None:
-        return "", -1, -1
-
-    row, col, color = initial_state
-    result = "{R%02d C%02d %s}%s" % (row, col, color, buf_text)
-    if highlight_start >= 0:
-        prefix_len = len("{R%02d C%02d %s}" % (row, col, color))
-        return result, prefix_len + highlight_start, prefix_len + highlight_end
-    return result, -1, -1
-
-
-def check_for_errors(line_text, col, line_start_pos, line_num, timestamp_map, frame_rate):
-    """Check if cursor is over an error and show error tooltip if so."""
-    errors = find_errors(line_text, line_num, timestamp_map, frame_rate)
-    for start, end, error_type, extra_data in errors:
-        if start <= col < end:
-            if error_type == "parity_error":
-                editor.callTipShow(line_start_pos + start, "Invalid SCC code (parity check failed)")
-                return True
-            elif error_type == "cc_buffer_overflow_tc":
-                msg = "CC BUFFER OVERFLOW: {0} packets past next timestamp".format(extra_data)
-                editor.callTipShow(line_start_pos + start, msg)
-                return True
-            elif error_type == "cc_buffer_overflow_packet":
-                # Don't show tooltip for overflow packets - let normal tooltip show
-                return False
-            elif error_type == "invalid_timestamp":
-                editor.callTipShow(line_start_pos + start, "Invalid timestamp")
-                return True
-    return False
-
-
-def find_word_at_position(line_text, col):
-    """Find the hex word at the given column position.
-    Returns (word, logical_idx, packet_idx) where logical_idx skips paired duplicates
-    and packet_idx counts every hex word.
-    """
-    logical_idx = 0
-    packet_idx = 0
-    for word in iter_hex_words(line_text):
-        is_second = word.is_paired and word.start > word.pair_start
-        if word.pair_start <= col < word.pair_end:
-            return word, logical_idx, packet_idx
-        packet_idx += 1
-        if not is_second:
-            logical_idx += 1
-    return None, -1, -1
-
-
-def format_event_description(evt, word_text):
-    """Format the event description line for tooltip."""
-    lbl = evt.get("label", "").strip()
-    suffix = " (%s)" % lbl if lbl else ""
-    evt_type = evt.get("type", "")
-    if evt_type == "TEXT":
-        return 'TEXT: "%s" (%s)' % (evt.get("text", ""), word_text)
-    elif evt_type == "PAC":
-        ul = " Und" if evt.get("underline", False) else ""
-        return "PAC : Row %d, Col %d, %s%s (%s)%s" % (
-            evt.get("row", 0),
-            evt.get("col", 0),
-            evt.get("color", ""),
-            ul,
-            word_text,
-            suffix,
-        )
-    elif evt_type == "MIDROW":
-        ul = " Und" if evt.get("underline", False) else ""
-        return "CMD : Mid-Row: %s%s%s" % (evt.get("color", "")[:3], ul, suffix)
-    elif evt_type == "CONTROL":
-        return "CMD : %s (%s)%s" % (
-            evt.get("name", "Unknown").split("(")[0].strip(),
-            word_text,
-            suffix,
-        )
-    elif evt_type == "INDENT":
-        n = evt.get("spaces", 0)
-        return "CMD : Indent %d %s (%s)%s" % (
-            n,
-            "space" if n == 1 else "spaces",
-            word_text,
-            suffix,
-        )
-    else:
-        return decode_single_code(word_text, False)
+                return None
+        return parsed
 
+    return buffer_snapshot(line, target_word_idx, line_num, earlier_line, MAX_SCAN_DEPTH)
 
-def format_timestamp_description(hh, mm, ss, ff, word_idx, base_time, frame_rate):
-    """Format the timestamp description line for tooltip."""
-    if frame_rate:
-        try:
-            pkt_time, _ = add_frames(hh, mm, ss, ff, word_idx, frame_rate)
-        except (ValueError, TypeError):
-            return "TIME: %s (+%d)" % (base_time, word_idx)
-        pkt_word = "packet" if word_idx == 1 else "packets"
-        return "TIME: %s (+%d %s)" % (pkt_time, word_idx, pkt_word)
-    return "TIME: %s (+%d)" % (base_time, word_idx)
+
+def _current_result():
+    """AnalysisResult of the current buffer, or None if it has not been analyzed."""
+    state = buffer_state.get(notepad.getCurrentBufferID())
+    return state["result"] if state else None
 
 
 def on_dwell_start(args):
@@ -640,69 +206,327 @@ def on_dwell_start(args):
     if pos == -1:
         return
 
-    buffer_id = notepad.getCurrentBufferID()
-    state = buffer_state.get(buffer_id)
-    if not state:
+    result = _current_result()
+    if result is None:
         return
 
-    frame_rate = state.get("frame_rate")
-    timestamp_map = state.get("timestamp_map")
-    line_texts = state.get("line_texts")
-
-    # Step 2: Get line and position info
     line_num = editor.lineFromPosition(pos)
     line_start_pos = editor.positionFromLine(line_num)
-    col = pos - line_start_pos
+    tip = result.tooltip(line_num, pos - line_start_pos, MAX_SCAN_DEPTH)
+    if tip is not None:
+        anchor_col, text = tip
+        editor.callTipShow(line_start_pos + anchor_col, text.encode("utf-8"))
 
-    line_text = line_texts.get(line_num) or editor.getLine(line_num)
 
-    # Step 4: Check for errors first
-    if check_for_errors(line_text, col, line_start_pos, line_num, timestamp_map, frame_rate):
+def goto_timecode(timecode=None):
+    """Move the caret to the packet that plays at a timecode (prompts if none given)."""
+    result = _current_result()
+    if result is None or not result.frame_rate or not result.timestamp_map:  # no timing at the quick analysis level
+        console.write("Go to timecode: no timing information for this file.\n")
+        return
+
+    if timecode is None:
+        timecode = notepad.prompt("Timecode (HH:MM:SS:FF or HH:MM:SS;FF):", "SCC Inspector - Go to timecode", "")
+        if not timecode:
+            return
+
+    frame = parse_goto_timecode(timecode, result.frame_rate)
+    if frame is None:
+        notepad.messageBox("Not a valid timecode: {0}".format(timecode), "SCC Inspector")
         return
 
-    # Step 5: Parse timestamp
-    ts_match = TIMESTAMP_PATTERN.search(line_text)
-    if not ts_match:
+    located = result.locate_timecode(frame)
+    if located is None:
+        notepad.messageBox("{0} is before the first caption line.".format(timecode), "SCC Inspector")
         return
-    anchor_pos = line_start_pos + ts_match.start()
-    base_time = ts_match.group(0)
+
+    line_num, col, exact = located
+    editor.gotoPos(editor.positionFromLine(line_num) + col)
+    if not exact:
+        console.write("Go to timecode: {0} falls after the last packet of line {1}.\n".format(timecode, line_num + 1))
+
+
+def search_captions(query=None):
+    """Search decoded caption text and jump to the next matching line (prompts if no query given).
+
+    Terms are ANDed; use "quotes" for a phrase and a trailing * for a prefix.
+    """
+    global last_search_query
+    result = _current_result()
+    if result is None:
+        return
+
+    if query is None:
+        query = notepad.prompt('Caption text (use "a phrase" or prefix*):', "SCC Inspector - Search captions", last_search_query)
+        if not query:
+            return
+    last_search_query = query
+
+    matches = result.search(query)
+    if not matches:
+        console.write("Search captions: no matches for {0}\n".format(query))
+        return
+
+    current_line = editor.lineFromPosition(editor.getCurrentPos())
+    idx = bisect.bisect_right(matches, current_line)
+    target = matches[idx % len(matches)]
+    editor.gotoLine(target)
+    console.write("Search captions: match {0} of {1} (line {2})\n".format(idx % len(matches) + 1, len(matches), target + 1))
+
+
+def _goto_error(forward, error_type=None):
+    """Move the caret to the next or previous error position."""
+    result = _current_result()
+    error_index = result.error_index if result is not None else None
+    if not error_index:
+        console.write("No errors in this file.\n")
+        return
+    pos = editor.getCurrentPos()
+    target = error_index.next_error(pos, error_type) if forward else error_index.previous_error(pos, error_type)
+    if target is None:
+        console.write("No {0} errors in this file.\n".format(error_type))
+        return
+    editor.gotoPos(target)
+
+
+def next_error(error_type=None):
+    """Jump to the next error after the caret (optionally only one type, e.g. "parity_error")."""
+    _goto_error(True, error_type)
+
+
+def previous_error(error_type=None):
+    """Jump to the previous error before the caret (optionally only one type)."""
+    _goto_error(False, error_type)
+
+
+def _set_styled_annotation(line_num, text, style_id):
+    """Set a single-style annotation on a line."""
+    text_bytes = text.encode("utf-8")
+    editor.annotationSetText(line_num, text_bytes)
+    editor.annotationSetStyles(line_num, bytes(bytearray([style_id] * len(text_bytes))))
+
+
+def show_caption_diff(other_path=None):
+    """Annotate caption-level differences between another version of the file and the current buffer.
+
+    Prompts for the other (older) file if no path is given. Run clear_caption_diff() to restore
+    the normal annotations.
+    """
+    if other_path is None:
+        other_path = notepad.prompt("Path of the other (older) SCC file:", "SCC Inspector - Caption diff", "")
+        if not other_path:
+            return
     try:
-        ts = parse_timestamp_str(base_time)
-    except (ValueError, TypeError):
+        with io.open(other_path.strip().strip('"'), "r", encoding="utf-8", errors="replace") as f:
+            old_text = f.read()
+    except (IOError, OSError) as e:
+        notepad.messageBox("Could not read {0}: {1}".format(other_path, e), "SCC Inspector")
         return
 
-    # Step 6: Find word under cursor
-    word, logical_idx, packet_idx = find_word_at_position(line_text, col)
-    if word is None:
+    frame_rate, entries = diff_texts(old_text, document_text())
+    new_starts = sorted((e.new.start_frame, e.new.lines[0]) for e in entries if e.new is not None)
+    notes = {}
+    offset = 0
+    for entry in entries:
+        if entry.new is not None:
+            line_num = entry.new.lines[0]
+            offset = entry.start_delta or 0
+        else:
+            # Removed: attach to the first annotated caption after where it used to play
+            pos = bisect.bisect_left(new_starts, (entry.old.start_frame + offset, -1))
+            line_num = new_starts[pos][1] if pos < len(new_starts) else 0
+        notes.setdefault(line_num, []).append(format_entry(entry, frame_rate))
+
+    for line_num, lines in notes.items():
+        _set_styled_annotation(line_num, "\n".join(lines), STYLE_ANNOTATION_DIFF)
+
+    counts = summarize(entries)
+    summary = "DIFF vs {0}: {1} added, {2} removed, {3} retimed, {4} changed".format(os.path.basename(other_path), counts[ADDED], counts[REMOVED], counts[RETIMED], counts[CHANGED])
+    if 0 in notes:
+        summary += "\n" + "\n".join(notes[0])
+    _set_styled_annotation(0, summary, STYLE_ANNOTATION_DIFF)
+    console.write(summary.split("\n")[0] + "\n")
+
+
+def clear_caption_diff():
+    """Remove diff annotations and restore the normal caption annotations."""
+    editor.annotationClearAll()
+    on_buffer_activated(None)
+
+
+def retime_captions(offset=None, to_rate=None):
+    """Shift every timestamp in the file and/or convert it to another frame rate (prompts if not given).
+
+    The whole rewrite is one undo step; lines that now overflow the CC buffer are listed in the console.
+    """
+    result = _current_result()
+    if result is None or not result.frame_rate:
+        console.write("Retime: no timing information for this file.\n")
+        return
+    frame_rate = result.frame_rate
+    if offset is None:
+        offset = notepad.prompt("Offset (frames or a signed timecode, e.g. -01:00:00:00):", "SCC Inspector - Retime", "0")
+        if offset is None:
+            return
+    if to_rate is None:
+        to_rate = notepad.prompt("Frame rate ({0}):".format(", ".join(sorted(FRAME_RATES))), "SCC Inspector - Retime", frame_rate)
+        if not to_rate:
+            return
+    to_rate = to_rate.strip()
+    if to_rate not in FRAME_RATES:
+        notepad.messageBox("Unknown frame rate: {0}".format(to_rate), "SCC Inspector")
         return
+    try:
+        new_text, retimed = retime_text(document_text(), frame_rate, offset, to_rate)
+    except ValueError as e:
+        notepad.messageBox("Could not retime: {0}".format(e), "SCC Inspector")
+        return
+    editor.beginUndoAction()
+    editor.setText(new_text)
+    editor.endUndoAction()
+    console.write("Retimed {0} lines to {1}\n".format(retimed.lines, retimed.frame_rate))
+    if retimed.overflows:
+        console.write("CC buffer overflow after retiming on lines {0}\n".format(", ".join(str(line + 1) for line, _ in retimed.overflows)))
+    on_buffer_activated(None)
 
-    # Step 7: Decode event
-    evt = parse_scc_code(word.text, word.is_paired)
-
-    # Step 8: Check if this packet is in overflow
-    overflow_info = None
-    is_overflow, overflow_count = check_overflow_from_map(line_num, timestamp_map, frame_rate)
-    if is_overflow:
-        total_packets = sum(1 for _ in iter_hex_words(line_text))
-        if packet_idx >= total_packets - overflow_count:
-            overflow_info = (True, overflow_count)
-
-    # Step 9: Format tooltip components
-    event_desc = format_event_description(evt, word.text)
-    timestamp_desc = format_timestamp_description(ts.hours, ts.minutes, ts.seconds, ts.frames, packet_idx, base_time, frame_rate)
-    buffer_text, hl_start, hl_end = build_buffer_snapshot(line_text, logical_idx, line_num)
-
-    # Step 10: Generate and show tooltip
-    tooltip = format_tooltip(
-        event_desc,
-        timestamp_desc,
-        buffer_text,
-        hl_start,
-        hl_end,
-        evt["type"] in ("CONTROL", "NULL"),
-        overflow_info,
-    )
-    editor.callTipShow(anchor_pos, tooltip.encode("utf-8"))
+
+def export_report(report_path=None):
+    """Write the current file's findings to a SARIF (.sarif) or JSON Lines (any other extension) report.
+
+    Prompts for the path if none is given; reuses the timing analysis of the open buffer.
+    """
+    result = _current_result()
+    if result is None:
+        console.write("Export report: this file has not been analyzed.\n")
+        return
+    filename = notepad.getCurrentFilename()
+    if report_path is None:
+        report_path = notepad.prompt("Write report to (.sarif or .jsonl):", "SCC Inspector - Export report", os.path.splitext(filename)[0] + ".sarif")
+        if not report_path:
+            return
+    report_path = report_path.strip().strip('"')
+    writer_class = SarifWriter if report_path.lower().endswith(".sarif") else JsonLinesWriter
+    try:
+        with open(report_path, "wb") as out:
+            with writer_class(out) as writer:
+                for finding in result.findings():
+                    writer.write(finding, filename)
+    except (IOError, OSError) as e:
+        notepad.messageBox("Could not write {0}: {1}".format(report_path, e), "SCC Inspector")
+        return
+    console.write("Wrote {0} findings to {1}\n".format(writer.count, report_path))
+
+
+def show_rule_stats(reset=False):
+    """Write each validation rule's calls, hits and time since startup (or the last reset) to the console."""
+    console.write(RULES.format_stats() + "\n")
+    if reset:
+        RULES.reset_stats()
+
+
+def open_transport_stream(ts_path=None, scc_path=None):
+    """Extract the 608 captions muxed into an MPEG transport stream to an SCC file and open it.
+
+    Prompts for the stream and for the output path (defaulting to the stream's name with .scc).
+    """
+    if ts_path is None:
+        ts_path = notepad.prompt("Path of the transport stream (.ts/.m2ts):", "SCC Inspector - Extract captions", "")
+        if not ts_path:
+            return
+    ts_path = ts_path.strip().strip('"')
+    if scc_path is None:
+        scc_path = notepad.prompt("Write SCC to:", "SCC Inspector - Extract captions", os.path.splitext(ts_path)[0] + ".scc")
+        if not scc_path:
+            return
+    scc_path = scc_path.strip().strip('"')
+    try:
+        f, buf = open_stream(ts_path)
+        try:
+            with io.open(scc_path, "w", encoding="utf-8", newline="\n") as out:
+                count = write_scc(buf, out)
+        finally:
+            if not isinstance(buf, bytes):
+                buf.close()
+            f.close()
+    except (IOError, OSError, ValueError) as e:
+        notepad.messageBox("Could not extract captions from {0}: {1}".format(ts_path, e), "SCC Inspector")
+        return
+    console.write("Extracted {0} caption lines from {1}\n".format(count, os.path.basename(ts_path)))
+    notepad.open(scc_path)
+
+
+def reanalysis_run(dirty):
+    """Edit scheduler run: analyze the current buffer once and apply what changed, a batch per step.
+
+    The analysis is the first step and covers the whole document, since display times and
+    timing checks depend on the lines around an edit; only lines whose text changed are
+    parsed again, but the step is not split by the tick budget. The dirty lines only tell
+    whether lines were inserted or removed (dirty.moved): then, or if a previous run was
+    cancelled while drawing, every annotation is redrawn; otherwise only those that changed.
+    """
+    buffer_id = notepad.getCurrentBufferID()
+    state = buffer_state.get(buffer_id)
+    if state is None:
+        return
+    file_text = document_text()
+    current_hash = hash(file_text)
+    shown = state.get("shown")
+    if current_hash == state["hash"]:
+        if shown is not None:
+            return  # e.g. an edit that was undone
+        result = state["result"]  # analyzed, but a cancelled run left it partly drawn
+    else:
+        previous = state["result"]
+        result = analyze(file_text, line_cache=previous.line_cache, text_index=previous.text_index, level=previous.level)
+        buffer_state[buffer_id] = {"hash": current_hash, "result": result, "shown": None}
+        yield
+
+    if dirty.moved or shown is None:
+        editor.annotationClearAll()
+        shown = None
+    for _ in render_steps(result.plan, shown):
+        yield
+    buffer_state[buffer_id]["shown"] = result.plan
+
+
+edit_scheduler = EditScheduler(reanalysis_run, LIVE_ANALYSIS_QUIET, LIVE_ANALYSIS_BUDGET)
+# Edits arrive on the callback thread and ticks on a timer thread
+schedule_lock = threading.RLock()
+tick_timer = None
+
+
+def _arm_tick():
+    """Start the tick timer if it is not running (call with schedule_lock held)."""
+    global tick_timer
+    if tick_timer is None:
+        tick_timer = threading.Timer(LIVE_ANALYSIS_TICK, on_tick)
+        tick_timer.daemon = True
+        tick_timer.start()
+
+
+def on_tick():
+    """Timer tick: advance the edit scheduler and re-arm while it has work."""
+    global tick_timer
+    with schedule_lock:
+        tick_timer = None
+        try:
+            edit_scheduler.tick()
+        except Exception as e:
+            console.writeError("ERROR: Re-analysis failed: {0}\n".format(e))
+            edit_scheduler.reset()
+        if edit_scheduler.busy:
+            _arm_tick()
+
+
+def on_modified(args):
+    """Record an edit of an analyzed buffer; it is re-analyzed once edits pause."""
+    if not args["modificationType"] & (MODIFICATIONFLAGS.INSERTTEXT | MODIFICATIONFLAGS.DELETETEXT):
+        return
+    if notepad.getCurrentBufferID() not in buffer_state:
+        return
+    with schedule_lock:
+        edit_scheduler.edited(editor.lineFromPosition(args["position"]), args["linesAdded"])
+        _arm_tick()
 
 
 def on_buffer_activated(args):
@@ -713,49 +537,49 @@ def on_buffer_activated(args):
         editor.setMouseDwellTime(300)
 
         try:
-            file_text = editor.getText()
+            file_text = document_text()
         except Exception as e:
             console.writeError("ERROR: Failed to read file: {0}\n".format(e))
             return
 
         buffer_id = notepad.getCurrentBufferID()
         current_hash = hash(file_text)
+        with schedule_lock:
+            edit_scheduler.reset()  # analyzed in full below
 
         # Check if we have cached state for this buffer with matching hash
         cached = buffer_state.get(buffer_id)
         if cached and cached.get("hash") == current_hash:
-            # Content unchanged - just reapply indicators from cache
-            setup_indicators()
-            apply_all_indicators(
-                cached["frame_rate"],
-                cached["time_map"],
-                cached["timestamp_map"],
-                cached["line_texts"],
-            )
+            # Content unchanged - just replay the render plan
+            replay_render_plan(cached["result"].plan)
             return
 
-        # Content changed or new buffer - compute everything
-        frame_rate, _ = detect_frame_rate(file_text)
+        level = ANALYSIS_LEVEL or level_for_size(editor.getLength())
+        on_disk = analysis_cache is not None and os.path.isfile(filename)
+        payload = analysis_cache.load(filename, file_text) if on_disk and not cached else None
+        result = restore(file_text, payload) if payload is not None else None
 
-        if frame_rate == "INVALID":
-            console.write("ERROR: Invalid frame rate detected. Timecode math disabled.\n")
-            frame_rate = None
+        if result is not None and result.level == level:
+            # Unchanged since it was last analyzed - skip detection, the state machine and rendering
+            console.write("Detected Frame Rate: {0} (cached analysis)\n".format(result.frame_rate))
         else:
-            console.write("Detected Frame Rate: {0}\n".format(frame_rate))
-
-        time_map, timestamp_map, line_texts = build_time_map(frame_rate)
+            # Content changed or new buffer - reuse the parse and search index of every unchanged line
+            previous = cached["result"] if cached else None
+            result = analyze(file_text, line_cache=previous and previous.line_cache, text_index=previous and previous.text_index, level=level)
+            if result.frame_rate is None:
+                console.write("ERROR: Invalid frame rate detected. Timecode math disabled.\n")
+            else:
+                console.write("Detected Frame Rate: {0}\n".format(result.frame_rate))
+            if level != FULL:
+                console.write("Analysis level: {0} (set ANALYSIS_LEVEL for more)\n".format(level))
+            if on_disk:
+                analysis_cache.store(filename, file_text, result.pack())
 
-        # Cache the computed state
-        buffer_state[buffer_id] = {
-            "hash": current_hash,
-            "frame_rate": frame_rate,
-            "time_map": time_map,
-            "timestamp_map": timestamp_map,
-            "line_texts": line_texts,
-        }
+        replay_render_plan(result.plan)
+        if result.plan.qc_summary:
+            console.write(result.plan.qc_summary + "\n")
 
-        setup_indicators()
-        apply_all_indicators(frame_rate, time_map, timestamp_map, line_texts)
+        buffer_state[buffer_id] = {"hash": current_hash, "result": result, "shown": result.plan}
     else:
         editor.setMouseDwellTime(10000000)
 
@@ -769,11 +593,14 @@ def on_file_closed(args):
 
 
 editor.clearCallbacks([SCINTILLANOTIFICATION.DWELLSTART])
+editor.clearCallbacks([SCINTILLANOTIFICATION.MODIFIED])
 notepad.clearCallbacks([NOTIFICATION.BUFFERACTIVATED])
 notepad.clearCallbacks([NOTIFICATION.FILECLOSED])
 
 notepad.callback(on_buffer_activated, [NOTIFICATION.BUFFERACTIVATED])
 notepad.callback(on_file_closed, [NOTIFICATION.FILECLOSED])
 editor.callback(on_dwell_start, [SCINTILLANOTIFICATION.DWELLSTART])
+if LIVE_ANALYSIS:
+    editor.callback(on_modified, [SCINTILLANOTIFICATION.MODIFIED])
 
 on_buffer_activated(None)
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Analysis Module
+
+Editor-independent caption timing analysis.
+Runs the EOC/EDM/ENM state machine over a list of lines, either serially or
+split into chunks that are analyzed on a process pool and stitched back together.
+"""
+
+import array
+import multiprocessing
+
+from scc_data import get_frame_rate_config
+from scc_decoder import iter_hex_words, TIMESTAMP_PATTERN, is_eoc, is_enm, is_edm
+from scc_lines import ParsedLine
+from scc_timecode import add_frames, frame_packet_offset, packet_frame_offset, timestamp_to_frames
+
+# Files shorter than this are always analyzed serially (pool startup costs more than the scan)
+PARALLEL_MIN_LINES = 20000
+# How far past a target split point to look for a line that follows an EOC/EDM
+BOUNDARY_SEARCH_LINES = 2000
+
+# Placeholders for the pending/active lines a chunk inherits from the chunks before it.
+# Negative so they can never collide with a real line number.
+_PENDING = -1
+_ACTIVE = -2
+_UNSET = "<unset>"
+
+# A gap longer than this between one line's last packet and the next line's start is flagged
+MAX_GAP_SECONDS = 300
+
+# Timing problems of a timestamped line relative to the lines before it (at most one per line)
+TIMECODE_ORDER = "timecode_order"  # starts before the previous line; detail: frames earlier
+DUPLICATE_TIMESTAMP = "duplicate_timestamp"  # same start frame as the previous line; detail: its line number
+PACKET_OVERLAP = "packet_overlap"  # starts while packets of a line before the previous one still play; detail: that line
+TIMECODE_GAP = "timecode_gap"  # starts more than MAX_GAP_SECONDS after the previous line ends; detail: gap in frames
+TIMING_ISSUES = (TIMECODE_ORDER, DUPLICATE_TIMESTAMP, PACKET_OVERLAP, TIMECODE_GAP)
+
+
+def describe_timing_issue(issue, frame_rate):
+    """One-line description of a TimestampIndex.timing_issue() result."""
+    issue_type, detail = issue
+    if issue_type == TIMECODE_ORDER:
+        return "Starts {0} frames before the previous line".format(detail)
+    if issue_type == DUPLICATE_TIMESTAMP:
+        return "Same start time as line {0}".format(detail + 1)
+    if issue_type == PACKET_OVERLAP:
+        return "Starts while packets of line {0} are still playing".format(detail + 1)
+    return "{0:.1f}s gap after the previous line".format(float(detail) / get_frame_rate_config(frame_rate)["videoFps"])
+
+
+def _scan_lines(lines, frame_rate, line_offset=0, pending_lines=None, active_lines=None, line_map=None, qc=None, line_cache=None):
+    """Run the timing state machine over lines starting at line_offset.
+
+    If qc (a scc_qc.QcMetrics) is given, loading codes and EOC/EDM transitions are fed to it.
+    If line_cache (a scc_lines.LineCache) is given, each non-empty line's ParsedLine is
+    taken from it (and stored in it for later consumers).
+
+    Returns: (line_map, timestamp_map, line_texts, pending_lines, active_lines)
+    """
+    if line_map is None:
+        line_map = {}
+    timestamp_map = {}
+    line_texts = {}
+    pending_lines = list(pending_lines or [])
+    active_lines = list(active_lines or [])
+
+    for line_num, line_text in enumerate(lines, line_offset):
+        if not line_text or line_text.isspace():
+            continue
+        parsed = line_cache.get(line_num, line_text) if line_cache is not None else ParsedLine(line_text, frame_rate)
+        # A reused line's text, so unchanged lines are held once across re-analyses
+        line_texts[line_num] = parsed.text
+        if parsed.timestamp is None:
+            continue
+        ts = parsed.ts
+
+        word_idx = 0
+        has_added_pending = False
+        for code in parsed.codes:
+            word = code.word
+            evt = code.event
+            if evt["type"] in ("TEXT", "PAC") and not has_added_pending:
+                pending_lines.append(line_num)
+                has_added_pending = True
+            if qc is not None:
+                qc.load(evt)
+
+            if is_eoc(word.text):
+                try:
+                    start_time_str, _ = add_frames(
+                        ts.hours,
+                        ts.minutes,
+                        ts.seconds,
+                        ts.frames,
+                        word_idx,
+                        frame_rate,
+                    )
+                except (ValueError, TypeError):
+                    start_time_str = None
+
+                for a_line in active_lines:
+                    if a_line in line_map:
+                        line_map[a_line][1] = start_time_str
+
+                if qc is not None:
+                    qc.display(pending_lines, parsed.frame + packet_frame_offset(word_idx, frame_rate))
+
+                for p_line in pending_lines:
+                    if p_line not in line_map:
+                        line_map[p_line] = [None, None]
+                    line_map[p_line][0] = start_time_str
+
+                active_lines = list(pending_lines)
+                pending_lines = []
+                has_added_pending = False
+
+            elif is_edm(word.text):
+                try:
+                    end_time_str, _ = add_frames(
+                        ts.hours,
+                        ts.minutes,
+                        ts.seconds,
+                        ts.frames,
+                        word_idx,
+                        frame_rate,
+                    )
+                except (ValueError, TypeError):
+                    end_time_str = None
+
+                for a_line in active_lines:
+                    if a_line in line_map:
+                        line_map[a_line][1] = end_time_str
+
+                if qc is not None:
+                    qc.clear(parsed.frame + packet_frame_offset(word_idx, frame_rate))
+
+                active_lines = []
+
+            elif is_enm(word.text):
+                pending_lines = []
+                has_added_pending = False
+                if qc is not None:
+                    qc.erase_loading()
+
+            word_idx += 1
+
+        # Collect timestamp info for overflow detection (piggyback on this loop)
+        timestamp_map[line_num] = (parsed.timestamp, parsed.packet_count)
+
+    return line_map, timestamp_map, line_texts, pending_lines, active_lines
+
+
+def build_time_map_lines(lines, frame_rate, qc=None, line_cache=None):
+    """Single-pass state machine to map line numbers to start/end times.
+
+    Pass a scc_qc.QcMetrics as qc to collect caption QC metrics in the same pass, and a
+    scc_lines.LineCache as line_cache to keep every line's ParsedLine for later consumers
+    (lines unchanged since the cache's previous pass are not parsed again).
+
+    Returns: (time_map, timestamp_map, line_texts)
+        time_map: dict { line_num: [start_time, end_time] }
+        timestamp_map: dict { line_num: (timestamp_str, packet_count) }
+        line_texts: dict { line_num: str } for all non-empty lines
+    """
+    if line_cache is not None:
+        line_cache.start(frame_rate)
+    line_map, timestamp_map, line_texts, _, _ = _scan_lines(lines, frame_rate, qc=qc, line_cache=line_cache)
+    if line_cache is not None:
+        line_cache.finish()
+    return line_map, timestamp_map, line_texts
+
+
+def line_text_map(lines):
+    """Map line numbers to text for every non-empty line (the line_texts part of build_time_map_lines)."""
+    return dict((line_num, line_text) for line_num, line_text in enumerate(lines) if line_text and not line_text.isspace())
+
+
+def _line_clears_display(line_text):
+    """Check if a line contains an EOC or EDM (nothing loaded before it can leak past it)."""
+    for word in iter_hex_words(line_text):
+        if is_eoc(word.text) or is_edm(word.text):
+            return True
+    return False
+
+
+def find_chunk_boundaries(lines, chunk_count):
+    """Pick line indices at which to split lines into roughly chunk_count chunks.
+
+    Each boundary is a timestamped line following a line with an EOC/EDM, so the
+    state carried across it is usually empty. Falls back to the first timestamped
+    line after the split point when no such line is found nearby.
+    Returns a sorted list of boundary indices (excluding 0 and len(lines)).
+    """
+    total = len(lines)
+    boundaries = []
+    for k in range(1, chunk_count):
+        target = max(total * k // chunk_count, boundaries[-1] + 1 if boundaries else 1)
+        limit = min(total, target + BOUNDARY_SEARCH_LINES)
+        fallback = None
+        prev_clears = False
+        chosen = None
+        for idx in range(target, limit):
+            text = lines[idx]
+            if not TIMESTAMP_PATTERN.search(text):
+                continue
+            if fallback is None:
+                fallback = idx
+            if prev_clears:
+                chosen = idx
+                break
+            prev_clears = _line_clears_display(text)
+        if chosen is None:
+            chosen = fallback
+        if chosen is not None and 0 < chosen < total and (not boundaries or chosen > boundaries[-1]):
+            boundaries.append(chosen)
+    return boundaries
+
+
+def _analyze_chunk(task):
+    """Process pool worker: analyze one chunk with placeholder inherited state."""
+    lines, frame_rate, line_offset = task
+    line_map = {_PENDING: [_UNSET, _UNSET], _ACTIVE: [_UNSET, _UNSET]}
+    line_map, timestamp_map, line_texts, pending_lines, active_lines = _scan_lines(lines, frame_rate, line_offset, [_PENDING], [_ACTIVE], line_map)
+    pending_effect = line_map.pop(_PENDING)
+    active_effect = line_map.pop(_ACTIVE)
+    return line_map, timestamp_map, line_texts, pending_lines, active_lines, pending_effect, active_effect
+
+
+def _expand(state_lines, inherited_pending, inherited_active):
+    """Replace placeholders in a chunk's final pending/active list with real line numbers."""
+    result = []
+    for line_num in state_lines:
+        if line_num == _PENDING:
+            result.extend(inherited_pending)
+        elif line_num == _ACTIVE:
+            result.extend(inherited_active)
+        else:
+            result.append(line_num)
+    return result
+
+
+def stitch_chunks(chunk_results):
+    """Merge per-chunk results (in file order) into the serial time map.
+
+    Inherited active lines only change at a chunk's first EOC/EDM, which always
+    precedes any change to inherited pending lines, so effects are applied active-first.
+    Returns: (time_map, timestamp_map, line_texts)
+    """
+    time_map = {}
+    timestamp_map = {}
+    line_texts = {}
+    pending_lines = []
+    active_lines = []
+
+    for line_map, chunk_timestamps, chunk_texts, chunk_pending, chunk_active, pending_effect, active_effect in chunk_results:
+        time_map.update(line_map)
+        timestamp_map.update(chunk_timestamps)
+        line_texts.update(chunk_texts)
+
+        if active_effect[1] != _UNSET:
+            for a_line in active_lines:
+                if a_line in time_map:
+                    time_map[a_line][1] = active_effect[1]
+
+        if pending_effect[0] != _UNSET:
+            for p_line in pending_lines:
+                if p_line not in time_map:
+                    time_map[p_line] = [None, None]
+                time_map[p_line][0] = pending_effect[0]
+                if pending_effect[1] != _UNSET:
+                    time_map[p_line][1] = pending_effect[1]
+
+        pending_lines, active_lines = (
+            _expand(chunk_pending, pending_lines, active_lines),
+            _expand(chunk_active, pending_lines, active_lines),
+        )
+
+    return time_map, timestamp_map, line_texts
+
+
+def build_time_map_parallel(lines, frame_rate, workers=None, min_lines=None):
+    """Build the same result as build_time_map_lines using a process pool.
+
+    Lines are split at caption boundaries, each chunk is analyzed with placeholder
+    state for the captions it inherits, and the partial states are stitched in order.
+    Overflow detection works on the merged timestamp_map, so it sees across chunks.
+    Falls back to the serial scan for a single worker or fewer than min_lines lines
+    (PARALLEL_MIN_LINES if None).
+
+    Returns: (time_map, timestamp_map, line_texts)
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if min_lines is None:
+        min_lines = PARALLEL_MIN_LINES
+    if workers <= 1 or len(lines) < min_lines:
+        return build_time_map_lines(lines, frame_rate)
+
+    boundaries = [0] + find_chunk_boundaries(lines, workers) + [len(lines)]
+    tasks = [(lines[start:end], frame_rate, start) for start, end in zip(boundaries, boundaries[1:])]
+    if len(tasks) == 1:
+        return build_time_map_lines(lines, frame_rate)
+
+    pool = multiprocessing.Pool(min(workers, len(tasks)))
+    try:
+        chunk_results = pool.map(_analyze_chunk, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+    return stitch_chunks(chunk_results)
+
+
+class TimestampIndex(object):
+    """Timestamped lines in file order, linked to their neighbours, with integer timing.
+
+    Position i holds lines[i], its start frame, packet count and the frame of its last packet;
+    the previous/next timestamped lines are at i - 1 and i + 1 regardless of blank or comment
+    lines in between. Overflow and gap checks are constant-time integer comparisons.
+    Each line is also checked against the lines before it as it is added (out-of-order,
+    duplicate and overlapping starts, long gaps); see timing_issue().
+    """
+
+    def __init__(self, timestamp_map, frame_rate, max_gap_seconds=MAX_GAP_SECONDS):
+        self.frame_rate = frame_rate
+        self.lines = array.array("l")
+        self.frames = array.array("l")
+        self.packet_counts = array.array("l")
+        self.end_frames = array.array("l")
+        self.positions = {}
+        self.issues = {}  # line_num -> (issue type, detail)
+        # The line before the last one whose packets play until the latest frame: (start, end, line)
+        self._reach = (0, -1, None)
+        if not frame_rate:
+            self.max_gap = None
+            return
+        self.max_gap = max_gap_seconds * get_frame_rate_config(frame_rate)["videoFps"]
+        for line_num in sorted(timestamp_map):
+            ts_str, packet_count = timestamp_map[line_num]
+            try:
+                frame = timestamp_to_frames(ts_str, frame_rate)
+            except (ValueError, TypeError, IndexError):
+                continue
+            self.append(line_num, frame, packet_count)
+
+    @classmethod
+    def from_frames(cls, entries, frame_rate):
+        """Build an index from (line_num, start_frame, packet_count) entries already in file order."""
+        index = cls({}, frame_rate)
+        for line_num, frame, packet_count in entries:
+            index.append(line_num, frame, packet_count)
+        return index
+
+    def append(self, line_num, frame, packet_count):
+        """Add a timestamped line after the current last one."""
+        last = len(self.lines) - 1
+        if last >= 0:
+            self._check(line_num, frame, last)
+        self.positions[line_num] = len(self.lines)
+        self.lines.append(line_num)
+        self.frames.append(frame)
+        self.packet_counts.append(packet_count)
+        self.end_frames.append(frame + packet_frame_offset(max(0, packet_count - 1), self.frame_rate))
+
+    def _check(self, line_num, frame, last):
+        """Record the timing issue of a line about to follow position last, if any."""
+        previous = self.frames[last]
+        if frame < previous:
+            self.issues[line_num] = (TIMECODE_ORDER, previous - frame)
+        elif frame == previous:
+            self.issues[line_num] = (DUPLICATE_TIMESTAMP, self.lines[last])
+        elif self._reach[0] <= frame <= self._reach[1]:
+            # The previous line running into this one is a CC buffer overflow; this is an earlier line
+            self.issues[line_num] = (PACKET_OVERLAP, self._reach[2])
+        elif frame - self.end_frames[last] - 1 > self.max_gap:
+            self.issues[line_num] = (TIMECODE_GAP, frame - self.end_frames[last] - 1)
+        if self.end_frames[last] > self._reach[1]:
+            self._reach = (previous, self.end_frames[last], self.lines[last])
+
+    def timing_issue(self, line_num):
+        """(issue type, detail) for a line that is out of order, repeats the previous start,
+        starts while an earlier line (other than the previous one) is still playing or follows
+        a long gap; None otherwise.
+        """
+        return self.issues.get(line_num)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def next_line(self, line_num):
+        """Return the next timestamped line after line_num, or None."""
+        pos = self.positions.get(line_num)
+        if pos is None or pos + 1 >= len(self.lines):
+            return None
+        return self.lines[pos + 1]
+
+    def prev_line(self, line_num):
+        """Return the previous timestamped line before line_num, or None."""
+        pos = self.positions.get(line_num)
+        if pos is None or pos == 0:
+            return None
+        return self.lines[pos - 1]
+
+    def overflow(self, line_num):
+        """Check if a line's packets run into the next timestamped line.
+
+        Returns (is_overflow, packet_overflow_count) where the count is the number of
+        trailing packets that play at or after the next line's start frame.
+        """
+        pos = self.positions.get(line_num)
+        if pos is None or pos + 1 >= len(self.lines):
+            return False, 0
+        next_frame = self.frames[pos + 1]
+        if self.end_frames[pos] < next_frame or next_frame < self.frames[pos]:
+            # A next line that starts earlier is reported as out of order instead
+            return False, 0
+        first_late = frame_packet_offset(max(0, next_frame - self.frames[pos]), self.frame_rate)
+        return True, max(0, self.packet_counts[pos] - first_late)
+
+    def gap(self, line_num):
+        """Frames between a line's last packet and the next line's start (negative if they overlap).
+
+        Returns None for the last timestamped line.
+        """
+        pos = self.positions.get(line_num)
+        if pos is None or pos + 1 >= len(self.lines):
+            return None
+        return self.frames[pos + 1] - self.end_frames[pos] - 1
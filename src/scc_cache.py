@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Cache Module
+
+Persistent on-disk cache of analysis results, so reopening an unchanged file only
+needs a cache read and a render plan replay.
+Entries are keyed by file path and validated by a digest of the content; a header with
+the file's size and mtime and the content's length rejects a changed file before the
+content is hashed, and lets callers that have not read the file skip hashing it.
+Payloads are marshal-serialized and zlib-compressed; the cache directory is capped in
+size and evicts least recently used entries.
+"""
+
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import zlib
+
+from scc_render import RenderPlan
+
+CACHE_MAGIC = b"SCCI"
+# Bump when the payload layout or anything it is derived from changes
+CACHE_VERSION = 6
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# magic, version, content length, file size, file mtime, content digest (sha1)
+HEADER = struct.Struct("<4sHQQd20s")
+MARSHAL_VERSION = 2  # readable by Python 2.7 and 3.x
+# Characters of a text document encoded per step when digesting it
+DIGEST_CHUNK = 1 << 20
+
+
+def default_cache_dir():
+    """Per-user cache directory (LOCALAPPDATA on Windows, XDG_CACHE_HOME or ~/.cache elsewhere)."""
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "scc_inspector", "analysis")
+
+
+def content_digest(data):
+    """Digest of a document's bytes."""
+    return hashlib.sha1(data).digest()
+
+
+def document_length(data):
+    """UTF-8 length of a document's bytes or text, encoded DIGEST_CHUNK characters at a time."""
+    if isinstance(data, bytes):
+        return len(data)
+    return sum(len(data[start : start + DIGEST_CHUNK].encode("utf-8")) for start in range(0, len(data), DIGEST_CHUNK))
+
+
+def _length_matches(data, length):
+    if not isinstance(data, bytes) and not len(data) <= length <= 4 * len(data):
+        return False  # each character is 1 to 4 bytes
+    return document_length(data) == length
+
+
+def document_digest(data):
+    """(UTF-8 length, digest) of a document's bytes or text.
+
+    Text is encoded DIGEST_CHUNK characters at a time, so a large document is never
+    held twice (as text and as bytes) just to check or key its cache entry.
+    """
+    if isinstance(data, bytes):
+        return len(data), content_digest(data)
+    digest = hashlib.sha1()
+    length = 0
+    for start in range(0, len(data), DIGEST_CHUNK):
+        chunk = data[start : start + DIGEST_CHUNK].encode("utf-8")
+        digest.update(chunk)
+        length += len(chunk)
+    return length, digest.digest()
+
+
+def pack_analysis(frame_rate, time_map, timestamp_map, plan, level="full"):
+    """Bundle an analysis (run at the scc_document analysis level) into marshal-friendly plain data."""
+    return (frame_rate, time_map, timestamp_map, plan.to_data(), level)
+
+
+def unpack_analysis(payload):
+    """Inverse of pack_analysis. Returns: (frame_rate, time_map, timestamp_map, plan, level)"""
+    frame_rate, time_map, timestamp_map, plan_data, level = payload
+    return frame_rate, time_map, timestamp_map, RenderPlan.from_data(plan_data), level
+
+
+def replace_file(src, dst):
+    """Move src over dst (atomically where the platform allows it)."""
+    if hasattr(os, "replace"):
+        os.replace(src, dst)
+        return
+    if os.path.exists(dst):  # Python 2 on Windows cannot rename over a file
+        os.remove(dst)
+    os.rename(src, dst)
+
+
+class AnalysisCache(object):
+    """Size-capped directory of cached analyses, one file per source path.
+
+    variant names settings the analyses depend on (e.g. RuleSet.signature()); entries
+    stored under one variant are not found under another.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, variant=""):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.variant = variant
+
+    def entry_path(self, path):
+        key = os.path.normcase(os.path.abspath(path))
+        if not isinstance(key, bytes):
+            key = key.encode("utf-8")  # Python 2 file names are already bytes in the file system encoding
+        if self.variant:
+            key += b"\0" + self.variant.encode("utf-8")
+        # marshal strings differ between Python 2 and 3, so each keeps its own entries
+        name = "{0}-py{1}.bin".format(hashlib.sha1(key).hexdigest(), sys.version_info[0])
+        return os.path.join(self.cache_dir, name)
+
+    def _read_header(self, f):
+        raw = f.read(HEADER.size)
+        if len(raw) != HEADER.size:
+            return None
+        header = HEADER.unpack(raw)
+        if header[0] != CACHE_MAGIC or header[1] != CACHE_VERSION:
+            return None
+        return header
+
+    def load(self, path, data=None):
+        """Return the cached payload for path, or None on a miss.
+
+        The source file's size and mtime must match the ones recorded when it was stored
+        (when it existed then). With data (the document's current bytes or text) the entry
+        must also match its length and then its digest.
+        """
+        entry = self.entry_path(path)
+        try:
+            with open(entry, "rb") as f:
+                header = self._read_header(f)
+                if header is None:
+                    return None
+                _, _, length, size, mtime, digest = header
+                if data is None or size or mtime:
+                    st = os.stat(path)
+                    if st.st_size != size or st.st_mtime != mtime:
+                        return None
+                if data is not None:
+                    if not _length_matches(data, length) or document_digest(data)[1] != digest:
+                        return None
+                payload = marshal.loads(zlib.decompress(f.read()))
+        except (IOError, OSError, ValueError, EOFError, TypeError, struct.error, zlib.error):
+            return None
+        try:
+            os.utime(entry, None)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return payload
+
+    def store(self, path, data, payload):
+        """Write payload for path (data is the document's bytes or text). Returns False if it could not be written."""
+        try:
+            st = os.stat(path)
+            size, mtime = st.st_size, st.st_mtime
+        except OSError:
+            size, mtime = 0, 0.0
+        entry = self.entry_path(path)
+        tmp = entry + ".tmp"
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            body = zlib.compress(marshal.dumps(payload, MARSHAL_VERSION), 1)
+            if HEADER.size + len(body) > self.max_bytes:
+                return False
+            with open(tmp, "wb") as f:
+                length, digest = document_digest(data)
+                f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, length, size, mtime, digest))
+                f.write(body)
+            replace_file(tmp, entry)
+        except (IOError, OSError, ValueError):
+            return False
+        self.evict(keep=entry)
+        return True
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the directory fits in max_bytes."""
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".bin"):
+                continue
+            full = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, full, st.st_size))
+            total += st.st_size
+        entries.sort()
+        for _, full, size in entries:
+            if total <= self.max_bytes:
+                break
+            if full == keep:
+                continue
+            try:
+                os.remove(full)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """Delete every cache entry."""
+        max_bytes, self.max_bytes = self.max_bytes, -1
+        try:
+            self.evict()
+        finally:
+            self.max_bytes = max_bytes
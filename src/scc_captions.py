@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Captions Module
+
+Caption object model built from the analysis time map, plus an interval index
+for time-based queries ("what is on screen at frame N", "what plays between T1 and T2").
+"""
+
+import bisect
+import sys
+
+from scc_decoder import iter_hex_words, parse_scc_code
+from scc_memory import CaptionMemory, memory_segments
+from scc_timecode import timestamp_to_frames
+
+# End frame used in the index for captions that are never cleared
+OPEN_END = sys.maxsize
+
+
+class Caption(object):
+    """A displayed caption: the lines that loaded it, its channel, timing, and decoded text.
+
+    start_frame/end_frame are absolute frame numbers; end_frame is None if the caption
+    is never cleared. rows is a tuple of decoded row strings and styles holds one tuple
+    of (start, end, style) spans per row.
+    """
+
+    __slots__ = ("lines", "channel", "start_frame", "end_frame", "rows", "styles")
+
+    def __init__(self, lines, channel, start_frame, end_frame, rows, styles):
+        self.lines = lines
+        self.channel = channel
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.rows = rows
+        self.styles = styles
+
+    @property
+    def text(self):
+        return "\n".join(self.rows)
+
+    def __repr__(self):
+        return "Caption(lines=%r, channel=%d, start_frame=%r, end_frame=%r, rows=%r)" % (self.lines, self.channel, self.start_frame, self.end_frame, self.rows)
+
+
+def _line_channel(line_text):
+    """Return the caption channel (1-4) of the first text or PAC code on a line."""
+    for word in iter_hex_words(line_text):
+        if word.is_paired and word.start > word.pair_start:
+            continue
+        evt = parse_scc_code(word.text, word.is_paired)
+        if evt["type"] in ("TEXT", "PAC"):
+            label = evt.get("label", "")
+            return int(label[2:]) if label else 1
+    return 1
+
+
+def decode_rows(line_texts_in_order):
+    """Decode caption load lines into (rows, styles) by running them through one caption memory."""
+    memory = CaptionMemory()
+    for line_text in line_texts_in_order:
+        memory.feed_line(line_text)
+    rows = []
+    styles = []
+    row_text = ""
+    row_styles = []
+    for text, style_info in memory_segments(memory):
+        if style_info == "newline":
+            rows.append(row_text)
+            styles.append(tuple(row_styles))
+            row_text = ""
+            row_styles = []
+            continue
+        if style_info:
+            row_styles.append((len(row_text), len(row_text) + len(text), "italic"))
+        row_text += text
+    if row_text or row_styles:
+        rows.append(row_text)
+        styles.append(tuple(row_styles))
+    return tuple(rows), tuple(styles)
+
+
+def build_captions(time_map, line_texts, frame_rate):
+    """Group timed load lines into Caption records ordered by start frame.
+
+    Lines loaded by the same EOC share a start and end time and are adjacent in
+    line order, so consecutive lines with equal timing form one caption.
+    Returns an empty list if frame_rate is unknown.
+    """
+    if not frame_rate:
+        return []
+
+    groups = []
+    for line_num in sorted(time_map):
+        times = time_map[line_num]
+        if times[0] is None:
+            continue
+        if groups and groups[-1][0] == times:
+            groups[-1][1].append(line_num)
+        else:
+            groups.append((times, [line_num]))
+
+    captions = []
+    for (start_time, end_time), lines in groups:
+        try:
+            start_frame = timestamp_to_frames(start_time, frame_rate)
+            end_frame = timestamp_to_frames(end_time, frame_rate) if end_time else None
+        except (ValueError, TypeError, IndexError):
+            continue
+        texts = [line_texts[n] for n in lines if n in line_texts]
+        rows, styles = decode_rows(texts)
+        channel = _line_channel(texts[0]) if texts else 1
+        captions.append(Caption(tuple(lines), channel, start_frame, end_frame, rows, styles))
+
+    captions.sort(key=lambda c: (c.start_frame, c.lines))
+    return captions
+
+
+class _Node(object):
+    """Centered interval tree node."""
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center, by_start, by_end, left, right):
+        self.center = center
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left = left
+        self.right = right
+
+
+def _build_tree(intervals):
+    """Build a centered interval tree from (start, end, order, item) tuples."""
+    if not intervals:
+        return None
+    points = sorted(p for s, e, _, _ in intervals for p in (s, e))
+    center = points[len(points) // 2]
+    left, here, right = [], [], []
+    for interval in intervals:
+        if interval[1] <= center:
+            left.append(interval)
+        elif interval[0] > center:
+            right.append(interval)
+        else:
+            here.append(interval)
+    if not here and (not left or not right):
+        # Degenerate split (all intervals empty at the center); keep them at this node
+        here, left, right = left + right, [], []
+    by_start = sorted(here, key=lambda i: (i[0], i[2]))
+    by_end = sorted(here, key=lambda i: (-i[1], i[2]))
+    return _Node(center, by_start, by_end, _build_tree(left), _build_tree(right))
+
+
+class CaptionIndex(object):
+    """Interval index over captions for O(log n + k) time queries.
+
+    Intervals are half-open [start_frame, end_frame); captions that are never
+    cleared stay on screen until the end of the file.
+    """
+
+    def __init__(self, captions):
+        intervals = []
+        for order, caption in enumerate(captions):
+            end = caption.end_frame if caption.end_frame is not None else OPEN_END
+            intervals.append((caption.start_frame, end, order, caption))
+        intervals.sort(key=lambda i: (i[0], i[2]))
+        self._by_start = intervals
+        self._starts = [i[0] for i in intervals]
+        self._root = _build_tree(intervals)
+
+    def __len__(self):
+        return len(self._by_start)
+
+    def _stab(self, frame):
+        """Collect intervals containing frame."""
+        found = []
+        node = self._root
+        while node is not None:
+            if frame < node.center:
+                for interval in node.by_start:
+                    if interval[0] > frame:
+                        break
+                    if interval[1] > frame:
+                        found.append(interval)
+                node = node.left
+            else:
+                for interval in node.by_end:
+                    if interval[1] <= frame:
+                        break
+                    if interval[0] <= frame:
+                        found.append(interval)
+                node = node.right
+        return found
+
+    def at(self, frame):
+        """Return captions on screen at frame, ordered by start frame."""
+        found = self._stab(frame)
+        found.sort(key=lambda i: (i[0], i[2]))
+        return [i[3] for i in found]
+
+    def between(self, start_frame, end_frame):
+        """Return captions overlapping [start_frame, end_frame), ordered by start frame."""
+        if end_frame <= start_frame:
+            return []
+        # Overlap = starts inside the range, or started earlier and still showing at start_frame
+        found = [i for i in self._stab(start_frame) if i[0] < start_frame]
+        lo = bisect.bisect_left(self._starts, start_frame)
+        hi = bisect.bisect_left(self._starts, end_frame)
+        found.extend(self._by_start[lo:hi])
+        found.sort(key=lambda i: (i[0], i[2]))
+        return [i[3] for i in found]
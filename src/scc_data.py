@@ -46,6 +46,13 @@ FRAME_RATES = _frame_rates_data['frameRates']
 DROP_FRAME_RULES = _frame_rates_data['dropFrameRules']
 DETECTION_RULES = _frame_rates_data['detectionRules']
 
+_xds_data = _load_json('xds.json')
+XDS_CLASSES = {}
+for hex_key, value in _xds_data['classes'].items():
+    table = _xds_data['typeTables'].get(value['types']) or {}
+    XDS_CLASSES[int(hex_key, 16)] = (value['name'], dict((int(k, 16), (v['name'], v['format'])) for k, v in table.items()))
+XDS_RATINGS = _xds_data['ratings']
+
 
 def get_frame_rate_config(frame_rate_str):
     """Get frame rate configuration by name.
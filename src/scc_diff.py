@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Diff Module
+
+Caption-level semantic diff between two SCC files.
+Both files are decoded into caption sequences, captions are keyed by a hash of their
+text and styles, and the sequences are aligned with an anchored (patience-style) diff:
+captions unique to both sides anchor the alignment via a longest increasing subsequence,
+and the gaps between anchors are matched greedily. Near-linear in the number of captions.
+
+Usage: python src/scc_diff.py OLD.scc NEW.scc
+"""
+
+import bisect
+import io
+import sys
+
+from scc_analysis import build_time_map_lines
+from scc_captions import build_captions
+from scc_lines import TextLines
+from scc_retime import FrameConverter
+from scc_timecode import detect_frame_rate, frames_to_timestamp
+
+ADDED = "added"
+REMOVED = "removed"
+RETIMED = "retimed"
+CHANGED = "changed"
+
+
+class DiffEntry(object):
+    """One difference between two caption sequences.
+
+    old/new are Caption records (old is None for added, new is None for removed).
+    start_delta/end_delta are frame differences new - old (None when not comparable).
+    """
+
+    __slots__ = ("kind", "old", "new", "start_delta", "end_delta")
+
+    def __init__(self, kind, old, new, start_delta=None, end_delta=None):
+        self.kind = kind
+        self.old = old
+        self.new = new
+        self.start_delta = start_delta
+        self.end_delta = end_delta
+
+    def __repr__(self):
+        return "DiffEntry(%r, start_delta=%r, end_delta=%r)" % (self.kind, self.start_delta, self.end_delta)
+
+
+def load_captions(text):
+    """Decode SCC text into (frame_rate, captions)."""
+    frame_rate, _ = detect_frame_rate(text)
+    if frame_rate == "INVALID":
+        frame_rate = None
+    time_map, _, line_texts = build_time_map_lines(TextLines(text), frame_rate)
+    return frame_rate, build_captions(time_map, line_texts, frame_rate)
+
+
+def caption_key(caption):
+    """Hashable identity of a caption's content (channel, rows and styles, not timing)."""
+    return hash((caption.channel, caption.rows, caption.styles))
+
+
+def _longest_increasing(pairs):
+    """Longest subsequence of (i, j) pairs (sorted by i) with increasing j. O(n log n)."""
+    tails = []
+    tail_idx = []
+    prev = [None] * len(pairs)
+    for idx, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_idx.append(idx)
+        else:
+            tails[pos] = j
+            tail_idx[pos] = idx
+        prev[idx] = tail_idx[pos - 1] if pos > 0 else None
+    result = []
+    idx = tail_idx[-1] if tail_idx else None
+    while idx is not None:
+        result.append(pairs[idx])
+        idx = prev[idx]
+    result.reverse()
+    return result
+
+
+def _unique_anchors(a_keys, b_keys, a_lo, a_hi, b_lo, b_hi):
+    """Pairs of positions whose key occurs exactly once in each range, in increasing order."""
+    a_pos = {}
+    for i in range(a_lo, a_hi):
+        a_pos[a_keys[i]] = -1 if a_keys[i] in a_pos else i
+    b_pos = {}
+    for j in range(b_lo, b_hi):
+        b_pos[b_keys[j]] = -1 if b_keys[j] in b_pos else j
+    pairs = sorted((i, b_pos[k]) for k, i in a_pos.items() if i >= 0 and b_pos.get(k, -1) >= 0)
+    return _longest_increasing(pairs)
+
+
+def _greedy_matches(a_keys, b_keys, a_lo, a_hi, b_lo, b_hi):
+    """Match equal keys in order when no unique anchors remain."""
+    positions = {}
+    for j in range(b_lo, b_hi):
+        positions.setdefault(b_keys[j], []).append(j)
+    cursors = dict((k, 0) for k in positions)
+    matches = []
+    last_j = b_lo - 1
+    for i in range(a_lo, a_hi):
+        js = positions.get(a_keys[i])
+        if not js:
+            continue
+        c = cursors[a_keys[i]]
+        while c < len(js) and js[c] <= last_j:
+            c += 1
+        cursors[a_keys[i]] = c
+        if c < len(js):
+            matches.append((i, js[c]))
+            last_j = js[c]
+            cursors[a_keys[i]] = c + 1
+    return matches
+
+
+def align(a_keys, b_keys):
+    """Return matched (i, j) index pairs between two key sequences, in increasing order."""
+    matches = []
+    stack = [(0, len(a_keys), 0, len(b_keys))]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+        # Common prefix and suffix
+        while a_lo < a_hi and b_lo < b_hi and a_keys[a_lo] == b_keys[b_lo]:
+            matches.append((a_lo, b_lo))
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and a_keys[a_hi - 1] == b_keys[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            matches.append((a_hi, b_hi))
+        if a_lo >= a_hi or b_lo >= b_hi:
+            continue
+
+        anchors = _unique_anchors(a_keys, b_keys, a_lo, a_hi, b_lo, b_hi)
+        if not anchors:
+            matches.extend(_greedy_matches(a_keys, b_keys, a_lo, a_hi, b_lo, b_hi))
+            continue
+        prev_i, prev_j = a_lo, b_lo
+        for i, j in anchors:
+            matches.append((i, j))
+            stack.append((prev_i, i, prev_j, j))
+            prev_i, prev_j = i + 1, j + 1
+        stack.append((prev_i, a_hi, prev_j, b_hi))
+    matches.sort()
+    return matches
+
+
+def _overlaps(old, new, offset):
+    """Check if old (shifted by offset frames) and new are on screen at the same time."""
+    old_start = old.start_frame + offset
+    old_end = old.end_frame + offset if old.end_frame is not None else sys.maxsize
+    new_end = new.end_frame if new.end_frame is not None else sys.maxsize
+    return new.start_frame < old_end and old_start < new_end
+
+
+def _deltas(old, new):
+    start_delta = new.start_frame - old.start_frame
+    if old.end_frame is None or new.end_frame is None:
+        end_delta = None if old.end_frame != new.end_frame else 0
+    else:
+        end_delta = new.end_frame - old.end_frame
+    return start_delta, end_delta
+
+
+def _pair_unmatched(removed, added, offset, entries):
+    """Pair removed/added captions from the same gap that overlap in time as text changes.
+
+    offset is the retiming of the surrounding matched captions, so a shifted file still pairs up.
+    """
+    i = j = 0
+    while i < len(removed) and j < len(added):
+        old, new = removed[i], added[j]
+        if _overlaps(old, new, offset):
+            start_delta, end_delta = _deltas(old, new)
+            entries.append(DiffEntry(CHANGED, old, new, start_delta, end_delta))
+            i += 1
+            j += 1
+        elif old.start_frame + offset <= new.start_frame:
+            entries.append(DiffEntry(REMOVED, old, None))
+            i += 1
+        else:
+            entries.append(DiffEntry(ADDED, None, new))
+            j += 1
+    entries.extend(DiffEntry(REMOVED, old, None) for old in removed[i:])
+    entries.extend(DiffEntry(ADDED, None, new) for new in added[j:])
+
+
+def _rescale(captions, from_rate, to_rate):
+    """Express caption frames in another frame rate's frame units (for mixed-rate diffs),
+    at the same real time (1000/1001 clocks included), with integer math as retiming does."""
+    convert = FrameConverter(from_rate, 0, to_rate)
+    if convert.num == convert.den:
+        return captions
+    for caption in captions:
+        caption.start_frame = convert(caption.start_frame)
+        if caption.end_frame is not None:
+            caption.end_frame = convert(caption.end_frame)
+    return captions
+
+
+def diff_captions(old_captions, new_captions):
+    """Diff two caption sequences. Unchanged captions are omitted from the result."""
+    matches = align([caption_key(c) for c in old_captions], [caption_key(c) for c in new_captions])
+    entries = []
+    prev_i = prev_j = 0
+    offset = 0
+    for i, j in matches + [(len(old_captions), len(new_captions))]:
+        matched = i < len(old_captions) and j < len(new_captions)
+        if matched:
+            old, new = old_captions[i], new_captions[j]
+            start_delta, end_delta = _deltas(old, new)
+            if prev_i == 0 and prev_j == 0:
+                offset = start_delta  # leading gap: use the first match's retiming
+        if prev_i < i or prev_j < j:
+            _pair_unmatched(old_captions[prev_i:i], new_captions[prev_j:j], offset, entries)
+        if matched:
+            if start_delta or end_delta:
+                entries.append(DiffEntry(RETIMED, old, new, start_delta, end_delta))
+            offset = start_delta
+        prev_i, prev_j = i + 1, j + 1
+    return entries
+
+
+def diff_texts(old_text, new_text):
+    """Diff two SCC documents. Returns (frame_rate, entries); frames are in the new file's rate."""
+    old_rate, old_captions = load_captions(old_text)
+    new_rate, new_captions = load_captions(new_text)
+    if old_rate and new_rate and old_rate != new_rate:
+        _rescale(old_captions, old_rate, new_rate)
+    return new_rate or old_rate, diff_captions(old_captions, new_captions)
+
+
+def _format_frames(frames, frame_rate):
+    if frames is None:
+        return "--:--:--:--"
+    return frames_to_timestamp(frames, frame_rate) if frame_rate else str(frames)
+
+
+def _caption_text(caption):
+    return '"' + " / ".join(caption.rows) + '"'
+
+
+def format_entry(entry, frame_rate):
+    """Format a diff entry as one human-readable line."""
+    if entry.kind == ADDED:
+        return "+ ADDED    {0}  {1}".format(_format_frames(entry.new.start_frame, frame_rate), _caption_text(entry.new))
+    if entry.kind == REMOVED:
+        return "- REMOVED  {0}  {1}".format(_format_frames(entry.old.start_frame, frame_rate), _caption_text(entry.old))
+    timing = "{0} -> {1} ({2:+d}f".format(_format_frames(entry.old.start_frame, frame_rate), _format_frames(entry.new.start_frame, frame_rate), entry.start_delta)
+    timing += ", end {0:+d}f)".format(entry.end_delta) if entry.end_delta is not None else ")"
+    if entry.kind == RETIMED:
+        return "~ RETIMED  {0}  {1}".format(timing, _caption_text(entry.new))
+    return "* CHANGED  {0}  {1} -> {2}".format(timing, _caption_text(entry.old), _caption_text(entry.new))
+
+
+def summarize(entries):
+    """Count entries by kind, e.g. {'added': 2, 'removed': 0, 'retimed': 10, 'changed': 1}."""
+    counts = dict((kind, 0) for kind in (ADDED, REMOVED, RETIMED, CHANGED))
+    for entry in entries:
+        counts[entry.kind] += 1
+    return counts
+
+
+def _read(path):
+    with io.open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def main(argv=None):
+    """Print a caption-level diff of two SCC files. Exit status is 1 if they differ."""
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 2:
+        sys.stderr.write("Usage: scc_diff.py OLD.scc NEW.scc\n")
+        return 2
+    frame_rate, entries = diff_texts(_read(args[0]), _read(args[1]))
+    for entry in entries:
+        print(format_entry(entry, frame_rate))
+    counts = summarize(entries)
+    print("{0} added, {1} removed, {2} retimed, {3} changed".format(counts[ADDED], counts[REMOVED], counts[RETIMED], counts[CHANGED]))
+    return 1 if entries else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Document Module
+
+Editor-independent analysis of a whole SCC document. analyze() takes text, bytes or a
+readable stream and runs the same pipeline as the Notepad++ plugin: frame rate
+detection, the timing analysis (with QC metrics), the timestamp index and the render
+plan. The AnalysisResult it returns answers everything the plugin shows: errors,
+annotations, hover tooltips, caption buffer snapshots, timecode lookups and caption
+search. The plugin is an adapter that feeds editor text in and applies the results
+through Scintilla; scripts, the watch service and tests get the same answers without
+an editor.
+
+Not every use needs all of it, so analyze() runs at one of three levels: QUICK
+(parity and timestamp checks, for triaging archives), STANDARD (adds the timing
+analysis, overflow and timing checks and caption annotations) and FULL (adds QC
+metrics, XDS decoding and caption buffer snapshots in tooltips, for editing).
+"""
+
+import bisect
+from collections import namedtuple
+
+from scc_analysis import TIMING_ISSUES, TimestampIndex, build_time_map_lines, build_time_map_parallel, describe_timing_issue, line_text_map
+from scc_cache import pack_analysis, unpack_analysis
+from scc_decoder import is_enm
+from scc_errors import format_error_summary
+from scc_lines import LineCache, TextLines, parse_line
+from scc_memory import CaptionMemory, snapshot_text
+from scc_navigation import TimecodeIndex
+from scc_qc import QcMetrics
+from scc_render import RenderPlan, build_render_plan, line_start_positions
+from scc_report import iter_findings
+from scc_rules import CAPTION, CC_BUFFER_OVERFLOW, END, INDICATOR_ERROR, INDICATOR_PARITY, INDICATOR_QC, INVALID_TIMESTAMP, PARITY_ERROR, RULES, RuleRun, RuleSet
+from scc_search import CaptionTextIndex
+from scc_timecode import detect_frame_rate
+from scc_tooltip import format_event_description, format_timestamp_description, format_tooltip
+from scc_validate import iter_violations
+
+# Max lines to scan backwards for the caption buffer state of a snapshot
+MAX_SCAN_DEPTH = 1000
+
+# Analysis levels, fastest first (see analyze())
+QUICK = "quick"
+STANDARD = "standard"
+FULL = "full"
+ANALYSIS_LEVELS = (QUICK, STANDARD, FULL)
+# Largest document (in UTF-8 bytes) given each level by level_for_size(); larger ones get QUICK
+LEVEL_SIZE_LIMITS = ((FULL, 1 << 20), (STANDARD, 4 << 20))
+# Rules that need the timing analysis, left out at the QUICK level
+_TIMED_RULES = frozenset((CC_BUFFER_OVERFLOW,) + TIMING_ISSUES)
+# Rules the QUICK level runs on scc_validate's line scan instead of parsed lines
+_SCANNED_RULES = frozenset((PARITY_ERROR, INVALID_TIMESTAMP))
+
+# One entry of the error index: 0-based line and column, an ERROR_TYPES key and its summary label
+ErrorLocation = namedtuple("ErrorLocation", ["line", "column", "error_type", "label"])
+
+_XDS_TIPS = (
+    ("xds_checksum", "XDS checksum error (packet data does not match its checksum)"),
+    ("xds_unterminated", "Unterminated XDS packet (no end code)"),
+)
+
+
+def level_for_size(size, limits=LEVEL_SIZE_LIMITS):
+    """The most complete analysis level for a document of size bytes (see LEVEL_SIZE_LIMITS)."""
+    for level, limit in limits:
+        if size <= limit:
+            return level
+    return QUICK
+
+
+def quick_rules(rules):
+    """The rules of a RuleSet that run at the QUICK level: those that need neither the
+    timing analysis nor decoded captions (parity, invalid timestamps and custom word and
+    line rules). The Rule objects are shared, so their counters still add up."""
+    return RuleSet(rule for rule in rules if rule.name not in _TIMED_RULES and CAPTION not in rule.events and END not in rule.events)
+
+
+def _scan_plan(lines, line_starts, rules):
+    """RenderPlan of the parity and invalid timestamp rules of rules, found by
+    scc_validate's line scan: no line is parsed or split into word objects, and paired
+    commands are not marked."""
+    plan = RenderPlan()
+    indicator_ranges = {INDICATOR_ERROR: plan.error_ranges, INDICATOR_PARITY: plan.parity_ranges, INDICATOR_QC: plan.qc_ranges}
+    checks = [rule.name for rule in rules if rule.enabled]
+    for finding in iter_violations(lines, checks) if checks else ():
+        rule = rules.get(finding.rule)
+        rule.hits += 1
+        pos = line_starts[finding.line - 1] + finding.column - 1
+        ranges = indicator_ranges.get(rule.indicator)
+        if ranges is not None:
+            ranges.extend((pos, finding.end_column - finding.column))
+        plan.error_index.add(pos, finding.rule, finding.timecode or "line {0}".format(finding.line))
+    plan.error_index.finish()
+    return plan
+
+
+def read_source(source):
+    """Text of source: a string, UTF-8 bytes or a readable (text or binary) stream."""
+    if hasattr(source, "read"):
+        source = source.read()
+    if isinstance(source, bytes) and bytes is not str:
+        source = source.decode("utf-8", "replace")
+    return source
+
+
+def decode_full_line(line):
+    """Decode a full SCC line (text or ParsedLine) and return rendered caption segments."""
+    return parse_line(line).segments()
+
+
+def check_overflow(line_num, timestamp_index):
+    """Check overflow against the next timestamped line. Returns (is_overflow, packet_overflow_count)."""
+    if timestamp_index is None:
+        return False, 0
+    return timestamp_index.overflow(line_num)
+
+
+def find_errors(line, line_num=None, timestamp_index=None, rules=None):
+    """Find the errors of one line (text or ParsedLine) with the line and word rules of rules
+    (the default RULES if None): invalid timestamps, CC buffer overflow, timing issues
+    (out-of-order, duplicate or overlapping starts, long gaps) and parity errors.
+
+    Overflow and timing issues need line_num and timestamp_index. An overflow is listed as
+    the timestamp ("cc_buffer_overflow_tc") followed by each overflowing packet
+    ("cc_buffer_overflow_packet"), both with the packet count as extra.
+    Returns a list of (start_col, end_col, error_type, extra) in rule order.
+    """
+    parsed = parse_line(line)
+    run = RuleRun(rules, timestamp_index if line_num is not None else None)
+    errors = []
+    for hit in run.line(line_num, parsed).hits:
+        if hit.rule == CC_BUFFER_OVERFLOW:
+            errors.append((hit.start, hit.end, "cc_buffer_overflow_tc", hit.data))
+            # Mark the overflowing packets with red squiggles
+            first_late = parsed.packet_count - hit.data
+            for code in parsed.codes:
+                if code.packet_idx >= first_late:
+                    errors.append((code.word.pair_start, code.word.pair_end, "cc_buffer_overflow_packet", hit.data))
+        elif hit.rule == PARITY_ERROR:
+            errors.append((hit.start, hit.end, hit.rule, None))
+        else:
+            errors.append((hit.start, hit.end, hit.rule, hit.data))
+    return errors
+
+
+def buffer_snapshot(line, target_word_idx, line_num=None, earlier_line=None, max_depth=MAX_SCAN_DEPTH):
+    """Build caption buffer state at target word position.
+
+    line is the line's text or ParsedLine. Replays codes from the last ENM (up to
+    max_depth lines back) through a caption memory and renders the memory the target
+    code acts on. earlier_line(line_num) returns the ParsedLine of an earlier line, or
+    None to stop looking back.
+    Returns: (buffer_text, highlight_start, highlight_end)
+    """
+    memory = CaptionMemory()
+
+    # Look backwards to build persistent buffer state
+    if line_num is not None and earlier_line is not None:
+        lines_to_process = []
+        search_limit = max(-1, line_num - max_depth)
+        for search_line in range(line_num - 1, search_limit, -1):
+            parsed = earlier_line(search_line)
+            if parsed is None:
+                break
+            lines_to_process.append(parsed)
+            if any(is_enm(code.word.text) for code in parsed.codes):
+                break
+
+        lines_to_process.reverse()
+        for parsed_prev in lines_to_process:
+            parsed_prev.feed(memory)
+
+    # Process current line up to the target code
+    for logical_idx, code in enumerate(parse_line(line).codes):
+        evt = code.event
+        if logical_idx < target_word_idx:
+            memory.apply(code.word.text, evt)
+            continue
+
+        buffer = memory.write_buffer  # EOC flips it to displayed memory; render it either way
+        col_before = memory.col
+        memory.apply(code.word.text, evt)
+        if evt["type"] == "PAC":
+            return snapshot_text(buffer, memory.pen, memory.row, (memory.col, memory.col), highlight_row=memory.row)
+        if evt["type"] == "INDENT":
+            cells = [(memory.row, c) for c in range(col_before, memory.col)]
+            return snapshot_text(buffer, memory.pen, memory.row, (memory.pac_col, memory.col), highlight_cells=cells)
+        return snapshot_text(buffer, memory.pen, highlight_cells=memory.last_cells)
+
+    return snapshot_text(memory.write_buffer, memory.pen)
+
+
+class AnalysisResult(object):
+    """The analysis of one SCC document.
+
+    lines holds the document's lines (a TextLines, with line endings) and frame_rate its detected
+    rate (None if it could not be detected). time_map, timestamp_map and line_texts are
+    the results of the timing analysis, plan the RenderPlan with the annotations,
+    indicator ranges and error index. qc holds the QC metrics (None when they were not
+    collected or the result was restored from the analysis cache, whose plan still
+    carries the QC notes). Lines are parsed at most once, through line_cache. rules is
+    the scc_rules.RuleSet its errors were found with and level the analysis level (QUICK
+    results have empty time_map and timestamp_map).
+    """
+
+    __slots__ = (
+        "lines",
+        "frame_rate",
+        "time_map",
+        "timestamp_map",
+        "timestamp_index",
+        "line_texts",
+        "line_starts",
+        "line_cache",
+        "plan",
+        "qc",
+        "text_index",
+        "text_index_ready",
+        "rules",
+        "level",
+        "_timecode_index",
+    )
+
+    def __init__(self, lines, frame_rate, time_map, timestamp_map, line_texts, plan=None, line_cache=None, qc=None, rules=None, level=FULL):
+        self.lines = lines
+        self.frame_rate = frame_rate
+        self.time_map = time_map
+        self.timestamp_map = timestamp_map
+        self.timestamp_index = TimestampIndex(timestamp_map, frame_rate)
+        self.line_texts = line_texts
+        self.line_starts = line_start_positions(lines)
+        self.line_cache = line_cache if line_cache is not None else LineCache(frame_rate)
+        self.plan = plan
+        self.qc = qc
+        self.rules = rules if rules is not None else RULES
+        self.level = level
+        # Filled by build_render_plan in analyze(); after a cache restore, built on first search
+        self.text_index = CaptionTextIndex()
+        self.text_index_ready = False
+        self._timecode_index = None
+
+    @property
+    def error_index(self):
+        return self.plan.error_index
+
+    @property
+    def annotations(self):
+        """(line_num, text_bytes, style_bytes) for every annotated line."""
+        return self.plan.annotations
+
+    @property
+    def error_summary(self):
+        """The bounded error summary shown on line 0 (None if there are no errors)."""
+        return format_error_summary(self.plan.error_index)
+
+    @property
+    def timecode_index(self):
+        if self._timecode_index is None:
+            self._timecode_index = TimecodeIndex(self.timestamp_map, self.frame_rate)
+        return self._timecode_index
+
+    def parsed(self, line_num):
+        """The ParsedLine of a line (parsed on first use, e.g. after a cache restore)."""
+        return self.line_cache.get(line_num, self.line_texts.get(line_num) or self.lines[line_num])
+
+    def errors(self):
+        """Every indexed error as an ErrorLocation, in document order."""
+        index = self.plan.error_index
+        starts = [self.line_starts[n] for n in range(len(self.lines))]
+        result = []
+        for pos, error_type, label in zip(index.positions, index.types, index.labels):
+            line_num = max(0, bisect.bisect_right(starts, pos) - 1)
+            result.append(ErrorLocation(line_num, pos - starts[line_num] if starts else pos, error_type, label))
+        return result
+
+    def line_errors(self, line_num):
+        """find_errors() for one line of the document."""
+        return find_errors(self.parsed(line_num), line_num, self.timestamp_index, self.rules)
+
+    def findings(self):
+        """Report findings (see scc_report.iter_findings), reusing this analysis.
+
+        They are complete at every level: a QUICK result has no timing analysis to reuse,
+        so it is run for them.
+        """
+        time_map = self.time_map if self.level != QUICK else None
+        return iter_findings(self.lines, self.frame_rate, time_map, self.timestamp_index, self.line_cache, self.rules)
+
+    def snapshot(self, line_num, target_word_idx, max_depth=MAX_SCAN_DEPTH):
+        """buffer_snapshot() at the target_word_idx-th logical code of a line."""
+        return buffer_snapshot(self.parsed(line_num), target_word_idx, line_num, self.parsed, max_depth)
+
+    def error_tip(self, line_num, col):
+        """(anchor_col, message) for an error under a column, or None.
+
+        XDS errors depend on earlier lines, so they are looked up in the error index.
+        """
+        parsed = self.parsed(line_num)
+        word, _, _ = parsed.word_at(col)
+        if word is not None:
+            error_types = self.plan.error_index.types_at(self.line_starts[line_num] + word.start)
+            for error_type, message in _XDS_TIPS:
+                if error_type in error_types:
+                    return word.start, message
+        for start, end, error_type, extra_data in find_errors(parsed, line_num, self.timestamp_index, self.rules):
+            if start <= col < end:
+                if error_type == "parity_error":
+                    return start, "Invalid SCC code (parity check failed)"
+                elif error_type == "cc_buffer_overflow_tc":
+                    return start, "CC BUFFER OVERFLOW: {0} packets past next timestamp".format(extra_data)
+                elif error_type == "cc_buffer_overflow_packet":
+                    # No error tip for overflow packets - the normal tooltip flags them
+                    return None
+                elif error_type == "invalid_timestamp":
+                    return start, "Invalid timestamp"
+                elif error_type in TIMING_ISSUES:
+                    return start, describe_timing_issue(extra_data, self.frame_rate)
+                else:
+                    return start, self.rules.get(error_type).description
+        return None
+
+    def tooltip(self, line_num, col, max_depth=MAX_SCAN_DEPTH):
+        """Hover text for a column: (anchor_col, text), or None if there is nothing to show.
+
+        An error under the column takes precedence; otherwise the code under it is
+        described with the time its packet plays and, at the FULL level, the caption
+        buffer it acts on.
+        """
+        tip = self.error_tip(line_num, col)
+        if tip is not None:
+            return tip
+
+        parsed = self.parsed(line_num)
+        if parsed.timestamp is None:
+            return None
+        word, logical_idx, packet_idx = parsed.word_at(col)
+        if word is None:
+            return None
+        evt = parsed.codes[logical_idx].event
+
+        overflow_info = None
+        is_overflow, overflow_count = check_overflow(line_num, self.timestamp_index)
+        if is_overflow and packet_idx >= parsed.packet_count - overflow_count:
+            overflow_info = (True, overflow_count)
+
+        ts = parsed.ts
+        event_desc = format_event_description(evt, word.text)
+        timestamp_desc = format_timestamp_description(ts.hours, ts.minutes, ts.seconds, ts.frames, packet_idx, parsed.timestamp, self.frame_rate)
+        if self.level == FULL:
+            buffer_text, hl_start, hl_end = buffer_snapshot(parsed, logical_idx, line_num, self.parsed, max_depth)
+            is_control = evt["type"] in ("CONTROL", "NULL")
+        else:
+            buffer_text, hl_start, hl_end, is_control = "(shown at the full analysis level)", -1, -1, False
+        text = format_tooltip(event_desc, timestamp_desc, buffer_text, hl_start, hl_end, is_control, overflow_info)
+        return parsed.ts_start, text
+
+    def locate_timecode(self, frame):
+        """(line_num, column, exact) of the packet playing at an absolute frame, or None if before the first line."""
+        located = self.timecode_index.locate(frame)
+        if located is None:
+            return None
+        line_num, packet_idx, exact = located
+        words = self.parsed(line_num).words
+        return line_num, words[packet_idx].start if packet_idx < len(words) else 0, exact
+
+    def search(self, query):
+        """Sorted line numbers whose decoded caption text matches query (see CaptionTextIndex.search)."""
+        if not self.text_index_ready:
+            for line_num in self.line_texts:
+                parsed = self.parsed(line_num)
+                self.text_index.set_line(line_num, parsed.text, parsed.segments())
+            self.text_index_ready = True
+        return self.text_index.search(query)
+
+    def pack(self):
+        """Marshal-friendly data for the analysis cache (see restore())."""
+        return pack_analysis(self.frame_rate, self.time_map, self.timestamp_map, self.plan, self.level)
+
+
+def analyze(source, frame_rate=None, qc=True, line_cache=None, text_index=None, rules=None, level=FULL, workers=None):
+    """Analyze an SCC document and return its AnalysisResult.
+
+    source is text, UTF-8 bytes or a readable stream. frame_rate is detected from the
+    timestamps unless given. qc collects caption QC metrics (when the frame rate is
+    known). Passing the line_cache and text_index of an earlier analysis of the same
+    document reuses the parse and search index of every line whose text is unchanged.
+    Errors are found with rules (a scc_rules.RuleSet, the default RULES if None).
+
+    level limits the work:
+        QUICK     parity and invalid timestamp checks only, on a scan of the lines that
+                  parses none of them (unless custom word or line rules need it). No
+                  timing, annotations, paired command marks or search index (built on
+                  the first search).
+        STANDARD  adds the timing analysis (display times), the overflow, timing and
+                  never-displayed checks and the caption annotations.
+        FULL      adds the QC metrics, XDS packet decoding and checks, and caption buffer
+                  snapshots in tooltips.
+
+    workers runs the timing analysis of a document of at least
+    scc_analysis.PARALLEL_MIN_LINES lines on that many processes (see
+    build_time_map_parallel); the result is the same as the serial one. QC metrics are
+    collected by the serial pass, so it applies at STANDARD, or at FULL with qc False.
+    """
+    if level not in ANALYSIS_LEVELS:
+        raise ValueError("Unknown analysis level {0!r}".format(level))
+    text = read_source(source)
+    if frame_rate is None:
+        frame_rate, _ = detect_frame_rate(text)
+        if frame_rate == "INVALID":
+            frame_rate = None
+    lines = TextLines(text)
+    metrics = QcMetrics(frame_rate) if qc and frame_rate and level == FULL else None
+    if line_cache is None:
+        line_cache = LineCache()
+    # The line cache is filled by the render plan below when the timing pass does not fill it
+    cache_pass = level == QUICK or (workers is not None and workers > 1 and metrics is None)
+    if level == QUICK:
+        # Lines are parsed on first use (hover, search); only custom rules parse them here
+        line_cache.start(frame_rate)
+        time_map, timestamp_map, line_texts = {}, {}, line_text_map(lines)
+    elif cache_pass:
+        line_cache.start(frame_rate)
+        time_map, timestamp_map, line_texts = build_time_map_parallel(lines, frame_rate, workers)
+    else:
+        time_map, timestamp_map, line_texts = build_time_map_lines(lines, frame_rate, metrics, line_cache)
+    result = AnalysisResult(lines, frame_rate, time_map, timestamp_map, line_texts, line_cache=line_cache, qc=metrics, rules=rules, level=level)
+    if level == QUICK:
+        checks = quick_rules(result.rules)
+        if all(rule.name in _SCANNED_RULES for rule in checks if rule.enabled):
+            result.plan = _scan_plan(lines, result.line_starts, checks)
+        else:
+            result.plan = build_render_plan(None, None, line_texts, result.line_starts, None, None, line_cache, checks)
+    else:
+        if text_index is not None:
+            result.text_index = text_index
+        result.plan = build_render_plan(time_map, result.timestamp_index, line_texts, result.line_starts, result.text_index, metrics, line_cache, result.rules, level == FULL)
+        result.text_index_ready = True
+    if cache_pass:
+        line_cache.finish()
+    lines.release(line_texts)
+    return result
+
+
+def restore(source, payload, rules=None):
+    """AnalysisResult of a document from its AnalysisResult.pack() data, without analyzing it again.
+
+    rules should be the RuleSet the data was analyzed with; hover checks and findings use it.
+    """
+    lines = TextLines(read_source(source))
+    frame_rate, time_map, timestamp_map, plan, level = unpack_analysis(payload)
+    line_texts = line_text_map(lines)
+    result = AnalysisResult(lines, frame_rate, time_map, timestamp_map, line_texts, plan, rules=rules, level=level)
+    lines.release(line_texts)
+    return result
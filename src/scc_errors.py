@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Errors Module
+
+Precomputed error positions for next/previous error navigation and the bounded
+error summary shown on line 0.
+"""
+
+import array
+import bisect
+
+# Error types in summary order, with singular/plural labels
+ERROR_TYPES = (
+    ("invalid_timestamp", "invalid timestamp", "invalid timestamps"),
+    ("parity_error", "parity error", "parity errors"),
+    ("cc_buffer_overflow", "buffer overflow", "buffer overflows"),
+    ("timecode_order", "out-of-order timestamp", "out-of-order timestamps"),
+    ("duplicate_timestamp", "duplicate timestamp", "duplicate timestamps"),
+    ("packet_overlap", "overlapping line", "overlapping lines"),
+    ("timecode_gap", "long gap", "long gaps"),
+    ("never_displayed", "never displayed caption", "never displayed captions"),
+    ("xds_checksum", "XDS checksum error", "XDS checksum errors"),
+    ("xds_unterminated", "unterminated XDS packet", "unterminated XDS packets"),
+)
+
+# Max locations listed per error type in the summary
+SUMMARY_MAX_ENTRIES = 10
+
+
+class ErrorIndex(object):
+    """Document positions of errors sorted by position, with a per-type breakdown.
+
+    Call add() while scanning, then finish() once before navigating.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self.positions = array.array("l")
+        self.types = []
+        self.labels = []
+        self._by_type = {}
+
+    def add(self, pos, error_type, label):
+        """Record an error at a document position; label is shown in the summary (e.g. a timecode)."""
+        self._pending.append((pos, error_type, label))
+
+    def finish(self):
+        """Sort recorded errors and build the lookup arrays."""
+        self._pending.sort(key=lambda e: e[0])
+        self.positions = array.array("l", [e[0] for e in self._pending])
+        self.types = [e[1] for e in self._pending]
+        self.labels = [e[2] for e in self._pending]
+        self._by_type = {}
+        for pos, error_type, label in self._pending:
+            entry = self._by_type.get(error_type)
+            if entry is None:
+                entry = self._by_type[error_type] = (array.array("l"), [])
+            entry[0].append(pos)
+            entry[1].append(label)
+        self._pending = []
+        return self
+
+    def __len__(self):
+        return len(self.positions)
+
+    def count(self, error_type):
+        entry = self._by_type.get(error_type)
+        return len(entry[0]) if entry else 0
+
+    def first_labels(self, error_type, limit=SUMMARY_MAX_ENTRIES):
+        entry = self._by_type.get(error_type)
+        return entry[1][:limit] if entry else []
+
+    def types_at(self, pos):
+        """Error types recorded at exactly pos."""
+        lo = bisect.bisect_left(self.positions, pos)
+        hi = bisect.bisect_right(self.positions, pos)
+        return self.types[lo:hi]
+
+    def _positions_for(self, error_type):
+        if error_type is None:
+            return self.positions
+        entry = self._by_type.get(error_type)
+        return entry[0] if entry else array.array("l")
+
+    def next_error(self, pos, error_type=None):
+        """Return the first error position after pos (wrapping to the top), or None."""
+        positions = self._positions_for(error_type)
+        if not positions:
+            return None
+        idx = bisect.bisect_right(positions, pos)
+        return positions[idx % len(positions)]
+
+    def previous_error(self, pos, error_type=None):
+        """Return the last error position before pos (wrapping to the bottom), or None."""
+        positions = self._positions_for(error_type)
+        if not positions:
+            return None
+        idx = bisect.bisect_left(positions, pos) - 1
+        return positions[idx % len(positions)]
+
+
+def format_error_summary(error_index, max_entries=SUMMARY_MAX_ENTRIES):
+    """Format the line-0 error summary: counts per type plus the first few locations of each.
+
+    Returns None if there are no errors.
+    """
+    parts = []
+    details = []
+    for error_type, singular, plural in ERROR_TYPES:
+        count = error_index.count(error_type)
+        if not count:
+            continue
+        parts.append("{0} {1}".format(count, singular if count == 1 else plural))
+        labels = error_index.first_labels(error_type, max_entries)
+        if labels:
+            more = " (+{0} more)".format(count - len(labels)) if count > len(labels) else ""
+            details.append("{0}: {1}{2}".format(plural.capitalize(), ", ".join(labels), more))
+    if not parts:
+        return None
+    return "\n".join(["ERRORS: " + ", ".join(parts)] + details)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Lines Module
+
+Parse-once intermediate representation of SCC lines. A ParsedLine holds everything the
+analysis, render plan, error checks, reports and tooltips need from one line: the
+timestamp span and start frame, every hex word with its pairing, the logical codes with
+their packet indices and decoded events, and the words that fail parity. The timing
+analysis fills a LineCache with one ParsedLine per non-empty line; the other consumers
+read from it instead of re-running the timestamp and hex-word patterns. Entries are
+reused by text, so after an edit only the lines whose text changed are parsed again.
+TextLines splits a document into lines without copying it: lines are sliced from the
+text one at a time as they are read.
+"""
+
+import array
+import re
+from collections import namedtuple
+
+from scc_data import VALID_BYTES
+from scc_decoder import iter_hex_words, parse_scc_code, TIMESTAMP_PATTERN
+from scc_memory import CaptionMemory, memory_segments
+from scc_timecode import parse_timestamp_str, timestamp_to_frames, validate_timestamp
+
+# One logical code (a single word, or the first word of a doubled command):
+# packet_idx is its index among all words on the line, event its parse_scc_code result
+Code = namedtuple("Code", ["packet_idx", "word", "event"])
+
+# Line ends as Scintilla counts them
+_LINE_END = re.compile(r"\r\n|\r|\n")
+
+# (parse_scc_code result, parity ok) by word text; there are at most 65536 words and events are read-only
+_WORDS = {}
+_new_code = tuple.__new__
+
+
+def check_parity_fast(hex_str):
+    """Fast parity check using precomputed lookup table."""
+    try:
+        val = int(hex_str, 16)
+        return ((val >> 8) in VALID_BYTES) and ((val & 0xFF) in VALID_BYTES)
+    except (ValueError, TypeError):
+        return False
+
+
+def _word_info(word_text):
+    info = _WORDS.get(word_text)
+    if info is None:
+        info = _WORDS[word_text] = (parse_scc_code(word_text), check_parity_fast(word_text))
+    return info
+
+
+class TextLines(object):
+    """The lines of a document's text (with line endings), sliced from it on access.
+
+    Reads like text.splitlines(True), but splits only at the line ends Scintilla uses and
+    holds the text plus an array of line start offsets instead of a list of copies.
+    Once the non-empty lines have been parsed (each ParsedLine keeps its own text),
+    release() drops the document text and answers from those lines instead.
+    """
+
+    __slots__ = ("text", "starts", "texts")
+
+    def __init__(self, text):
+        self.text = text
+        self.starts = starts = array.array("L", [0])
+        starts.extend(match.end() for match in _LINE_END.finditer(text))
+        if starts[-1] == len(text):
+            starts.pop()  # nothing after the last line end (or an empty text)
+        self.texts = None
+
+    def release(self, line_texts):
+        """Drop the text; non-empty lines are then read from line_texts, blank lines read as ""."""
+        self.texts = line_texts
+        self.text = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.starts)))]
+        if index < 0:
+            index += len(self.starts)
+        if not 0 <= index < len(self.starts):
+            raise IndexError("line index out of range")
+        if self.text is None:
+            return self.texts.get(index, "")
+        end = self.starts[index + 1] if index + 1 < len(self.starts) else len(self.text)
+        return self.text[self.starts[index] : end]
+
+    def __iter__(self):
+        text, starts = self.text, self.starts
+        if text is None:
+            for index in range(len(starts)):
+                yield self.texts.get(index, "")
+            return
+        for index in range(1, len(starts)):
+            yield text[starts[index - 1] : starts[index]]
+        if starts:
+            yield text[starts[-1] :]
+
+
+class ParsedLine(object):
+    """One SCC line parsed once.
+
+    words holds every hex word in order (a word's index is its packet index, and doubled
+    commands carry their pair span); codes holds the logical codes (a code's index is its
+    logical index). timestamp is the matched
+    timestamp string (ts_start/ts_end its columns, ts its Timestamp) or None, and frame
+    its absolute start frame when the frame rate is known.
+    """
+
+    __slots__ = ("text", "timestamp", "ts_start", "ts_end", "ts", "ts_valid", "frame", "words", "codes", "bad_parity", "_segments")
+
+    def __init__(self, text, frame_rate=None):
+        self.text = text
+        match = TIMESTAMP_PATTERN.search(text)
+        if match:
+            self.timestamp = match.group(0)
+            self.ts_start, self.ts_end = match.start(), match.end()
+            self.ts = parse_timestamp_str(self.timestamp)
+            self.ts_valid = validate_timestamp(self.ts)
+            self.frame = timestamp_to_frames(self.ts, frame_rate) if frame_rate else None
+        else:
+            self.timestamp = self.ts_start = self.ts_end = self.ts = self.frame = None
+            self.ts_valid = False
+        self.words = list(iter_hex_words(text))
+        codes = []
+        bad_parity = []
+        for packet_idx, word in enumerate(self.words):
+            evt, parity_ok = _word_info(word.text)
+            if not parity_ok:
+                bad_parity.append(packet_idx)
+            if word.is_paired and word.start > word.pair_start:
+                continue
+            codes.append(_new_code(Code, (packet_idx, word, evt)))
+        self.codes = codes
+        self.bad_parity = bad_parity
+        self._segments = None
+
+    @property
+    def packet_count(self):
+        return len(self.words)
+
+    def word_at(self, col):
+        """Find the hex word (or doubled command) covering a column.
+
+        Returns (word, logical_idx, packet_idx), or (None, -1, -1).
+        """
+        logical_idx = 0
+        for packet_idx, word in enumerate(self.words):
+            if word.pair_start <= col < word.pair_end:
+                return word, logical_idx, packet_idx
+            if not (word.is_paired and word.start > word.pair_start):
+                logical_idx += 1
+        return None, -1, -1
+
+    def feed(self, memory, skip=None):
+        """Apply the line's codes to a CaptionMemory; skip is an optional set of word start columns."""
+        for code in self.codes:
+            if skip and code.word.start in skip:
+                continue
+            memory.apply(code.word.text, code.event)
+
+    def segments(self, skip=None):
+        """Decoded annotation segments (see render_line_annotation); cached unless words are skipped."""
+        if skip:
+            memory = CaptionMemory()
+            self.feed(memory, skip)
+            return memory_segments(memory)
+        if self._segments is None:
+            memory = CaptionMemory()
+            self.feed(memory)
+            self._segments = memory_segments(memory)
+        return self._segments
+
+
+def parse_line(line, frame_rate=None):
+    """ParsedLine for a line's text (returned as-is if already parsed)."""
+    if isinstance(line, ParsedLine):
+        return line
+    return ParsedLine(line, frame_rate)
+
+
+class LineCache(object):
+    """ParsedLines of one document by line number.
+
+    Call start() before a full pass and get() for each non-empty line; lines whose text
+    is unchanged since the previous pass reuse their ParsedLine even if they moved. Outside
+    a pass, get() parses and stores a line on first use and again only if its text changed.
+    """
+
+    __slots__ = ("frame_rate", "lines", "parsed", "_previous")
+
+    def __init__(self, frame_rate=None):
+        self.frame_rate = frame_rate
+        self.lines = {}
+        self.parsed = 0  # lines parsed (not reused) since start()
+        self._previous = {}
+
+    def start(self, frame_rate):
+        """Begin a full pass; a frame rate change discards every entry."""
+        previous = self.lines.values() if frame_rate == self.frame_rate else ()
+        self._previous = dict((parsed.text, parsed) for parsed in previous)
+        self.frame_rate = frame_rate
+        self.lines = {}
+        self.parsed = 0
+
+    def finish(self):
+        """End a full pass, dropping lines that are no longer in the document."""
+        self._previous = {}
+
+    def get(self, line_num, text):
+        parsed = self.lines.get(line_num)
+        if parsed is not None and parsed.text == text:
+            return parsed
+        parsed = self._previous.get(text)
+        if parsed is None:
+            parsed = ParsedLine(text, self.frame_rate)
+            self.parsed += 1
+        self.lines[line_num] = parsed
+        return parsed
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Memory Module
+
+EIA-608 caption memory model based on libcaption's caption.c.
+Displayed and non-displayed memory are 15 x 32 grids kept as fixed-size per-row
+character lists and style bytearrays (rows are allocated on first write). Each code
+is a constant-time update: PACs and tab offsets move the cursor, text writes cells,
+backspace and DER clear them, a roll-up carriage return moves at most four row
+references, and End of Caption swaps the two memories by reference.
+"""
+
+from scc_data import COLOR_LIST
+from scc_decoder import iter_hex_words, parse_scc_code
+
+ROWS = 15
+COLS = 32
+
+# Cell style byte: italic and underline flags, color index (into COLOR_LIST) in bits 2-4
+STYLE_ITALIC = 0x01
+STYLE_UNDERLINE = 0x02
+_COLOR_SHIFT = 2
+_ITALICS_COLOR = COLOR_LIST.index("Italics")
+
+POP_ON = "pop-on"
+ROLL_UP = "roll-up"
+PAINT_ON = "paint-on"
+
+# Control command bytes (low byte with parity stripped)
+CMD_RCL = 0x20
+CMD_BS = 0x21
+CMD_DER = 0x24
+CMD_RU2 = 0x25
+CMD_RU3 = 0x26
+CMD_RU4 = 0x27
+CMD_RDC = 0x29
+CMD_EDM = 0x2C
+CMD_CR = 0x2D
+CMD_ENM = 0x2E
+CMD_EOC = 0x2F
+
+
+def make_style(color, underline=False):
+    """Style byte for a PAC color name (the "Italics" PAC color is italic white)."""
+    idx = COLOR_LIST.index(color) if color in COLOR_LIST else 0
+    style = idx << _COLOR_SHIFT
+    if idx == _ITALICS_COLOR:
+        style |= STYLE_ITALIC
+    if underline:
+        style |= STYLE_UNDERLINE
+    return style
+
+
+def style_color(style):
+    """Color name of a style byte."""
+    return COLOR_LIST[(style >> _COLOR_SHIFT) & 0x07]
+
+
+class DisplayBuffer(object):
+    """One 15 x 32 caption memory. chars[row] is None until the row is first written.
+
+    origins[row] is the column a PAC last placed the cursor at on that row (COLS if none),
+    so tab offsets after it render as leading spaces.
+    """
+
+    __slots__ = ("chars", "styles", "origins")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.chars = [None] * ROWS
+        self.styles = [None] * ROWS
+        self.origins = bytearray([COLS] * ROWS)
+
+    def write(self, row, col, char, style):
+        chars = self.chars[row]
+        if chars is None:
+            chars = self.chars[row] = [None] * COLS
+            self.styles[row] = bytearray(COLS)
+        chars[col] = char
+        self.styles[row][col] = style
+
+    def erase(self, row, col, end=None):
+        """Clear cells col..end-1 of a row (just col if end is None)."""
+        chars = self.chars[row]
+        if chars is None:
+            return
+        for c in range(col, (col + 1) if end is None else end):
+            chars[c] = None
+
+    def roll_up(self, base_row, rows):
+        """Move the rows of a roll-up window ending at base_row up by one and blank base_row."""
+        top = max(0, base_row - rows + 1)
+        self.chars[top : base_row + 1] = self.chars[top + 1 : base_row + 1] + [None]
+        self.styles[top : base_row + 1] = self.styles[top + 1 : base_row + 1] + [None]
+        self.origins[top : base_row + 1] = self.origins[top + 1 : base_row + 1] + bytearray([COLS])
+
+    def row_span(self, row):
+        """(first, last + 1) columns of a row from its PAC origin (or first written cell) to its
+        last written cell, or None if it is blank."""
+        chars = self.chars[row]
+        if chars is None:
+            return None
+        first = 0
+        while first < COLS and chars[first] is None:
+            first += 1
+        if first == COLS:
+            return None
+        last = COLS - 1
+        while chars[last] is None:
+            last -= 1
+        return min(first, self.origins[row]), last + 1
+
+    def row_text(self, row):
+        """Text of a row across its span (blank cells in it are spaces)."""
+        span = self.row_span(row)
+        if span is None:
+            return ""
+        chars = self.chars[row]
+        return "".join(chars[c] or " " for c in range(span[0], span[1]))
+
+    def is_empty(self):
+        return all(self.row_span(row) is None for row in range(ROWS))
+
+
+class CaptionMemory(object):
+    """Displayed/non-displayed memories plus the cursor, pen style and caption mode.
+
+    Text goes to non-displayed memory in pop-on mode and straight to displayed memory
+    in roll-up and paint-on modes. Buffers written to are collected in `written` and
+    the cells written by the most recent code in `last_cells`.
+    """
+
+    __slots__ = ("displayed", "non_displayed", "mode", "roll_up_rows", "row", "col", "pen", "pac_col", "written", "last_cells")
+
+    def __init__(self):
+        self.displayed = DisplayBuffer()
+        self.non_displayed = DisplayBuffer()
+        self.mode = POP_ON
+        self.roll_up_rows = 0
+        self.row = ROWS - 1
+        self.col = 0
+        self.pen = 0
+        self.pac_col = 0
+        self.written = []
+        self.last_cells = []
+
+    @property
+    def write_buffer(self):
+        return self.non_displayed if self.mode == POP_ON else self.displayed
+
+    def _put(self, char):
+        buf = self.write_buffer
+        col = min(self.col, COLS - 1)  # past the last column, characters overwrite it
+        buf.write(self.row, col, char, self.pen)
+        self.last_cells.append((self.row, col))
+        self.col = col + 1
+        for written in self.written:
+            if written is buf:
+                return
+        self.written.append(buf)
+
+    def _backspace(self):
+        self.col = max(0, min(self.col, COLS) - 1)
+        self.write_buffer.erase(self.row, self.col)
+
+    def _control(self, cmd):
+        if cmd == CMD_RCL:
+            self.mode = POP_ON
+        elif cmd == CMD_BS:
+            self._backspace()
+        elif cmd == CMD_DER:
+            if self.col < COLS:
+                self.write_buffer.erase(self.row, self.col, COLS)
+        elif cmd in (CMD_RU2, CMD_RU3, CMD_RU4):
+            self.mode = ROLL_UP
+            self.roll_up_rows = cmd - CMD_RU2 + 2
+        elif cmd == CMD_RDC:
+            self.mode = PAINT_ON
+        elif cmd == CMD_EDM:
+            self.displayed.clear()
+        elif cmd == CMD_CR:
+            if self.mode == ROLL_UP:
+                self.displayed.roll_up(self.row, self.roll_up_rows)
+                self.col = 0
+        elif cmd == CMD_ENM:
+            self.non_displayed.clear()
+        elif cmd == CMD_EOC:
+            self.displayed, self.non_displayed = self.non_displayed, self.displayed
+            self.non_displayed.clear()
+
+    def apply(self, word_text, evt=None):
+        """Apply one (first-of-pair) hex word. evt is its parse_scc_code result if already parsed."""
+        if evt is None:
+            evt = parse_scc_code(word_text)
+        self.last_cells = []
+        evt_type = evt["type"]
+        if evt_type == "TEXT":
+            if evt.get("is_extended"):
+                # Extended characters replace the standard fallback character sent before them
+                self._backspace()
+            for char in evt["text"]:
+                self._put(char)
+        elif evt_type == "PAC":
+            self.row = evt["row"]
+            self.col = self.pac_col = evt["col"]
+            origins = self.write_buffer.origins
+            origins[self.row] = min(origins[self.row], self.col)
+            self.pen = make_style(evt["color"], evt.get("underline", False))
+        elif evt_type == "MIDROW":
+            if evt.get("is_italic"):
+                style = (self.pen | STYLE_ITALIC) & ~STYLE_UNDERLINE
+            else:
+                style = make_style(evt["color"])
+            self.pen = style | (STYLE_UNDERLINE if evt.get("underline") else 0)
+        elif evt_type == "INDENT":
+            self.col = min(self.col + evt["spaces"], COLS - 1)
+        elif evt_type == "CONTROL":
+            self._control(int(word_text, 16) & 0x7F)
+
+    def feed_line(self, line_text, skip=None):
+        """Apply every code on an SCC line (second words of doubled commands are skipped).
+
+        skip is an optional set of word start columns to leave out (e.g. XDS data).
+        """
+        for word in iter_hex_words(line_text):
+            if word.is_paired and word.start > word.pair_start:
+                continue
+            if skip and word.start in skip:
+                continue
+            self.apply(word.text, parse_scc_code(word.text, word.is_paired))
+
+
+def buffer_segments(buffer):
+    """Render a memory as annotation segments: (text, is_italic) runs with newline markers between rows."""
+    segments = []
+    for row in range(ROWS):
+        span = buffer.row_span(row)
+        if span is None:
+            continue
+        if segments:
+            segments.append((u"⏎", "newline"))  # fmt: skip
+        chars = buffer.chars[row]
+        styles = buffer.styles[row]
+        run = ""
+        run_italic = bool(styles[span[0]] & STYLE_ITALIC)
+        for col in range(span[0], span[1]):
+            char = chars[col]
+            italic = bool(styles[col] & STYLE_ITALIC) if char is not None else run_italic
+            if italic != run_italic:
+                segments.append((run, run_italic))
+                run = ""
+                run_italic = italic
+            run += char or " "
+        segments.append((run, run_italic))
+    return segments
+
+
+def memory_segments(memory):
+    """Segments for every buffer the memory has written to, in the order they were first written."""
+    segments = []
+    for buffer in memory.written:
+        part = buffer_segments(buffer)
+        if part and segments:
+            segments.append((u"⏎", "newline"))  # fmt: skip
+        segments.extend(part)
+    return segments
+
+
+def snapshot_text(buffer, pen=0, cursor_row=None, cursor_cols=None, highlight_cells=(), highlight_row=None):
+    """Render a memory for the tooltip as "{Rrr Ccc Col}text" per non-blank row.
+
+    cursor_row/cursor_cols (start, end) widen that row's span so the cursor position shows
+    (blank cells render as spaces). highlight_cells are (row, col) cells to mark; highlight_row
+    marks that row's prefix instead. An italic run starting mid-row is marked with "<i>".
+    Returns: (text, highlight_start, highlight_end), with -1 positions if nothing is marked.
+    """
+    highlight_cells = set(highlight_cells)
+    parts = []
+    pos = 0
+    hl_start = hl_end = -1
+    for row in range(ROWS):
+        span = buffer.row_span(row)
+        if row == cursor_row and cursor_cols is not None:
+            span = (min(span[0], cursor_cols[0]), max(span[1], cursor_cols[1])) if span else cursor_cols
+        if span is None:
+            continue
+        chars = buffer.chars[row] or [None] * COLS
+        styles = buffer.styles[row] or bytearray(COLS)
+        first_style = styles[span[0]] if chars[span[0]] is not None else pen
+        prefix = "{R%02d C%02d %s}" % (row, span[0], style_color(first_style)[:3])
+        if row == highlight_row:
+            hl_start, hl_end = pos, pos + len(prefix)
+        parts.append(prefix)
+        pos += len(prefix)
+        italic = bool(first_style & STYLE_ITALIC)
+        for col in range(span[0], span[1]):
+            char = chars[col]
+            if char is not None and bool(styles[col] & STYLE_ITALIC) != italic:
+                italic = not italic
+                if italic:
+                    parts.append("<i>")
+                    pos += 3
+            text = char or " "
+            if (row, col) in highlight_cells:
+                hl_start = pos if hl_start < 0 else min(hl_start, pos)
+                hl_end = max(hl_end, pos + len(text))
+            parts.append(text)
+            pos += len(text)
+    return "".join(parts), hl_start, hl_end
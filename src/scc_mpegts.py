@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+"""
+SCC MPEG-TS Module
+
+Extracts the EIA-608 caption data muxed into an MPEG transport stream and writes it
+as SCC, so delivered streams can be opened in the inspector. Modeled on libcaption's
+mpeg.c and cea708.c: the PAT and PMT locate the video stream (H.262, H.264 or H.265),
+video PES packets give each picture's PTS, and A/53 cc_data is read from SEI
+user_data_registered_itu_t_t35 messages (or H.262 picture user data). Pictures are
+put back in presentation order before their caption pairs are timed.
+
+The file is memory-mapped and walked one 188-byte packet at a time with
+struct.unpack_from; only the bytes of each picture that come before its first slice
+(where SEI and user data live) are copied, so memory use does not grow with the file.
+
+Usage: python src/scc_mpegts.py INPUT.ts [OUTPUT.scc]
+"""
+
+import heapq
+import io
+import mmap
+import struct
+import sys
+
+from scc_timecode import frame_clock, frames_to_timestamp, packet_frame_offset, timestamp_to_frames
+
+TS_PACKET_SIZE = 188
+M2TS_PACKET_SIZE = 192  # Blu-ray/AVCHD: 4-byte timecode prefix per packet
+SYNC_BYTE = 0x47
+PTS_CLOCK = 90000
+PTS_WRAP = 1 << 33
+
+STREAM_TYPE_H262 = 0x02
+STREAM_TYPE_H264 = 0x1B
+STREAM_TYPE_H265 = 0x24
+VIDEO_STREAM_TYPES = (STREAM_TYPE_H262, STREAM_TYPE_H264, STREAM_TYPE_H265)
+
+H264_SEI = 6
+H265_SEI_PREFIX = 39
+H265_SEI_SUFFIX = 40
+H262_USER_DATA = 0xB2
+SEI_USER_DATA_REGISTERED = 4
+T35_PROVIDER_ATSC = 0x0031
+GA94 = b"GA94"
+USER_DATA_TYPE_CC = 3
+
+START_CODE = b"\x00\x00\x01"
+
+# Pictures held back for B-frame reordering (libcaption's MAX_REFRENCE_FRAMES)
+REORDER_DEPTH = 64
+# Cap on the bytes copied from the start of one picture while looking for its first slice
+MAX_HEADER_BYTES = 256 * 1024
+MAX_LINE_WORDS = 128
+
+_TS_HEADER = struct.Struct(">BHB")
+_BYTE = struct.Struct(">B")
+_PES_HEADER = struct.Struct(">3sBHBBB")
+_TIMESTAMP = struct.Struct(">BHH")
+
+# Picture durations in 90 kHz ticks for frame rate detection
+_FRAME_DURATIONS = ((3003, "29.97 DF"), (1501.5, "29.97 DF"), (3753.75, "23.98"), (3600, "25"))
+
+
+def detect_packet_layout(buf):
+    """Find the packet size (188 or 192) and the offset of the first sync byte.
+
+    Returns: (packet_size, offset), or (None, None) if buf is not a transport stream.
+    """
+    size = len(buf)
+    for offset in range(min(size, M2TS_PACKET_SIZE)):
+        for packet_size in (TS_PACKET_SIZE, M2TS_PACKET_SIZE):
+            first = offset + packet_size - TS_PACKET_SIZE
+            syncs = range(first, min(size - TS_PACKET_SIZE + 1, first + packet_size * 3), packet_size)
+            if syncs and all(_BYTE.unpack_from(buf, sync)[0] == SYNC_BYTE for sync in syncs):
+                return packet_size, offset
+    return None, None
+
+
+def _read_timestamp(buf, offset):
+    """33-bit PTS/DTS from its 5-byte PES header encoding."""
+    high, mid, low = _TIMESTAMP.unpack_from(buf, offset)
+    return ((high >> 1) & 0x07) << 30 | (mid >> 1) << 15 | (low >> 1)
+
+
+def _unwrap(ts, ref):
+    """Move a 33-bit timestamp by multiples of 2^33 to the value nearest ref."""
+    if ref is None:
+        return ts
+    return ts + (ref - ts + PTS_WRAP // 2) // PTS_WRAP * PTS_WRAP
+
+
+def _is_picture_data(stream_type, header_byte):
+    """True if a start code's first byte begins slice data (nothing captions-related follows)."""
+    if stream_type == STREAM_TYPE_H264:
+        return 1 <= header_byte & 0x1F <= 5
+    if stream_type == STREAM_TYPE_H265:
+        return (header_byte >> 1) & 0x3F <= 31
+    return 0x01 <= header_byte <= 0xAF
+
+
+def _parse_cc_data(data, pos, cc_type, words):
+    """Append the valid cc_data words of one cc_type from an A/53 cc_data() structure at pos."""
+    if pos + 2 > len(data) or not data[pos] & 0x40:  # process_cc_data_flag
+        return
+    count = data[pos] & 0x1F
+    pos += 2
+    for _ in range(count):
+        if pos + 3 > len(data):
+            return
+        marker = data[pos]
+        if marker & 0x04 and marker & 0x03 == cc_type:
+            words.append(data[pos + 1] << 8 | data[pos + 2])
+        pos += 3
+
+
+def _parse_t35(payload, cc_type, words):
+    """ATSC A/53 user_data_registered_itu_t_t35 payload (country, provider, GA94, type code)."""
+    if len(payload) < 8 or (payload[1] << 8 | payload[2]) != T35_PROVIDER_ATSC:
+        return
+    if bytes(payload[3:7]) != GA94 or payload[7] != USER_DATA_TYPE_CC:
+        return
+    _parse_cc_data(payload, 8, cc_type, words)
+
+
+def _parse_sei(rbsp, cc_type, words):
+    """Walk the messages of an SEI RBSP and parse the T.35 ones."""
+    pos = 0
+    size = len(rbsp)
+    while pos + 1 < size:
+        payload_type = 0
+        while pos < size and rbsp[pos] == 0xFF:
+            payload_type += 255
+            pos += 1
+        if pos >= size:
+            return
+        payload_type += rbsp[pos]
+        pos += 1
+        payload_size = 0
+        while pos < size and rbsp[pos] == 0xFF:
+            payload_size += 255
+            pos += 1
+        if pos >= size:
+            return
+        payload_size += rbsp[pos]
+        pos += 1
+        if payload_type == SEI_USER_DATA_REGISTERED:
+            _parse_t35(rbsp[pos : pos + payload_size], cc_type, words)
+        pos += payload_size
+
+
+def parse_picture_header(stream_type, head, cc_type=0):
+    """cc_data words of one cc_type (0 = field 1, 1 = field 2) in the bytes before a picture's first slice."""
+    words = []
+    pos = head.find(START_CODE)
+    while pos >= 0:
+        nal_start = pos + 3
+        pos = head.find(START_CODE, nal_start)
+        nal = head[nal_start : pos if pos >= 0 else len(head)]
+        if not nal:
+            continue
+        if stream_type == STREAM_TYPE_H264 and nal[0] & 0x1F == H264_SEI:
+            _parse_sei(nal[1:].replace(b"\x00\x00\x03", b"\x00\x00"), cc_type, words)
+        elif stream_type == STREAM_TYPE_H265 and (nal[0] >> 1) & 0x3F in (H265_SEI_PREFIX, H265_SEI_SUFFIX):
+            _parse_sei(nal[2:].replace(b"\x00\x00\x03", b"\x00\x00"), cc_type, words)
+        elif stream_type == STREAM_TYPE_H262 and nal[0] == H262_USER_DATA:
+            if bytes(nal[1:5]) == GA94 and len(nal) > 5 and nal[5] == USER_DATA_TYPE_CC:
+                _parse_cc_data(nal, 6, cc_type, words)
+    return words
+
+
+class _Picture(object):
+    """Video PES being collected: its timestamps and the bytes before its first slice."""
+
+    __slots__ = ("pts", "dts", "head", "scan", "done")
+
+    def __init__(self, pts, dts):
+        self.pts = pts
+        self.dts = dts
+        self.head = bytearray()
+        self.scan = 0
+        self.done = False
+
+    def feed(self, stream_type, chunk):
+        """Append payload bytes until the first slice start code (or the size cap) is reached."""
+        if self.done:
+            return
+        head = self.head
+        head += chunk
+        pos = head.find(START_CODE, self.scan)
+        while pos >= 0 and pos + 3 < len(head):
+            if _is_picture_data(stream_type, head[pos + 3]):
+                del head[pos:]
+                self.done = True
+                return
+            pos = head.find(START_CODE, pos + 3)
+        self.scan = pos if pos >= 0 else max(0, len(head) - 2)
+        if len(head) >= MAX_HEADER_BYTES:
+            self.done = True
+
+
+def _psi_section(buf, start, end):
+    """(table_id, section_start, section_end) of the PSI section starting in a packet payload."""
+    start += 1 + _BYTE.unpack_from(buf, start)[0]  # pointer_field
+    if start + 3 > end:
+        return None, 0, 0
+    table_id, length = struct.unpack_from(">BH", buf, start)
+    return table_id, start + 3, min(end, start + 3 + (length & 0x0FFF) - 4)  # minus CRC
+
+
+def iter_pictures(buf, field=1):
+    """Yield (pts, words) for each picture of the first video stream, in presentation order.
+
+    words are the picture's cc_data words for the caption field (1 or 2); pts are 90 kHz
+    ticks, unwrapped so they keep increasing past the 33-bit rollover.
+    """
+    packet_size, offset = detect_packet_layout(buf)
+    if packet_size is None:
+        return
+    cc_type = field - 1
+    try:
+        view = memoryview(buf)
+    except TypeError:  # Python 2 mmap objects do not export the buffer interface
+        view = buf
+    offset += packet_size - TS_PACKET_SIZE
+    size = len(buf)
+    pmt_pids = set()
+    video_pid = None
+    stream_type = None
+    picture = None
+    last_pts = None
+    pending = []
+    seq = 0
+
+    while offset + TS_PACKET_SIZE <= size:
+        sync, pid_flags, control = _TS_HEADER.unpack_from(buf, offset)
+        if sync != SYNC_BYTE:
+            # Lost sync: resume at the next byte that starts a run of packets
+            next_offset = offset + 1
+            while next_offset + TS_PACKET_SIZE <= size and _BYTE.unpack_from(buf, next_offset)[0] != SYNC_BYTE:
+                next_offset += 1
+            offset = next_offset
+            continue
+        packet_end = offset + TS_PACKET_SIZE
+        start = offset + 4
+        offset += packet_size
+        if not control & 0x10:  # no payload
+            continue
+        if control & 0x20:
+            start += 1 + _BYTE.unpack_from(buf, start)[0]
+        if start >= packet_end:
+            continue
+        pid = pid_flags & 0x1FFF
+        unit_start = pid_flags & 0x4000
+
+        if pid == video_pid:
+            if unit_start:
+                if picture is not None:
+                    seq += 1
+                    heapq.heappush(pending, (picture.pts, seq, parse_picture_header(stream_type, picture.head, cc_type)))
+                    while pending and (pending[0][0] < picture.dts or len(pending) > REORDER_DEPTH):
+                        entry = heapq.heappop(pending)
+                        yield entry[0], entry[2]
+                picture = None
+                if start + 9 <= packet_end:
+                    prefix, _, _, _, flags, header_length = _PES_HEADER.unpack_from(buf, start)
+                    if prefix == START_CODE and flags & 0x80 and start + 14 <= packet_end:
+                        pts = _unwrap(_read_timestamp(buf, start + 9), last_pts)
+                        dts = pts
+                        if flags & 0x40 and start + 19 <= packet_end:
+                            dts = _unwrap(_read_timestamp(buf, start + 14), pts)
+                        last_pts = pts
+                        picture = _Picture(pts, dts)
+                        start += 9 + header_length
+            if picture is not None and not picture.done and start < packet_end:
+                picture.feed(stream_type, view[start:packet_end])
+        elif pid == 0 and unit_start:
+            table_id, pos, end = _psi_section(buf, start, packet_end)
+            if table_id == 0x00:
+                for pos in range(pos + 5, end - 3, 4):
+                    program, pmt_pid = struct.unpack_from(">HH", buf, pos)
+                    if program:
+                        pmt_pids.add(pmt_pid & 0x1FFF)
+        elif pid in pmt_pids and unit_start and video_pid is None:
+            table_id, pos, end = _psi_section(buf, start, packet_end)
+            if table_id == 0x02 and pos + 9 <= end:
+                pos += 7 + (struct.unpack_from(">H", buf, pos + 7)[0] & 0x0FFF) + 2
+                while pos + 5 <= end:
+                    es_type, es_pid, info_length = struct.unpack_from(">BHH", buf, pos)
+                    if es_type in VIDEO_STREAM_TYPES:
+                        video_pid = es_pid & 0x1FFF
+                        stream_type = es_type
+                        break
+                    pos += 5 + (info_length & 0x0FFF)
+
+    if picture is not None:
+        seq += 1
+        heapq.heappush(pending, (picture.pts, seq, parse_picture_header(stream_type, picture.head, cc_type)))
+    while pending:
+        entry = heapq.heappop(pending)
+        yield entry[0], entry[2]
+
+
+def detect_ts_frame_rate(buf, sample=32):
+    """Guess the SCC frame rate from the spacing of the first pictures' PTS values."""
+    times = []
+    for pts, _ in iter_pictures(buf):
+        times.append(pts)
+        if len(times) >= sample:
+            break
+    deltas = [b - a for a, b in zip(times, times[1:]) if b > a]
+    if not deltas:
+        return "29.97 DF"
+    duration = min(deltas)
+    return min(_FRAME_DURATIONS, key=lambda item: abs(item[0] - duration))[1]
+
+
+def iter_scc_lines(buf, frame_rate=None, field=1, start_timecode="00:00:00:00"):
+    """Yield SCC caption lines ("HH:MM:SS:FF<tab>word word ...") for a transport stream.
+
+    The first picture plays at start_timecode. A line runs from the first caption pair
+    after padding to the next padding (or MAX_LINE_WORDS); a new line is also started
+    when a pair would otherwise play more than a frame away from its real time.
+    The frame rate is detected from the stream if not given.
+    """
+    if frame_rate is None:
+        frame_rate = detect_ts_frame_rate(buf)
+    num, den = frame_clock(frame_rate)
+    scale = PTS_CLOCK * den
+    start_frame = timestamp_to_frames(start_timecode, frame_rate)
+    first_pts = None
+    line_frame = 0
+    words = []
+
+    for pts, pairs in iter_pictures(buf, field):
+        if first_pts is None:
+            first_pts = pts
+        frame = start_frame + ((pts - first_pts) * num + scale // 2) // scale
+        for word in pairs:
+            if word & 0x7F7F == 0:  # padding (0x8080, or nulls without parity)
+                if words:
+                    yield "{0}\t{1}".format(frames_to_timestamp(line_frame, frame_rate), " ".join(words))
+                    words = []
+                continue
+            if words:
+                expected = line_frame + packet_frame_offset(len(words), frame_rate)
+                if abs(frame - expected) > 1 or len(words) >= MAX_LINE_WORDS:
+                    yield "{0}\t{1}".format(frames_to_timestamp(line_frame, frame_rate), " ".join(words))
+                    words = []
+            if not words:
+                line_frame = frame
+            words.append("{0:04x}".format(word))
+    if words:
+        yield "{0}\t{1}".format(frames_to_timestamp(line_frame, frame_rate), " ".join(words))
+
+
+def write_scc(buf, out, frame_rate=None, field=1, start_timecode="00:00:00:00"):
+    """Write a transport stream's captions to a text stream as an SCC file. Returns the line count."""
+    out.write(u"Scenarist_SCC V1.0\n")  # fmt: skip
+    count = 0
+    for line in iter_scc_lines(buf, frame_rate, field, start_timecode):
+        out.write(u"\n" + line + u"\n")  # fmt: skip
+        count += 1
+    return count
+
+
+def open_stream(path):
+    """Memory-map a transport stream file read-only. Returns (file, buffer); close both when done."""
+    f = open(path, "rb")
+    try:
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # empty file
+        return f, b""
+
+
+def extract_scc_text(path, frame_rate=None, field=1, start_timecode="00:00:00:00"):
+    """Extract a transport stream file's captions as SCC text."""
+    f, buf = open_stream(path)
+    try:
+        out = io.StringIO()
+        write_scc(buf, out, frame_rate, field, start_timecode)
+        return out.getvalue()
+    finally:
+        if not isinstance(buf, bytes):
+            buf.close()
+        f.close()
+
+
+def main(argv=None):
+    """Write the captions of INPUT.ts to OUTPUT.scc (or stdout)."""
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) not in (1, 2):
+        sys.stderr.write("Usage: scc_mpegts.py INPUT.ts [OUTPUT.scc]\n")
+        return 2
+    f, buf = open_stream(args[0])
+    try:
+        if len(args) == 2:
+            with io.open(args[1], "w", encoding="utf-8", newline="\n") as out:
+                count = write_scc(buf, out)
+        else:
+            count = write_scc(buf, sys.stdout)
+    finally:
+        if not isinstance(buf, bytes):
+            buf.close()
+        f.close()
+    sys.stderr.write("{0} caption lines\n".format(count))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
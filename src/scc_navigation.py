@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Navigation Module
+
+Sorted timestamp index for jumping to the line and packet that plays at a timecode.
+"""
+
+import array
+import bisect
+import re
+
+from scc_data import get_frame_rate_config
+from scc_timecode import frame_packet_offset, timestamp_to_frames
+
+# Accepts any of : ; . , as separators (QC reports and NLEs disagree on drop-frame notation)
+GOTO_TIMECODE_PATTERN = re.compile(r"^\s*(\d{1,2})[:;.,](\d{1,2})[:;.,](\d{1,2})[:;.,](\d{1,2})\s*$")
+
+
+def parse_goto_timecode(text, frame_rate):
+    """Parse a user-entered timecode into an absolute frame number.
+
+    Labels that drop-frame skips (frames 0 and 1 of most minutes) snap to the next valid label.
+    Returns None if the text is not a timecode or is out of range for the frame rate.
+    """
+    match = GOTO_TIMECODE_PATTERN.match(text or "")
+    if not match or not frame_rate:
+        return None
+    hh, mm, ss, ff = [int(g) for g in match.groups()]
+    config = get_frame_rate_config(frame_rate)
+    if mm > 59 or ss > 59 or ff >= config['videoFps']:
+        return None
+    if config['isDropFrame'] and ss == 0 and ff < 2 and mm % 10 != 0:
+        ff = 2
+    return timestamp_to_frames("{0:02d}:{1:02d}:{2:02d}:{3:02d}".format(hh, mm, ss, ff), frame_rate)
+
+
+class TimecodeIndex(object):
+    """Timestamped lines sorted by start frame, for O(log n) timecode lookups."""
+
+    def __init__(self, timestamp_map, frame_rate):
+        self.frame_rate = frame_rate
+        entries = []
+        if frame_rate:
+            for line_num, (ts_str, packet_count) in timestamp_map.items():
+                try:
+                    entries.append((timestamp_to_frames(ts_str, frame_rate), line_num, packet_count))
+                except (ValueError, TypeError, IndexError):
+                    continue
+        entries.sort()
+        self.starts = array.array("l", [e[0] for e in entries])
+        self.lines = array.array("l", [e[1] for e in entries])
+        self.packet_counts = array.array("l", [e[2] for e in entries])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def locate(self, frame):
+        """Find the line and packet that plays at frame.
+
+        Returns (line_num, packet_idx, exact) or None if frame precedes every line.
+        exact is False when frame falls after the line's last packet (a gap before the next line);
+        packet_idx then points at that last packet.
+        """
+        pos = bisect.bisect_right(self.starts, frame) - 1
+        if pos < 0:
+            return None
+        packet_idx = frame_packet_offset(frame - self.starts[pos], self.frame_rate)
+        packet_count = self.packet_counts[pos]
+        if packet_idx < packet_count:
+            return self.lines[pos], packet_idx, True
+        return self.lines[pos], max(0, packet_count - 1), False
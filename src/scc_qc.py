@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+SCC QC Module
+
+Caption compliance metrics gathered during the timing analysis: reading rate
+(characters per second and words per minute), display duration, the gap since the
+previous caption, characters per row and rows per caption. The analysis state machine
+feeds loading codes and EOC/EDM transitions to a QcMetrics; aggregates are kept as
+streaming statistics (count, min, max, mean and histogram-based percentiles) so memory
+does not grow with the file, and captions outside the thresholds are recorded as
+violations for the render plan to mark.
+"""
+
+from collections import namedtuple
+
+from scc_timecode import frame_clock
+
+# Compliance thresholds (seconds, characters, frames)
+QC_THRESHOLDS = {
+    "min_duration": 1.0,
+    "max_duration": 7.0,
+    "max_cps": 20.0,
+    "min_gap_frames": 2,
+    "max_chars_per_row": 32,
+    "max_rows": 4,
+}
+
+# Row used for text loaded before any PAC (608 decoders default to the bottom row)
+DEFAULT_ROW = 15
+
+# lines: the caption's load lines; kind: threshold key; value/limit: measured value and threshold
+QcViolation = namedtuple("QcViolation", ["lines", "kind", "value", "limit"])
+
+
+class StreamingStats(object):
+    """Count, min, max and mean of a stream of values, with approximate percentiles.
+
+    Values are counted in fixed-width buckets, so percentiles are accurate to the
+    bucket width and memory depends on the value range, not the number of values.
+    """
+
+    __slots__ = ("bucket", "count", "total", "minimum", "maximum", "histogram")
+
+    def __init__(self, bucket=1.0):
+        self.bucket = bucket
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.histogram = {}
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        key = int(value // self.bucket)
+        self.histogram[key] = self.histogram.get(key, 0) + 1
+
+    def merge(self, other):
+        """Add another StreamingStats' values (same bucket width) into this one."""
+        if not other.count:
+            return self
+        self.count += other.count
+        self.total += other.total
+        self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        for key, n in other.histogram.items():
+            self.histogram[key] = self.histogram.get(key, 0) + n
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p):
+        """Approximate p-th percentile (0-100), interpolated within its bucket and clamped to min/max."""
+        if not self.count:
+            return None
+        rank = p / 100.0 * self.count
+        seen = 0
+        for key in sorted(self.histogram):
+            n = self.histogram[key]
+            if seen + n >= rank:
+                value = (key + (rank - seen) / float(n)) * self.bucket
+                return max(self.minimum, min(self.maximum, value))
+            seen += n
+        return self.maximum
+
+
+class QcMetrics(object):
+    """Accumulates QC metrics for one analysis pass.
+
+    load() is called for each code while a caption is being loaded, erase_loading() on
+    ENM, display() on EOC and clear() on EDM. Only pop-on captions are measured; captions
+    that are never cleared count towards text metrics but not durations.
+    """
+
+    __slots__ = (
+        "frame_rate",
+        "thresholds",
+        "duration",
+        "gap",
+        "cps",
+        "wpm",
+        "chars_per_row",
+        "rows",
+        "violations",
+        "_seconds_per_frame",
+        "_loading",
+        "_row",
+        "_shown",
+        "_last_end",
+    )
+
+    def __init__(self, frame_rate, thresholds=None):
+        self.frame_rate = frame_rate
+        self.thresholds = dict(QC_THRESHOLDS, **(thresholds or {}))
+        self.duration = StreamingStats(0.1)
+        self.gap = StreamingStats(1)
+        self.cps = StreamingStats(0.5)
+        self.wpm = StreamingStats(5)
+        self.chars_per_row = StreamingStats(1)
+        self.rows = StreamingStats(1)
+        self.violations = []
+        num, den = frame_clock(frame_rate)
+        self._seconds_per_frame = float(den) / num
+        self._loading = {}
+        self._row = DEFAULT_ROW
+        self._shown = None  # (lines, start_frame, chars, words) of the displayed caption
+        self._last_end = None
+
+    def load(self, evt):
+        """Apply a parsed code to the caption being loaded."""
+        evt_type = evt["type"]
+        if evt_type == "TEXT":
+            row = self._loading.get(self._row)
+            if row is None:
+                row = self._loading[self._row] = []
+            if evt.get("is_extended") and row:
+                row[-1] = evt["text"]  # extended characters replace the fallback sent before them
+            else:
+                row.extend(evt["text"])
+        elif evt_type == "PAC":
+            self._row = evt["row"]
+        elif evt_type == "MIDROW":
+            self._loading.setdefault(self._row, []).append(" ")
+        elif evt_type == "CONTROL":
+            if evt["is_backspace"]:
+                row = self._loading.get(self._row)
+                if row:
+                    row.pop()
+            elif evt["is_newline"]:  # roll-up: rows scroll onto the screen without an EOC
+                self.erase_loading()
+
+    def erase_loading(self):
+        self._loading = {}
+        self._row = DEFAULT_ROW
+
+    def _violation(self, lines, kind, value):
+        self.violations.append(QcViolation(tuple(lines), kind, value, self.thresholds[kind]))
+
+    def display(self, lines, frame):
+        """EOC at frame: the displayed caption ends and the loaded one (from lines) appears."""
+        self.clear(frame)
+        row_texts = ["".join(chars).strip() for _, chars in sorted(self._loading.items())]
+        row_texts = [text for text in row_texts if text]
+        self._loading = {}
+        self._row = DEFAULT_ROW
+        if not row_texts or not lines:
+            return
+        limits = self.thresholds
+        for text in row_texts:
+            self.chars_per_row.add(len(text))
+        self.rows.add(len(row_texts))
+        widest = max(len(text) for text in row_texts)
+        if widest > limits["max_chars_per_row"]:
+            self._violation(lines, "max_chars_per_row", widest)
+        if len(row_texts) > limits["max_rows"]:
+            self._violation(lines, "max_rows", len(row_texts))
+        if self._last_end is not None and frame >= self._last_end:
+            gap = frame - self._last_end
+            self.gap.add(gap)
+            if 0 < gap < limits["min_gap_frames"]:
+                self._violation(lines, "min_gap_frames", gap)
+        words = sum(len(text.split()) for text in row_texts)
+        self._shown = (list(lines), frame, sum(len(text) for text in row_texts), words)
+
+    def clear(self, frame):
+        """EDM (or EOC) at frame: the displayed caption, if any, ends."""
+        if self._shown is None:
+            return
+        lines, start, chars, words = self._shown
+        self._shown = None
+        self._last_end = frame
+        seconds = (frame - start) * self._seconds_per_frame
+        if seconds <= 0:
+            return
+        limits = self.thresholds
+        self.duration.add(seconds)
+        cps = chars / seconds
+        self.cps.add(cps)
+        self.wpm.add(words * 60.0 / seconds)
+        if seconds < limits["min_duration"]:
+            self._violation(lines, "min_duration", seconds)
+        elif seconds > limits["max_duration"]:
+            self._violation(lines, "max_duration", seconds)
+        if cps > limits["max_cps"]:
+            self._violation(lines, "max_cps", cps)
+
+    def format_summary(self):
+        """One-line console summary of the aggregates, or None if no caption was measured."""
+        if not self.rows.count:
+            return None
+        parts = ["QC: {0} caption{1}".format(self.rows.count, "" if self.rows.count == 1 else "s")]
+        if self.duration.count:
+            d = self.duration
+            parts.append("duration {0:.1f}-{1:.1f}s (mean {2:.1f}s, p50 {3:.1f}s, p95 {4:.1f}s)".format(d.minimum, d.maximum, d.mean, d.percentile(50), d.percentile(95)))
+            parts.append("reading rate mean {0:.1f} cps / {1:.0f} wpm (p95 {2:.1f} cps, max {3:.1f} cps)".format(self.cps.mean, self.wpm.mean, self.cps.percentile(95), self.cps.maximum))
+        if self.gap.count:
+            parts.append("gaps min {0}f (p5 {1:.0f}f)".format(self.gap.minimum, self.gap.percentile(5)))
+        parts.append("chars/row max {0}, rows max {1}".format(self.chars_per_row.maximum, self.rows.maximum))
+        parts.append("{0} violation{1}".format(len(self.violations), "" if len(self.violations) == 1 else "s"))
+        return " | ".join(parts)
+
+
+_VIOLATION_FORMATS = {
+    "min_duration": "shown {0:.2f}s < {1}s",
+    "max_duration": "shown {0:.2f}s > {1}s",
+    "max_cps": "{0:.1f} cps > {1}",
+    "min_gap_frames": "{0}f gap < {1}f",
+    "max_chars_per_row": "{0} chars/row > {1}",
+    "max_rows": "{0} rows > {1}",
+}
+
+
+def describe_violation(violation):
+    """Short text for a violation, e.g. '23.5 cps > 20.0'."""
+    return _VIOLATION_FORMATS[violation.kind].format(violation.value, violation.limit)
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Render Module
+
+Editor-independent render plan: the indicator ranges, annotation bytes and error
+positions for a whole document. The plugin builds a plan once per analysis and
+replays it onto the editor, so an unchanged (or cached) document only needs a replay.
+"""
+
+import array
+
+from scc_errors import ErrorIndex, format_error_summary
+from scc_lines import ParsedLine, check_parity_fast  # noqa: F401 (check_parity_fast is re-exported)
+from scc_qc import describe_violation
+from scc_rules import CC_BUFFER_OVERFLOW, INDICATOR_ERROR, INDICATOR_PARITY, INDICATOR_QC, PARITY_ERROR, RuleRun
+from scc_xds import describe_packet
+
+STYLE_ANNOTATION = 20
+STYLE_ANNOTATION_ITALIC = 21
+STYLE_ANNOTATION_TIMING = 22
+STYLE_ANNOTATION_NEWLINE = 23
+STYLE_ANNOTATION_DIFF = 24
+STYLE_ANNOTATION_ERROR_SUMMARY = 25
+STYLE_ANNOTATION_XDS = 26
+STYLE_ANNOTATION_QC = 27
+
+
+def line_start_positions(lines):
+    """Document (UTF-8 byte) position of the start of each line."""
+    starts = {}
+    pos = 0
+    for line_num, line_text in enumerate(lines):
+        starts[line_num] = pos
+        pos += len(line_text.encode("utf-8")) if not isinstance(line_text, bytes) else len(line_text)
+    return starts
+
+
+def annotation_bytes(segments, start_time=None, end_time=None, never_displayed=False, qc_note=None):
+    """Encode a line's decoded segments as annotation text and per-byte style bytes.
+
+    qc_note (e.g. "QC: 23.5 cps > 20.0") is shown after the timing.
+
+    Returns: (text_bytes, style_bytes), or None if there is nothing to show.
+    """
+    if not segments:
+        return None
+
+    final_segments = []
+    if never_displayed:
+        final_segments.append((" | ", "timing"))
+        final_segments.append((u"⚠ never displayed", "error_summary"))  # fmt: skip
+        final_segments.append((" | ", "timing"))
+    elif start_time and end_time:
+        final_segments.append((" | {0} -> {1} | ".format(start_time, end_time), "timing"))
+    if qc_note:
+        final_segments.append((qc_note, "qc"))
+        final_segments.append((" | ", "timing"))
+
+    for text, style_info in segments:
+        if style_info == "newline":
+            final_segments.append((text, "newline"))
+        elif "\n" in text:
+            parts = text.split("\n")
+            for j, part in enumerate(parts):
+                if j > 0:
+                    final_segments.append(("\u23ce", "newline"))
+                if part:
+                    final_segments.append((part, style_info))
+        else:
+            final_segments.append((text, style_info))
+
+    full_text_bytes = b""
+    style_bytes = bytearray()
+
+    for text, style_info in final_segments:
+        chunk_bytes = text.encode("utf-8")
+        full_text_bytes += chunk_bytes
+
+        if style_info == "timing":
+            style_id = STYLE_ANNOTATION_TIMING
+        elif style_info == "error_summary":
+            style_id = STYLE_ANNOTATION_ERROR_SUMMARY
+        elif style_info == "newline":
+            style_id = STYLE_ANNOTATION_NEWLINE
+        elif style_info == "xds":
+            style_id = STYLE_ANNOTATION_XDS
+        elif style_info == "qc":
+            style_id = STYLE_ANNOTATION_QC
+        elif style_info:
+            style_id = STYLE_ANNOTATION_ITALIC
+        else:
+            style_id = STYLE_ANNOTATION
+
+        style_bytes.extend([style_id] * len(chunk_bytes))
+
+    return full_text_bytes, bytes(style_bytes)
+
+
+class RenderPlan(object):
+    """Everything needed to redraw a document's indicators and annotations.
+
+    Ranges are flat arrays of (position, length) pairs; annotations are
+    (line_num, text_bytes, style_bytes) tuples. qc_ranges mark the timestamps of
+    captions that break a QC threshold and qc_summary holds the QC aggregates line.
+    """
+
+    __slots__ = ("error_ranges", "parity_ranges", "pair_ranges", "qc_ranges", "annotations", "error_index", "qc_summary")
+
+    def __init__(self):
+        self.error_ranges = array.array("l")
+        self.parity_ranges = array.array("l")
+        self.pair_ranges = array.array("l")
+        self.qc_ranges = array.array("l")
+        self.annotations = []
+        self.error_index = ErrorIndex()
+        self.qc_summary = None
+
+    def to_data(self):
+        """Plain tuples/lists/bytes only, for marshal."""
+        index = self.error_index
+        return (
+            self.error_ranges.tolist(),
+            self.parity_ranges.tolist(),
+            self.pair_ranges.tolist(),
+            self.qc_ranges.tolist(),
+            self.annotations,
+            (index.positions.tolist(), index.types, index.labels),
+            self.qc_summary,
+        )
+
+    @classmethod
+    def from_data(cls, data):
+        """Rebuild a plan from to_data() output."""
+        error_ranges, parity_ranges, pair_ranges, qc_ranges, annotations, errors, qc_summary = data
+        plan = cls()
+        plan.error_ranges = array.array("l", error_ranges)
+        plan.parity_ranges = array.array("l", parity_ranges)
+        plan.pair_ranges = array.array("l", pair_ranges)
+        plan.qc_ranges = array.array("l", qc_ranges)
+        plan.annotations = [tuple(a) for a in annotations]
+        plan.qc_summary = qc_summary
+        for pos, error_type, label in zip(*errors):
+            plan.error_index.add(pos, error_type, label)
+        plan.error_index.finish()
+        return plan
+
+
+def shown_annotations(plan):
+    """{line_num: (text_bytes, style_bytes)} as displayed: the plan's annotations, with the error summary on line 0."""
+    shown = dict((line_num, (text_bytes, style_bytes)) for line_num, text_bytes, style_bytes in plan.annotations)
+    summary = format_error_summary(plan.error_index)
+    if summary:
+        summary_bytes = summary.encode("utf-8")
+        shown[0] = (summary_bytes, bytes(bytearray([STYLE_ANNOTATION_ERROR_SUMMARY] * len(summary_bytes))))
+    return shown
+
+
+def annotation_changes(plan, previous=None):
+    """Annotations to set to display plan, as (line_num, text_bytes, style_bytes) in line order.
+
+    With previous (the plan currently displayed, on the same line layout) only lines whose
+    annotation differs are listed; lines that no longer have one get None text and styles.
+    """
+    shown = shown_annotations(plan)
+    if previous is None:
+        return [(line_num,) + shown[line_num] for line_num in sorted(shown)]
+    before = shown_annotations(previous)
+    changes = [(line_num,) + annotation for line_num, annotation in shown.items() if before.get(line_num) != annotation]
+    changes.extend((line_num, None, None) for line_num in before if line_num not in shown)
+    changes.sort(key=lambda change: change[0])
+    return changes
+
+
+def _mark_hits(plan, rules, hits, line_starts, parsed=None):
+    """Index each hit and mark it with its rule's indicator. parsed is the ParsedLine of the hits' line."""
+    indicator_ranges = {INDICATOR_ERROR: plan.error_ranges, INDICATOR_PARITY: plan.parity_ranges, INDICATOR_QC: plan.qc_ranges}
+    for hit in hits:
+        if hit.rule == PARITY_ERROR:
+            word = parsed.words[hit.data]
+            if word.is_paired and word.start > word.pair_start:
+                continue  # a doubled command is marked once
+        pos = line_starts[hit.line] + hit.start
+        ranges = indicator_ranges.get(rules.get(hit.rule).indicator)
+        if ranges is not None:
+            ranges.extend((pos, hit.end - hit.start))
+            if hit.rule == CC_BUFFER_OVERFLOW:
+                # The packets past the next line's start, on top of the timestamp
+                first_late = parsed.packet_count - hit.data
+                for code in parsed.codes:
+                    if code.packet_idx >= first_late:
+                        ranges.extend((line_starts[hit.line] + code.word.pair_start, code.word.pair_end - code.word.pair_start))
+        plan.error_index.add(pos, hit.rule, hit.timestamp or "line {0}".format(hit.line + 1))
+
+
+def _qc_notes(qc):
+    """Map each violating caption's first load line to its QC note."""
+    notes = {}
+    for violation in qc.violations:
+        notes.setdefault(violation.lines[0], []).append(describe_violation(violation))
+    return dict((line_num, "QC: " + ", ".join(texts)) for line_num, texts in notes.items())
+
+
+def build_render_plan(time_map, timestamp_index, line_texts, line_starts, text_index=None, qc=None, line_cache=None, rules=None, xds=True):
+    """Collect indicator ranges, annotations and errors for every non-empty line.
+
+    line_starts maps line numbers to document positions. If text_index is given,
+    lines whose text changed are re-indexed from their decoded segments.
+    Errors come from one RuleRun over the lines with rules (a scc_rules.RuleSet, the
+    default RULES if None): each hit is indexed and marked with its rule's indicator,
+    and overflows also mark the packets past the next line's start. XDS packets are
+    assembled by the same walk (unless xds is False); each is annotated on the line
+    where it ends and its words are left out of the caption text. With time_map None
+    nothing is decoded: only the line rules run and no annotations are made.
+    If qc (the QcMetrics filled by the analysis) is given, violating captions get a QC
+    indicator on their first timestamp and a note in their annotation.
+    Lines are read from line_cache (the LineCache filled by the analysis) when given.
+    """
+    plan = RenderPlan()
+    qc_notes = _qc_notes(qc) if qc is not None else {}
+    if qc is not None:
+        plan.qc_summary = qc.format_summary()
+    pair_ranges = plan.pair_ranges
+    run = RuleRun(rules, timestamp_index, time_map, xds)
+
+    for line_num in sorted(line_texts):
+        text = line_texts[line_num]
+        line_start_pos = line_starts[line_num]
+        parsed = line_cache.get(line_num, text) if line_cache is not None else ParsedLine(text)
+
+        qc_note = qc_notes.get(line_num)
+        if qc_note and parsed.timestamp is not None:
+            plan.qc_ranges.extend((line_start_pos + parsed.ts_start, parsed.ts_end - parsed.ts_start))
+
+        ctx = run.line(line_num, parsed)
+        _mark_hits(plan, run.rules, ctx.hits, line_starts, parsed)
+
+        for code in parsed.codes:
+            word = code.word
+            if word.is_paired:
+                pair_ranges.extend((line_start_pos + word.pair_start, word.pair_end - word.pair_start))
+
+        xds_segments = []
+        for packet in ctx.xds_packets:
+            if xds_segments:
+                xds_segments.append((u"⏎", "newline"))  # fmt: skip
+            xds_segments.append((describe_packet(packet), "xds"))
+
+        segments = ctx.segments
+        if text_index is not None:
+            text_index.set_line(line_num, text, segments)
+        if segments:
+            times = ctx.times
+            is_never_displayed = times is None or times[1] is None
+            if xds_segments:
+                segments = segments + [(u"⏎", "newline")] + xds_segments  # fmt: skip
+            encoded = annotation_bytes(segments, times[0] if times else None, times[1] if times else None, is_never_displayed, qc_note)
+            plan.annotations.append((line_num, encoded[0], encoded[1]))
+        elif xds_segments:
+            encoded = annotation_bytes(xds_segments)
+            plan.annotations.append((line_num, encoded[0], encoded[1]))
+
+    _mark_hits(plan, run.rules, run.end(), line_starts)
+    if text_index is not None:
+        text_index.retain(line_texts)
+    plan.error_index.finish()
+    return plan
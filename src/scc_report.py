@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Report Module
+
+Machine-readable findings for pipelines and code-review tooling. iter_findings() walks
+a document line by line and yields each parity error, invalid timestamp, CC buffer
+overflow, timing issue (out-of-order, duplicate or overlapping starts, long gaps),
+never-displayed caption and XDS error as soon as its line has been checked;
+the writers turn findings into JSON Lines or a SARIF 2.1.0 log as they arrive. Nothing
+is collected between the two, so an error-ridden file reports with the same memory as
+a clean one: the timing analysis plus one line's findings.
+"""
+
+import argparse
+import io
+import json
+import sys
+from collections import namedtuple
+
+from scc_analysis import TIMING_ISSUES, TimestampIndex, build_time_map_lines, build_time_map_parallel, describe_timing_issue
+from scc_decoder import TIMESTAMP_PATTERN
+from scc_lines import ParsedLine, TextLines
+from scc_rules import CC_BUFFER_OVERFLOW, INVALID_TIMESTAMP, NEVER_DISPLAYED, PARITY_ERROR, RULES, RuleRun
+from scc_timecode import detect_frame_rate, frames_to_timestamp, packet_frame_offset
+from scc_xds import XDS_CHECKSUM_ERROR, XDS_UNTERMINATED
+
+# rule: an ERROR_TYPES key; line/column: 1-based, end_column exclusive; timecode: when the
+# flagged packet plays (or the line's timestamp); packets: overflowing packets, else None
+Finding = namedtuple("Finding", ["rule", "line", "column", "end_column", "timecode", "message", "packets"])
+
+SARIF_VERSION = "2.1.0"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+TOOL_NAME = "SCC Inspector"
+
+_MESSAGES = {
+    NEVER_DISPLAYED: "Caption is loaded but never displayed",
+    XDS_CHECKSUM_ERROR: "XDS packet checksum does not match",
+    XDS_UNTERMINATED: "XDS packet is never terminated",
+}
+
+
+def _packet_timecode(parsed, packet_idx, frame_rate):
+    """Timecode at which the packet_idx-th packet of a parsed line plays."""
+    if parsed.frame is None or not parsed.ts_valid:
+        return parsed.timestamp
+    return frames_to_timestamp(parsed.frame + packet_frame_offset(packet_idx, frame_rate), frame_rate)
+
+
+def _line_label(lines, line_num):
+    """Timestamp of a line for messages, or its line number if it has none."""
+    match = TIMESTAMP_PATTERN.search(lines[line_num])
+    return match.group(0) if match else "line {0}".format(line_num + 1)
+
+
+def _finding(hit, parsed, lines, frame_rate, timestamp_index, rules):
+    """The Finding for a rule hit, or None for the repeated word of a doubled command."""
+    line, column, end_column, timecode = hit.line + 1, hit.start + 1, hit.end + 1, hit.timestamp
+    if hit.rule == PARITY_ERROR:
+        word = parsed.words[hit.data]
+        if word.is_paired and word.start > word.pair_start:
+            return None
+        timecode = _packet_timecode(parsed, hit.data, frame_rate)
+        return Finding(hit.rule, line, column, end_column, timecode, "Invalid SCC code {0} (parity check failed)".format(word.text), None)
+    if hit.rule == INVALID_TIMESTAMP:
+        return Finding(hit.rule, line, column, end_column, timecode, "Invalid timestamp {0}".format(timecode), None)
+    if hit.rule == CC_BUFFER_OVERFLOW:
+        next_ts = _line_label(lines, timestamp_index.next_line(hit.line))
+        message = "CC buffer overflow: {0} packet{1} still playing at {2}".format(hit.data, "" if hit.data == 1 else "s", next_ts)
+        return Finding(hit.rule, line, column, end_column, timecode, message, hit.data)
+    if hit.rule in TIMING_ISSUES:
+        return Finding(hit.rule, line, column, end_column, timecode, describe_timing_issue(hit.data, frame_rate), None)
+    return Finding(hit.rule, line, column, end_column, timecode, _MESSAGES.get(hit.rule) or rules.get(hit.rule).description, None)
+
+
+def iter_findings(lines, frame_rate, time_map=None, timestamp_index=None, line_cache=None, rules=None, workers=None):
+    """Yield a Finding for every problem in lines, one line at a time.
+
+    time_map and timestamp_index are the results of the timing analysis; they are
+    computed from lines if not given (the plugin passes the ones it already has, and its
+    LineCache as line_cache), on workers processes if given (see build_time_map_parallel).
+    Problems are found by one RuleRun with rules (the default RULES if None); findings
+    within a line are in rule order, and XDS packets that are never terminated are
+    reported at the end of the document.
+    """
+    if time_map is None or timestamp_index is None:
+        if workers is not None:
+            time_map, timestamp_map, _ = build_time_map_parallel(lines, frame_rate, workers)
+        else:
+            time_map, timestamp_map, _ = build_time_map_lines(lines, frame_rate, line_cache=line_cache)
+        timestamp_index = TimestampIndex(timestamp_map, frame_rate)
+    run = RuleRun(rules, timestamp_index, time_map)
+    for line_num, text in enumerate(lines):
+        if not text or text.isspace():
+            continue
+        parsed = line_cache.get(line_num, text) if line_cache is not None else ParsedLine(text, frame_rate)
+        for hit in run.line(line_num, parsed).hits:
+            finding = _finding(hit, parsed, lines, frame_rate, timestamp_index, run.rules)
+            if finding is not None:
+                yield finding
+
+    for hit in run.end():
+        yield _finding(hit, None, lines, frame_rate, timestamp_index, run.rules)
+
+
+def iter_text_findings(text, workers=None):
+    """Detect the frame rate of SCC text and yield its findings. Returns (frame_rate, findings)."""
+    frame_rate, _ = detect_frame_rate(text)
+    if frame_rate == "INVALID":
+        frame_rate = None
+    return frame_rate, iter_findings(TextLines(text), frame_rate, workers=workers)
+
+
+def finding_record(finding, uri=None):
+    """JSON-serializable dict of a finding."""
+    record = dict(finding._asdict())
+    record["file"] = uri
+    return record
+
+
+class JsonLinesWriter(object):
+    """Writes each finding as one JSON object per line to a binary stream."""
+
+    __slots__ = ("out", "count")
+
+    def __init__(self, out):
+        self.out = out
+        self.count = 0
+
+    def write(self, finding, uri=None):
+        self.out.write(json.dumps(finding_record(finding, uri), sort_keys=True).encode("utf-8") + b"\n")
+        self.count += 1
+
+    def close(self):
+        self.out.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SarifWriter(object):
+    """Streams a SARIF 2.1.0 log with one run to a binary stream.
+
+    The log header (tool and rule metadata, from rules or the default RULES) is written
+    up front, each result is appended as it is written and close() ends the document, so
+    results are never held.
+    """
+
+    __slots__ = ("out", "count", "_rule_index", "_levels", "_closed")
+
+    def __init__(self, out, rules=None):
+        self.out = out
+        self.count = 0
+        rules = list(rules if rules is not None else RULES)
+        self._rule_index = dict((rule.name, i) for i, rule in enumerate(rules))
+        self._levels = dict((rule.name, rule.severity) for rule in rules)
+        self._closed = False
+        metadata = [
+            {
+                "id": rule.name,
+                "shortDescription": {"text": rule.description},
+                "defaultConfiguration": {"level": rule.severity},
+            }
+            for rule in rules
+        ]
+        run = {"tool": {"driver": {"name": TOOL_NAME, "rules": metadata}}, "columnKind": "unicodeCodePoints"}
+        header = json.dumps({"$schema": SARIF_SCHEMA, "version": SARIF_VERSION}, sort_keys=True)[:-1]
+        run_json = json.dumps(run, sort_keys=True)[:-1]
+        self._write('{0}, "runs": [{1}, "results": ['.format(header, run_json))
+
+    def _write(self, text):
+        self.out.write(text.encode("utf-8"))
+
+    def write(self, finding, uri=None):
+        region = {"startLine": finding.line, "startColumn": finding.column, "endColumn": finding.end_column}
+        location = {"physicalLocation": {"artifactLocation": {"uri": uri or ""}, "region": region}}
+        properties = {"timecode": finding.timecode}
+        if finding.packets is not None:
+            properties["packets"] = finding.packets
+        result = {
+            "ruleId": finding.rule,
+            "ruleIndex": self._rule_index[finding.rule],
+            "level": self._levels[finding.rule],
+            "message": {"text": finding.message},
+            "locations": [location],
+            "properties": properties,
+        }
+        self._write((",\n" if self.count else "\n") + json.dumps(result, sort_keys=True))
+        self.count += 1
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._write("\n]}]}\n")
+        self.out.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+WRITERS = {"jsonl": JsonLinesWriter, "sarif": SarifWriter}
+
+
+def report_file(path, writer, uri=None, workers=None):
+    """Write the findings of one SCC file to writer. Returns the number written."""
+    with io.open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        text = f.read()
+    _, findings = iter_text_findings(text, workers)
+    count = 0
+    for finding in findings:
+        writer.write(finding, uri or path)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    """Write the findings of SCC files as JSON Lines or SARIF."""
+    parser = argparse.ArgumentParser(prog="scc_report.py", description="Write the findings of SCC files as JSON Lines or SARIF.")
+    parser.add_argument("files", nargs="+", metavar="FILE")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="jsonl", help="output format (default: jsonl)")
+    parser.add_argument("-o", "--output", help="output file (default: standard output)")
+    parser.add_argument("--workers", type=int, help="processes for the timing analysis of large files (default: 1)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "wb") if args.output else getattr(sys.stdout, "buffer", sys.stdout)
+    total = 0
+    try:
+        with WRITERS[args.format](out) as writer:
+            for path in args.files:
+                try:
+                    total += report_file(path, writer, workers=args.workers)
+                except (IOError, OSError) as e:
+                    sys.stderr.write("{0}: {1}\n".format(path, e))
+                    return 2
+    finally:
+        if args.output:
+            out.close()
+    return 1 if total else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
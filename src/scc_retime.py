@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Retime Module
+
+Shifts every timestamp in an SCC file by an offset and/or converts it to another
+frame rate. Timestamps are turned into absolute frame numbers, shifted, rescaled
+by the ratio of the two frame clocks and labelled again, so drop-frame boundaries
+are exact and nothing drifts. Lines are streamed and only the timestamp of each
+line is rewritten; the packet words are copied through untouched. The new
+timestamps are checked for CC buffer overflow on the way, and many files can be
+retimed in parallel on a process pool.
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+from collections import namedtuple
+
+from scc_analysis import TimestampIndex
+from scc_decoder import HEX_PATTERN, TIMESTAMP_PATTERN
+from scc_lines import TextLines
+from scc_timecode import detect_frame_rate, frame_clock, frames_to_timestamp, timestamp_to_frames
+
+# Bytes read from the start of a file to detect its frame rate
+DETECT_BYTES = 65536
+
+# lines: timestamped lines rewritten; frame_rate: output frame rate;
+# overflows: (line_num, overflow_packet_count) for every line whose packets now run into the next line
+RetimeResult = namedtuple("RetimeResult", ["lines", "frame_rate", "overflows"])
+
+
+def parse_offset(offset, frame_rate):
+    """Turn an offset into a signed frame count.
+
+    Accepts an int (frames) or a timecode string with an optional sign, e.g. "-01:00:00:00"
+    or "+00:00:10;00", read in frame_rate.
+    """
+    if isinstance(offset, int):
+        return offset
+    text = offset.strip()
+    sign = -1 if text.startswith("-") else 1
+    text = text.lstrip("+-")
+    if not TIMESTAMP_PATTERN.match(text):
+        try:
+            return sign * int(text)
+        except ValueError:
+            raise ValueError("Invalid offset: {0!r}".format(offset))
+    return sign * timestamp_to_frames(text, frame_rate)
+
+
+class FrameConverter(object):
+    """Maps a source frame number to the shifted, rescaled target frame number with integer math only."""
+
+    __slots__ = ("offset", "num", "den")
+
+    def __init__(self, frame_rate, offset=0, to_rate=None):
+        src_num, src_den = frame_clock(frame_rate)
+        dst_num, dst_den = frame_clock(to_rate or frame_rate)
+        self.offset = offset
+        # target = (source + offset) * (dst_num / dst_den) / (src_num / src_den)
+        self.num = dst_num * src_den
+        self.den = src_num * dst_den
+
+    def __call__(self, frame):
+        frame += self.offset
+        if self.num == self.den:
+            return frame
+        return (2 * frame * self.num + self.den) // (2 * self.den)
+
+
+def iter_retimed_lines(lines, frame_rate, offset=0, to_rate=None, timestamps=None):
+    """Yield lines with their timestamp shifted by offset and relabelled in to_rate.
+
+    Lines without a timestamp are yielded unchanged. If timestamps is a list, it is extended
+    with (line_num, new_frame, packet_count) for overflow validation.
+    Raises ValueError if a timestamp would move before 00:00:00:00.
+    """
+    to_rate = to_rate or frame_rate
+    convert = FrameConverter(frame_rate, parse_offset(offset, frame_rate), to_rate)
+    for line_num, line_text in enumerate(lines):
+        match = TIMESTAMP_PATTERN.search(line_text)
+        if not match:
+            yield line_text
+            continue
+        frame = convert(timestamp_to_frames(match.group(0), frame_rate))
+        if frame < 0:
+            raise ValueError("Line {0}: {1} would move before 00:00:00:00".format(line_num + 1, match.group(0)))
+        new_ts = frames_to_timestamp(frame, to_rate)
+        if timestamps is not None:
+            timestamps.append((line_num, frame, len(HEX_PATTERN.findall(line_text, match.end()))))
+        yield line_text[: match.start()] + new_ts + line_text[match.end() :]
+
+
+def find_overflows(timestamps, frame_rate):
+    """(line_num, overflow_packet_count) for every timestamped line that runs into the next one.
+
+    timestamps: (line_num, start_frame, packet_count) in file order, as collected by iter_retimed_lines.
+    """
+    index = TimestampIndex.from_frames(timestamps, frame_rate)
+    overflows = []
+    for line_num in index.lines:
+        is_overflow, count = index.overflow(line_num)
+        if is_overflow:
+            overflows.append((line_num, count))
+    return overflows
+
+
+def retime_stream(src, dst, frame_rate, offset=0, to_rate=None):
+    """Retime the lines of text stream src into text stream dst. Returns a RetimeResult."""
+    to_rate = to_rate or frame_rate
+    timestamps = []
+    for line_text in iter_retimed_lines(src, frame_rate, offset, to_rate, timestamps):
+        dst.write(line_text)
+    return RetimeResult(len(timestamps), to_rate, find_overflows(timestamps, to_rate))
+
+
+def retime_text(text, frame_rate, offset=0, to_rate=None):
+    """Retime SCC text held in memory. Returns (new_text, RetimeResult)."""
+    to_rate = to_rate or frame_rate
+    timestamps = []
+    new_text = "".join(iter_retimed_lines(TextLines(text), frame_rate, offset, to_rate, timestamps))
+    return new_text, RetimeResult(len(timestamps), to_rate, find_overflows(timestamps, to_rate))
+
+
+def _detect_file_rate(path):
+    with io.open(path, "r", encoding="utf-8") as f:
+        rate, _ = detect_frame_rate(f.read(DETECT_BYTES))
+    if rate == "INVALID":
+        raise ValueError("{0}: cannot detect the frame rate".format(path))
+    return rate
+
+
+def retime_file(src_path, dst_path, offset=0, frame_rate=None, to_rate=None):
+    """Retime one SCC file into dst_path (which may not be src_path). Detects the frame rate if not given."""
+    if os.path.abspath(src_path) == os.path.abspath(dst_path):
+        raise ValueError("{0}: output would overwrite the input".format(src_path))
+    if frame_rate is None:
+        frame_rate = _detect_file_rate(src_path)
+    with io.open(src_path, "r", encoding="utf-8", newline="") as src:
+        with io.open(dst_path, "w", encoding="utf-8", newline="") as dst:
+            return retime_stream(src, dst, frame_rate, offset, to_rate)
+
+
+def _retime_job(task):
+    """Process pool worker: retime one file, returning (src_path, result, error)."""
+    src_path, dst_path, offset, frame_rate, to_rate = task
+    try:
+        return src_path, retime_file(src_path, dst_path, offset, frame_rate, to_rate), None
+    except (IOError, OSError, ValueError) as e:
+        return src_path, None, str(e)
+
+
+def retime_files(jobs, offset=0, frame_rate=None, to_rate=None, workers=None):
+    """Retime many files, (src_path, dst_path) pairs, in parallel.
+
+    Returns [(src_path, RetimeResult or None, error or None)] in job order; one bad file
+    does not stop the others. Runs serially for a single job or worker.
+    """
+    tasks = [(src, dst, offset, frame_rate, to_rate) for src, dst in jobs]
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1 or len(tasks) <= 1:
+        return [_retime_job(task) for task in tasks]
+    pool = multiprocessing.Pool(min(workers, len(tasks)))
+    try:
+        return pool.map(_retime_job, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(argv=None):
+    """Retime SCC files: scc_retime.py [--offset TC] [--from RATE] [--to RATE] [--jobs N] INPUT... OUTPUT."""
+    parser = argparse.ArgumentParser(prog="scc_retime.py", description="Shift and/or convert the timestamps of SCC files.")
+    parser.add_argument("--offset", default="0", help='frames or a signed timecode, e.g. "-01:00:00:00"')
+    parser.add_argument("--from", dest="frame_rate", help="source frame rate (detected if omitted)")
+    parser.add_argument("--to", dest="to_rate", help='target frame rate, e.g. "29.97 DF"')
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("inputs", nargs="+", metavar="INPUT")
+    parser.add_argument("output", metavar="OUTPUT", help="output file, or a directory when retiming several files")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.output):
+        jobs = [(path, os.path.join(args.output, os.path.basename(path))) for path in args.inputs]
+    elif len(args.inputs) == 1:
+        jobs = [(args.inputs[0], args.output)]
+    else:
+        parser.error("OUTPUT must be a directory when retiming several files")
+
+    status = 0
+    for src_path, result, error in retime_files(jobs, args.offset, args.frame_rate, args.to_rate, args.jobs):
+        if error:
+            sys.stderr.write("{0}: {1}\n".format(src_path, error))
+            status = 1
+            continue
+        sys.stderr.write("{0}: {1} lines retimed to {2}".format(src_path, result.lines, result.frame_rate))
+        if result.overflows:
+            sys.stderr.write(", CC buffer overflow on lines {0}".format(", ".join(str(line + 1) for line, _ in result.overflows)))
+            status = 1
+        sys.stderr.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
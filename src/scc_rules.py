@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Rules Module
+
+Validation rules and the traversal that dispatches them. Each check is a Rule in a
+RuleSet, subscribed to the events it needs: WORD (each hex word of a line), LINE (each
+non-empty line), CAPTION (each line that loads caption text, once its display times
+are known) and END (after the last line). A RuleRun walks the document once and calls
+every enabled rule from that walk; the render plan, the findings reports and the hover
+error checks all take their errors from it, so a new check is one more registered rule
+rather than another pass or another branch in each of them. Every rule has its own
+enable flag, severity (the SARIF level) and indicator, and counts its calls, its hits
+and the time spent in it, so the expensive ones show up on large files.
+"""
+
+import timeit
+from collections import namedtuple
+
+from scc_analysis import DUPLICATE_TIMESTAMP, PACKET_OVERLAP, TIMECODE_GAP, TIMECODE_ORDER
+from scc_errors import ERROR_TYPES
+from scc_xds import XDS_CHECKSUM_ERROR, XDS_UNTERMINATED, XdsDecoder
+
+# Events a rule can subscribe to
+WORD = "word"
+LINE = "line"
+CAPTION = "caption"
+END = "end"
+EVENTS = (WORD, LINE, CAPTION, END)
+
+# Indicators a rule's hits can be marked with (None: indexed and summarized, not marked)
+INDICATOR_ERROR = "error"
+INDICATOR_PARITY = "parity"
+INDICATOR_QC = "qc"
+
+INVALID_TIMESTAMP = "invalid_timestamp"
+PARITY_ERROR = "parity_error"
+CC_BUFFER_OVERFLOW = "cc_buffer_overflow"
+NEVER_DISPLAYED = "never_displayed"
+
+# rule: the reporting rule's name; line: 0-based; start/end: column range (end exclusive);
+# timestamp: the timestamp string of that line (None if it has none); data: rule-specific
+Hit = namedtuple("Hit", ["rule", "line", "start", "end", "timestamp", "data"])
+
+_timer = timeit.default_timer
+_DESCRIPTIONS = dict((name, singular[:1].upper() + singular[1:]) for name, singular, _ in ERROR_TYPES)
+
+
+class Rule(object):
+    """One check, named after the error type it reports.
+
+    Subclasses implement a handler for each event in events: word(ctx, packet_idx, word),
+    line(ctx), caption(ctx) or end(run), reporting problems through ctx.report() or
+    ctx.report_at() (run.report_at() for end). severity is the SARIF level of its
+    findings and indicator the one its hits are marked with.
+    """
+
+    __slots__ = ("name", "events", "description", "enabled", "severity", "indicator", "calls", "hits", "seconds", "_default_indicator")
+
+    def __init__(self, name, events, severity="error", indicator=INDICATOR_ERROR, description=None):
+        self.name = name
+        self.events = events
+        self.description = description or _DESCRIPTIONS.get(name, name)
+        self.enabled = True
+        self.severity = severity
+        self.indicator = self._default_indicator = indicator
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+    def reset_stats(self):
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+
+class InvalidTimestampRule(Rule):
+    """Timestamps out of range (e.g. minute 60 or a frame past the frame rate)."""
+
+    __slots__ = ()
+
+    def __init__(self):
+        Rule.__init__(self, INVALID_TIMESTAMP, (LINE,))
+
+    def line(self, ctx):
+        parsed = ctx.parsed
+        if parsed.timestamp is not None and not parsed.ts_valid:
+            ctx.report(self, parsed.ts_start, parsed.ts_end)
+
+
+class ParityRule(Rule):
+    """Words with a byte that fails the odd parity check; data is the packet index.
+
+    Parsing already flags them, so this reads the flags once per line instead of being
+    called for every word. The second word of a doubled command is reported too (a hover
+    on it explains the error); marks and findings are made once per command.
+    """
+
+    __slots__ = ()
+
+    def __init__(self):
+        Rule.__init__(self, PARITY_ERROR, (LINE,), indicator=INDICATOR_PARITY)
+
+    def line(self, ctx):
+        words = ctx.parsed.words
+        for packet_idx in ctx.parsed.bad_parity:
+            word = words[packet_idx]
+            ctx.report(self, word.start, word.end, packet_idx)
+
+
+class OverflowRule(Rule):
+    """Lines whose packets are still playing when the next timestamped line starts; data is the packet count."""
+
+    __slots__ = ()
+
+    def __init__(self):
+        Rule.__init__(self, CC_BUFFER_OVERFLOW, (LINE,))
+
+    def line(self, ctx):
+        is_overflow, overflow_cnt = ctx.overflow
+        if is_overflow:
+            ctx.report(self, ctx.parsed.ts_start, ctx.parsed.ts_end, overflow_cnt)
+
+
+class TimingRule(Rule):
+    """One kind of timing issue found by the TimestampIndex; data is the issue tuple."""
+
+    __slots__ = ()
+
+    def __init__(self, name, severity="error"):
+        Rule.__init__(self, name, (LINE,), severity)
+
+    def line(self, ctx):
+        parsed = ctx.parsed
+        timestamp_index = ctx.run.timestamp_index
+        if parsed.ts_valid and timestamp_index is not None:
+            issue = timestamp_index.timing_issue(ctx.line_num)
+            if issue is not None and issue[0] == self.name:
+                ctx.report(self, parsed.ts_start, parsed.ts_end, issue)
+
+
+class NeverDisplayedRule(Rule):
+    """Caption text that is loaded but never shown (no EOC after it)."""
+
+    __slots__ = ()
+
+    def __init__(self):
+        Rule.__init__(self, NEVER_DISPLAYED, (CAPTION,), "warning", None)
+
+    def caption(self, ctx):
+        if ctx.times is None or ctx.times[1] is None:
+            ctx.report(self, 0, len(ctx.parsed.text.rstrip("\r\n")))
+
+
+class XdsErrorRule(Rule):
+    """One kind of XDS packet error; reported on the packet's start or end word.
+
+    An unterminated packet is only known once a new packet replaces it or the document
+    ends, so its hit can belong to an earlier line.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, name):
+        Rule.__init__(self, name, (LINE, END), "warning")
+
+    def _report(self, report_at, errors):
+        for (line_num, start, end), error_type, timestamp in errors:
+            if error_type == self.name:
+                report_at(self, line_num, start, end, timestamp)
+
+    def line(self, ctx):
+        if ctx.xds_errors:
+            self._report(ctx.report_at, ctx.xds_errors)
+
+    def end(self, run):
+        self._report(run.report_at, run.xds_errors)
+
+
+def default_rules():
+    """Fresh instances of the built-in rules: timestamp checks, then word checks, then captions."""
+    return [
+        InvalidTimestampRule(),
+        OverflowRule(),
+        TimingRule(TIMECODE_ORDER),
+        TimingRule(DUPLICATE_TIMESTAMP),
+        TimingRule(PACKET_OVERLAP),
+        TimingRule(TIMECODE_GAP, "warning"),
+        ParityRule(),
+        XdsErrorRule(XDS_CHECKSUM_ERROR),
+        XdsErrorRule(XDS_UNTERMINATED),
+        NeverDisplayedRule(),
+    ]
+
+
+_BUILTIN_NAMES = frozenset(rule.name for rule in default_rules())
+
+
+class RuleSet(object):
+    """Registered rules by name, in order; hits of one event are reported in this order."""
+
+    __slots__ = ("rules", "_by_name")
+
+    def __init__(self, rules=()):
+        self.rules = []
+        self._by_name = {}
+        for rule in rules:
+            self.register(rule)
+
+    def register(self, rule):
+        """Add a rule; its name must be new."""
+        for event in rule.events:
+            if event not in EVENTS:
+                raise ValueError("Unknown event {0!r} for rule {1}".format(event, rule.name))
+        if rule.name in self._by_name:
+            raise ValueError("A rule named {0} is already registered".format(rule.name))
+        self.rules.append(rule)
+        self._by_name[rule.name] = rule
+        return rule
+
+    def get(self, name):
+        return self._by_name[name]
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def enable(self, name, enabled=True):
+        self._by_name[name].enabled = enabled
+
+    def subscribed(self, event):
+        """Enabled rules handling an event, in order."""
+        return [rule for rule in self.rules if rule.enabled and event in rule.events]
+
+    def signature(self):
+        """Text naming the settings that change what is marked (added or disabled rules,
+        changed indicators); empty with the defaults. Keeps cached analyses apart per setting."""
+        parts = []
+        for rule in self.rules:
+            if rule.name not in _BUILTIN_NAMES:
+                parts.append("+" + rule.name)
+            if not rule.enabled:
+                parts.append("-" + rule.name)
+            elif rule.indicator != rule._default_indicator:
+                parts.append("{0}={1}".format(rule.name, rule.indicator))
+        return ",".join(parts)
+
+    def reset_stats(self):
+        for rule in self.rules:
+            rule.reset_stats()
+
+    def format_stats(self):
+        """Console table of calls, hits and time per rule, most expensive first."""
+        rows = ["{0:<20} {1:>10} {2:>8} {3:>10}".format("rule", "calls", "hits", "ms")]
+        for rule in sorted(self.rules, key=lambda r: -r.seconds):
+            name = rule.name if rule.enabled else rule.name + " (off)"
+            rows.append("{0:<20} {1:>10} {2:>8} {3:>10.1f}".format(name, rule.calls, rule.hits, rule.seconds * 1000))
+        return "\n".join(rows)
+
+
+# The rules used when none are passed (the plugin applies its settings to these)
+RULES = RuleSet(default_rules())
+
+
+class LineContext(object):
+    """What the rules see of one line: its ParsedLine, overflow state, XDS results,
+    caption segments and display times, plus the hits reported on it."""
+
+    __slots__ = ("run", "line_num", "parsed", "overflow", "xds_words", "xds_packets", "xds_errors", "segments", "times", "hits")
+
+    def __init__(self, run, line_num, parsed):
+        self.run = run
+        self.line_num = line_num
+        self.parsed = parsed
+        self.overflow = (False, 0)
+        self.xds_words = set()
+        self.xds_packets = []
+        self.xds_errors = []
+        self.segments = None
+        self.times = None
+        self.hits = []
+
+    def report(self, rule, start, end, data=None):
+        """Record a problem found by rule on this line's columns start to end."""
+        self.report_at(rule, self.line_num, start, end, self.parsed.timestamp, data)
+
+    def report_at(self, rule, line_num, start, end, timestamp, data=None):
+        """Record a problem on another (earlier) line."""
+        rule.hits += 1
+        self.hits.append(Hit(rule.name, line_num, start, end, timestamp, data))
+
+
+def _dispatch(handlers, arg):
+    start = _timer()
+    for rule, handler in handlers:
+        handler(arg)
+        end = _timer()  # one clock read per handler: its end is the next one's start
+        rule.seconds += end - start
+        rule.calls += 1
+        start = end
+
+
+class RuleRun(object):
+    """One walk over a document dispatching the enabled rules of a RuleSet.
+
+    Call line() for each non-empty line in document order, then end(). With time_map
+    (a whole-document walk) XDS packets are assembled as the words pass, for the XDS
+    rules and the annotations, and CAPTION rules run; without it (a check of single
+    lines, e.g. on hover) both are skipped, since they depend on the lines around them.
+    xds=False skips the XDS assembly of a whole-document walk too. Without
+    timestamp_index, overflow and timing rules find nothing.
+    """
+
+    __slots__ = ("rules", "timestamp_index", "time_map", "xds", "xds_errors", "end_hits", "_subscribed")
+
+    def __init__(self, rules=None, timestamp_index=None, time_map=None, xds=True):
+        self.rules = rules if rules is not None else RULES
+        self.timestamp_index = timestamp_index
+        self.time_map = time_map
+        self.xds = XdsDecoder() if time_map is not None and xds else None
+        self.xds_errors = []
+        self.end_hits = []
+        # (rule, bound handler) per event
+        self._subscribed = dict((event, [(rule, getattr(rule, event)) for rule in self.rules.subscribed(event)]) for event in EVENTS)
+
+    def line(self, line_num, parsed):
+        """Run the word, line and caption rules on one line. Returns its LineContext."""
+        ctx = LineContext(self, line_num, parsed)
+        if parsed.timestamp is not None and self.timestamp_index is not None and line_num is not None:
+            ctx.overflow = self.timestamp_index.overflow(line_num)
+        if self.xds is not None:
+            self._decode_xds(ctx)
+
+        _dispatch(self._subscribed[LINE], ctx)
+        word_rules = self._subscribed[WORD]
+        if word_rules and parsed.words:
+            for rule, handler in word_rules:
+                start = _timer()
+                for packet_idx, word in enumerate(parsed.words):
+                    handler(ctx, packet_idx, word)
+                rule.seconds += _timer() - start
+                rule.calls += len(parsed.words)
+
+        if self.time_map is not None:
+            ctx.segments = parsed.segments(ctx.xds_words)
+            if ctx.segments:
+                ctx.times = self.time_map.get(line_num)
+                _dispatch(self._subscribed[CAPTION], ctx)
+        return ctx
+
+    def _decode_xds(self, ctx):
+        parsed = ctx.parsed
+        for code in parsed.codes:
+            word = code.word
+            if self.xds.feed(int(word.text, 16), (ctx.line_num, word.start, word.end), parsed.timestamp):
+                ctx.xds_words.add(word.start)
+        if ctx.xds_words:
+            ctx.xds_packets, ctx.xds_errors = self.xds.drain()
+
+    def report_at(self, rule, line_num, start, end, timestamp, data=None):
+        """Record a problem found at the end of the document."""
+        rule.hits += 1
+        self.end_hits.append(Hit(rule.name, line_num, start, end, timestamp, data))
+
+    def end(self):
+        """Run the end-of-document rules. Returns their hits."""
+        if self.xds is not None:
+            self.xds.finish()
+            self.xds_errors = self.xds.drain()[1]
+        _dispatch(self._subscribed[END], self)
+        return self.end_hits
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Schedule Module
+
+Debounced, coalesced re-analysis during bursts of edits. A paste, a replace-all or the
+undo of a large change sends thousands of modification notifications; EditScheduler
+folds them into merged ranges of dirty lines and starts one run once no edit has
+arrived for a quiet period. A run is a generator that does a bounded slice of work per
+step; tick() advances it until its time budget is spent, so the editor stays responsive
+while annotations are applied. An edit that arrives while a run is in progress cancels
+it, and the next run covers the lines of both.
+"""
+
+import bisect
+import time
+
+# Seconds without edits before a run starts
+DEFAULT_QUIET = 0.5
+# Seconds of run steps per tick (at least one step is always taken)
+DEFAULT_BUDGET = 0.02
+
+# tick() results
+IDLE = "idle"  # nothing to do
+WAITING = "waiting"  # edits pending, quiet period not over yet
+RUNNING = "running"  # a run has more steps
+DONE = "done"  # a run finished in this tick
+
+
+class DirtyLines(object):
+    """Merged [start, end) ranges of edited lines, in current line numbers.
+
+    Lines inserted or removed by an edit shift the ranges after it, so ranges recorded
+    earlier in a burst still point at the right lines when the burst is over.
+    """
+
+    __slots__ = ("starts", "ends", "lines_added", "moved")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.lines_added = 0  # net lines inserted (negative if removed) by all edits
+        self.moved = False  # some edit inserted or removed lines, so later lines changed number
+
+    def add(self, line, lines_added=0):
+        """Record an edit on line that inserted (positive) or removed (negative) lines after it."""
+        if lines_added:
+            # Lines after the edit move; ranges inside removed lines collapse onto the edit
+            pos = bisect.bisect_right(self.ends, line)
+            for i in range(pos, len(self.starts)):
+                if self.starts[i] > line:
+                    self.starts[i] = max(line, self.starts[i] + lines_added)
+                self.ends[i] = max(line + 1, self.ends[i] + lines_added)
+            self.lines_added += lines_added
+            self.moved = True
+        self._merge(line, line + max(0, lines_added) + 1)
+
+    def _merge(self, start, end):
+        lo = bisect.bisect_left(self.ends, start)
+        hi = bisect.bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def ranges(self):
+        """Merged (start, end) ranges in line order."""
+        return list(zip(self.starts, self.ends))
+
+    def __contains__(self, line):
+        pos = bisect.bisect_right(self.starts, line) - 1
+        return pos >= 0 and line < self.ends[pos]
+
+    def __len__(self):
+        """Number of dirty lines."""
+        return sum(end - start for start, end in zip(self.starts, self.ends))
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    __nonzero__ = __bool__
+
+
+class EditScheduler(object):
+    """Coalesces edits and runs start_run(dirty) once they stop, a budgeted slice per tick.
+
+    start_run receives the DirtyLines of every edit since the last completed run and
+    returns an iterator; each next() does one bounded step (e.g. one batch of editor
+    calls). Call edited() from the modification notification and tick() periodically
+    (while busy is true).
+    """
+
+    __slots__ = ("start_run", "quiet", "budget", "clock", "dirty", "runs", "cancelled", "_last_edit", "_run")
+
+    def __init__(self, start_run, quiet=DEFAULT_QUIET, budget=DEFAULT_BUDGET, clock=time.time):
+        self.start_run = start_run
+        self.quiet = quiet
+        self.budget = budget
+        self.clock = clock
+        self.dirty = DirtyLines()
+        self.runs = 0  # runs started
+        self.cancelled = 0  # runs cancelled by a newer edit
+        self._last_edit = None
+        self._run = None
+
+    @property
+    def busy(self):
+        return bool(self.dirty) or self._run is not None
+
+    def edited(self, line, lines_added=0):
+        """Note one modification; a run in progress is stale and is cancelled."""
+        self.dirty.add(line, lines_added)
+        self._last_edit = self.clock()
+        if self._run is not None:
+            self._stop()
+            self.cancelled += 1
+
+    def reset(self):
+        """Forget pending edits and cancel any run (e.g. after a full analysis elsewhere)."""
+        if self._run is not None:
+            self._stop()
+        self.dirty = DirtyLines()
+
+    def _stop(self):
+        close = getattr(self._run, "close", None)
+        if close is not None:
+            close()
+        self._run = None
+
+    def tick(self):
+        """Start or continue a run for at most budget seconds. Returns IDLE, WAITING, RUNNING or DONE."""
+        if self._run is None:
+            if not self.dirty:
+                return IDLE
+            if self.clock() - self._last_edit < self.quiet:
+                return WAITING
+            self.runs += 1
+            # The dirty lines stay recorded until the run completes, so a cancelled run's lines are redone
+            self._run = iter(self.start_run(self.dirty))
+        deadline = self.clock() + self.budget
+        try:
+            while True:
+                next(self._run)
+                if self.clock() >= deadline:
+                    return RUNNING
+        except StopIteration:
+            self._run = None
+            self.dirty = DirtyLines()
+            return DONE
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Search Module
+
+Incremental inverted index over decoded caption text.
+Lines are indexed from render_line_annotation output and re-indexed one at a time
+as their text changes, so queries never rescan or re-decode the document.
+"""
+
+import bisect
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text):
+    """Split caption text into lowercase word tokens."""
+    return [m.group(0).lower() for m in TOKEN_PATTERN.finditer(text)]
+
+
+def segments_text(segments):
+    """Join annotation segments into plain text (row breaks become spaces)."""
+    return "".join(text if style != "newline" else " " for text, style in segments)
+
+
+class CaptionTextIndex(object):
+    """Inverted index: token -> {line_num: [token positions]}.
+
+    Query syntax: space-separated terms are ANDed, "quoted words" match a phrase
+    on one line, and a trailing * matches a prefix (e.g. buzz*).
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._vocab = []  # sorted, for prefix lookups
+        self._line_tokens = {}
+        self._line_sources = {}
+
+    def __len__(self):
+        return len(self._line_tokens)
+
+    def set_line(self, line_num, line_text, segments):
+        """Index a line's decoded segments. No-op if the line's source text is unchanged."""
+        if self._line_sources.get(line_num) == line_text:
+            return False
+        self.remove_line(line_num)
+        tokens = tokenize(segments_text(segments)) if segments else []
+        self._line_sources[line_num] = line_text
+        if not tokens:
+            return True
+        self._line_tokens[line_num] = tokens
+        for pos, token in enumerate(tokens):
+            lines = self._postings.get(token)
+            if lines is None:
+                lines = self._postings[token] = {}
+                bisect.insort(self._vocab, token)
+            lines.setdefault(line_num, []).append(pos)
+        return True
+
+    def remove_line(self, line_num):
+        """Drop a line from the index."""
+        self._line_sources.pop(line_num, None)
+        tokens = self._line_tokens.pop(line_num, None)
+        if not tokens:
+            return
+        for token in set(tokens):
+            lines = self._postings[token]
+            del lines[line_num]
+            if not lines:
+                del self._postings[token]
+                del self._vocab[bisect.bisect_left(self._vocab, token)]
+
+    def retain(self, line_nums):
+        """Drop every indexed line not in line_nums (e.g. lines deleted by an edit)."""
+        for line_num in [n for n in self._line_sources if n not in line_nums]:
+            self.remove_line(line_num)
+
+    def _prefix_lines(self, prefix):
+        lines = set()
+        idx = bisect.bisect_left(self._vocab, prefix)
+        while idx < len(self._vocab) and self._vocab[idx].startswith(prefix):
+            lines.update(self._postings[self._vocab[idx]])
+            idx += 1
+        return lines
+
+    def _phrase_lines(self, tokens):
+        postings = [self._postings.get(t) for t in tokens]
+        if not all(postings):
+            return set()
+        candidates = set(min(postings, key=len))
+        for lines in postings:
+            candidates.intersection_update(lines)
+        if len(tokens) == 1:
+            return candidates
+        matches = set()
+        for line_num in candidates:
+            line_tokens = self._line_tokens[line_num]
+            for start in postings[0][line_num]:
+                if line_tokens[start : start + len(tokens)] == tokens:
+                    matches.add(line_num)
+                    break
+        return matches
+
+    def search(self, query):
+        """Return sorted line numbers matching every clause of the query."""
+        result = None
+        for match in QUERY_PATTERN.finditer(query or ""):
+            phrase, term = match.groups()
+            tokens = tokenize(phrase if phrase is not None else term)
+            if not tokens:
+                continue
+            if phrase is None and term.endswith("*") and len(tokens) == 1:
+                lines = self._prefix_lines(tokens[0])
+            else:
+                lines = self._phrase_lines(tokens)
+            result = lines if result is None else result & lines
+            if not result:
+                return []
+        return sorted(result) if result else []
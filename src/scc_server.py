@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Server Module
+
+Local lint server, so tools that check many files do not start an interpreter (and
+load the decode tables) for each one. Clients connect to a localhost port or a Unix
+socket and send one JSON request per line; each gets one JSON response line with the
+same "id", in the order the analyses finish, so several requests can be in flight on
+one connection. Analyses run on a process pool whose workers keep the decode tables
+loaded between requests. Results are cached by the SHA-1 of the document's bytes, so
+the same content sent again (by any client, under any path) is answered from memory,
+and concurrent requests for the same content share one analysis.
+
+Requires Python 3 (asyncio); the plugin does not import it.
+
+Requests:
+    {"id": 1, "op": "analyze", "text": "Scenarist_SCC V1.0..."}
+    {"id": 2, "op": "analyze", "path": "/ingest/reel1.scc"}
+    {"id": 3, "op": "stats"}
+Responses:
+    {"id": 1, "ok": true, "digest": "...", "cached": false, "result": {...}}
+    {"id": 2, "ok": false, "error": "..."}
+The result is the watch-folder report (frame rate, status, error counts and locations,
+summary, QC) plus "timing" ([line, start, end] for each loading line) and "captions"
+(lines, start, end and text of each displayed caption). Lines are 1-based.
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import signal
+import socket
+import sys
+
+from scc_captions import build_captions
+from scc_document import analyze
+from scc_timecode import frames_to_timestamp
+from scc_watch import result_report
+
+PROTOCOL_VERSION = 1
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Analysis results kept in memory, least recently used dropped first
+DEFAULT_CACHE_ENTRIES = 256
+# Longest request line accepted (a large document inlined as JSON text)
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+
+def analysis_record(data):
+    """Analyze SCC bytes and return the JSON-serializable result sent to clients."""
+    result = analyze(data.decode("utf-8", "replace"))
+    record = result_report(result)
+    del record["source"]
+    frame_rate = result.frame_rate
+    record["timing"] = [[line_num + 1, times[0], times[1]] for line_num, times in sorted(result.time_map.items()) if times[0] is not None]
+    record["captions"] = [
+        {
+            "lines": [line_num + 1 for line_num in caption.lines],
+            "start": frames_to_timestamp(caption.start_frame, frame_rate),
+            "end": frames_to_timestamp(caption.end_frame, frame_rate) if caption.end_frame is not None else None,
+            "text": caption.text,
+        }
+        for caption in build_captions(result.time_map, result.line_texts, frame_rate)
+    ]
+    return record
+
+
+def _init_worker():
+    """Pool initializer: leave Ctrl+C to the server, which shuts the pool down."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class LintServer(object):
+    """Answers analysis requests from a worker pool and a content-addressed result cache.
+
+    workers is the number of worker processes (None: one per CPU); 0 analyzes on a
+    thread of the server process instead, which suits small files and tests.
+    """
+
+    __slots__ = ("workers", "cache_entries", "cache", "requests", "analyses", "cache_hits", "failures", "_executor", "_pending")
+
+    def __init__(self, workers=None, cache_entries=DEFAULT_CACHE_ENTRIES):
+        self.workers = workers
+        self.cache_entries = cache_entries
+        self.cache = collections.OrderedDict()  # hex digest -> record, least recently used first
+        self.requests = 0
+        self.analyses = 0  # analyses run (cache misses)
+        self.cache_hits = 0  # answered from the cache or from an analysis already running
+        self.failures = 0
+        self._executor = None
+        self._pending = {}  # hex digest -> future of the analysis in progress
+
+    def _pool(self):
+        if self._executor is None:
+            if self.workers == 0:
+                self._executor = concurrent.futures.ThreadPoolExecutor(1)
+            else:
+                # Spawned, not forked: a forked worker inherits the open client sockets and
+                # would hold connections open after the server closes them
+                context = multiprocessing.get_context("spawn")
+                self._executor = concurrent.futures.ProcessPoolExecutor(self.workers, context, _init_worker)
+        return self._executor
+
+    def close(self):
+        """Shut the worker pool down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def analyze(self, data):
+        """(hex digest, record, cached) for SCC bytes."""
+        digest = hashlib.sha1(data).hexdigest()
+        record = self.cache.get(digest)
+        if record is not None:
+            self.cache.move_to_end(digest)
+            self.cache_hits += 1
+            return digest, record, True
+        future = self._pending.get(digest)
+        if future is not None:
+            self.cache_hits += 1
+        else:
+            self.analyses += 1
+            future = asyncio.get_event_loop().run_in_executor(self._pool(), analysis_record, data)
+            self._pending[digest] = future
+            future.add_done_callback(lambda done: self._finished(digest, done))
+        # shield: a client that disconnects must not cancel an analysis others wait for
+        return digest, await asyncio.shield(future), False
+
+    def _finished(self, digest, future):
+        del self._pending[digest]
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.cache[digest] = future.result()
+        while len(self.cache) > self.cache_entries:
+            self.cache.popitem(last=False)
+
+    def stats(self):
+        return {
+            "protocol": PROTOCOL_VERSION,
+            "requests": self.requests,
+            "analyses": self.analyses,
+            "cache_hits": self.cache_hits,
+            "failures": self.failures,
+            "cached": len(self.cache),
+            "in_progress": len(self._pending),
+        }
+
+    async def handle(self, request):
+        """The response dict for one decoded request."""
+        self.requests += 1
+        response = {"id": request.get("id")}
+        try:
+            op = request.get("op", "analyze")
+            if op == "stats":
+                response.update(ok=True, result=self.stats())
+            elif op == "analyze":
+                text, path = request.get("text"), request.get("path")
+                if isinstance(text, str):
+                    data = text.encode("utf-8")
+                elif isinstance(path, str):
+                    data = await asyncio.get_event_loop().run_in_executor(None, _read_file, path)
+                else:
+                    raise ValueError("analyze needs a text or path string")
+                digest, record, cached = await self.analyze(data)
+                response.update(ok=True, digest=digest, cached=cached, result=record)
+            else:
+                raise ValueError("Unknown op {0!r}".format(op))
+        except Exception as e:  # reported to the client; the server keeps running
+            self.failures += 1
+            response.update(ok=False, error=str(e))
+        return response
+
+    async def _respond(self, line, writer, lock):
+        try:
+            request = json.loads(line.decode("utf-8"))
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+        except ValueError as e:
+            self.failures += 1
+            response = {"id": None, "ok": False, "error": "Bad request: {0}".format(e)}
+        else:
+            response = await self.handle(request)
+        await self._send(response, writer, lock)
+
+    async def _send(self, response, writer, lock):
+        async with lock:
+            writer.write(json.dumps(response, separators=(",", ":")).encode("utf-8") + b"\n")
+            await writer.drain()
+
+    async def serve_client(self, reader, writer):
+        """Read request lines until the client closes, answering each as its analysis finishes."""
+        lock = asyncio.Lock()
+        tasks = []
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # longer than MAX_REQUEST_BYTES; the rest of the stream is unusable
+                    self.failures += 1
+                    response = {"id": None, "ok": False, "error": "Request longer than {0} bytes".format(MAX_REQUEST_BYTES)}
+                    tasks.append(asyncio.ensure_future(self._send(response, writer, lock)))
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    tasks.append(asyncio.ensure_future(self._respond(line, writer, lock)))
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Start listening on host:port, or on the Unix socket path. Returns the asyncio server."""
+        if path is not None:
+            return await asyncio.start_unix_server(self.serve_client, path, limit=MAX_REQUEST_BYTES)
+        return await asyncio.start_server(self.serve_client, host, port, limit=MAX_REQUEST_BYTES)
+
+
+def request(message, address=(DEFAULT_HOST, DEFAULT_PORT), timeout=None):
+    """Send one request dict to a running server and return its response dict.
+
+    address is a (host, port) tuple or a Unix socket path. A blocking helper for tools
+    that do not use asyncio.
+    """
+    if isinstance(address, tuple):
+        sock = socket.create_connection(address, timeout)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(address)
+    with sock:
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise IOError("The server closed the connection without a response")
+    return json.loads(line.decode("utf-8"))
+
+
+def main(argv=None):
+    """Serve analysis requests until interrupted."""
+    parser = argparse.ArgumentParser(prog="scc_server.py", description="Serve SCC analyses over a local socket (one JSON request per line).")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead of a port")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU; 0: analyze in the server process)")
+    parser.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES, help="analysis results kept in memory")
+    args = parser.parse_args(argv)
+
+    server = LintServer(args.workers, args.cache_entries)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    listener = None
+    try:
+        listener = loop.run_until_complete(server.start(args.host, args.port, args.socket))
+        sys.stdout.write("Listening on {0}\n".format(args.socket or "{0}:{1}".format(args.host, args.port)))
+        sys.stdout.flush()
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if listener is not None:
+            listener.close()
+        server.close()
+        loop.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
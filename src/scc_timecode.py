@@ -19,6 +19,70 @@ def parse_timestamp_str(ts_str):
     return Timestamp(int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]))
 
 
+def packet_frame_offset(packet_offset, frame_rate_str):
+    """Convert a packet offset into a video frame offset using the frame rate cadence."""
+    cadence = get_frame_rate_config(frame_rate_str).get('cadence')
+    if cadence:
+        packets_per_cycle = cadence['packets']
+        frames_per_cycle = cadence['frames']
+        return (packet_offset // packets_per_cycle) * frames_per_cycle + min(packet_offset % packets_per_cycle, frames_per_cycle - 1)
+    return packet_offset
+
+
+def frame_packet_offset(frame_offset, frame_rate_str):
+    """Convert a video frame offset into the first packet offset that plays at that frame.
+
+    Inverse of packet_frame_offset.
+    """
+    cadence = get_frame_rate_config(frame_rate_str).get('cadence')
+    if cadence:
+        cycles, rem = divmod(frame_offset, cadence['frames'])
+        return cycles * cadence['packets'] + rem
+    return frame_offset
+
+
+def timestamp_to_frames(ts_str, frame_rate_str):
+    """Convert a timestamp string (or parsed Timestamp) to an absolute frame number.
+
+    Drop-frame timestamps skip frame labels 0 and 1 every minute except each tenth minute.
+    """
+    ts = ts_str if isinstance(ts_str, Timestamp) else parse_timestamp_str(ts_str)
+    config = get_frame_rate_config(frame_rate_str)
+    frames = ((ts.hours * 60 + ts.minutes) * 60 + ts.seconds) * config['videoFps'] + ts.frames
+    if config['isDropFrame']:
+        total_minutes = ts.hours * 60 + ts.minutes
+        frames -= 2 * (total_minutes - total_minutes // 10)
+    return frames
+
+
+def frames_to_timestamp(frames, frame_rate_str):
+    """Convert an absolute frame number back to a timestamp string."""
+    config = get_frame_rate_config(frame_rate_str)
+    video_fps = config['videoFps']
+    is_df = config['isDropFrame']
+    if is_df:
+        frames_per_10min = 10 * 60 * video_fps - 9 * 2
+        frames_per_min = 60 * video_fps - 2
+        tens, rem = divmod(frames, frames_per_10min)
+        frames += 18 * tens
+        if rem >= 2:
+            frames += 2 * ((rem - 2) // frames_per_min)
+
+    total_seconds, ff = divmod(frames, video_fps)
+    total_minutes, ss = divmod(total_seconds, 60)
+    hh, mm = divmod(total_minutes, 60)
+    sep = ";" if is_df else ":"
+    return "{0:02d}:{1:02d}:{2:02d}{3}{4:02d}".format(hh, mm, ss, sep, ff)
+
+
+def frame_clock(frame_rate_str):
+    """(numerator, denominator) of a frame rate's real frames per second, e.g. (30000, 1001)."""
+    video_fps = get_frame_rate_config(frame_rate_str)['videoFps']
+    if float(frame_rate_str.split()[0]) != video_fps:
+        return video_fps * 1000, 1001
+    return video_fps, 1
+
+
 def add_frames(hh, mm, ss, ff, packet_offset, frame_rate_str):
     """Add packet offset to timestamp, accounting for frame rate cadence.
 
@@ -27,14 +91,7 @@ def add_frames(hh, mm, ss, ff, packet_offset, frame_rate_str):
     config = get_frame_rate_config(frame_rate_str)
     video_fps = config['videoFps']
     is_df = config['isDropFrame']
-    cadence = config.get('cadence')
-
-    if cadence:
-        packets_per_cycle = cadence['packets']
-        frames_per_cycle = cadence['frames']
-        frame_offset = (packet_offset // packets_per_cycle) * frames_per_cycle + min(packet_offset % packets_per_cycle, frames_per_cycle - 1)
-    else:
-        frame_offset = packet_offset
+    frame_offset = packet_frame_offset(packet_offset, frame_rate_str)
 
     ff += frame_offset
     while ff >= video_fps:
@@ -94,9 +151,9 @@ def detect_frame_rate(file_text):
 
 
 def validate_timestamp(ts_str):
-    """Validate timestamp string. Returns True if valid, False otherwise."""
+    """Validate timestamp string (or parsed Timestamp). Returns True if valid, False otherwise."""
     try:
-        ts = parse_timestamp_str(ts_str)
+        ts = ts_str if isinstance(ts_str, Timestamp) else parse_timestamp_str(ts_str)
         return ts.hours <= 23 and ts.minutes <= 59 and ts.seconds <= 59 and ts.frames <= 29
     except (ValueError, IndexError, AttributeError, TypeError):
         return False
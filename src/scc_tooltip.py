@@ -6,6 +6,9 @@ Tooltip formatting logic for hover tooltips.
 Handles marker generation, line wrapping, and text formatting.
 """
 
+from scc_decoder import decode_single_code
+from scc_timecode import add_frames
+
 TOOLTIP_WIDTH = 60
 
 
@@ -117,3 +120,53 @@ def format_tooltip(event_desc, timestamp_desc, buffer_text, highlight_start, hig
         separator,
         buffer_section,
     )
+
+
+def format_event_description(evt, word_text):
+    """Format the event description line for tooltip."""
+    lbl = evt.get("label", "").strip()
+    suffix = " (%s)" % lbl if lbl else ""
+    evt_type = evt.get("type", "")
+    if evt_type == "TEXT":
+        return 'TEXT: "%s" (%s)' % (evt.get("text", ""), word_text)
+    elif evt_type == "PAC":
+        ul = " Und" if evt.get("underline", False) else ""
+        return "PAC : Row %d, Col %d, %s%s (%s)%s" % (
+            evt.get("row", 0),
+            evt.get("col", 0),
+            evt.get("color", ""),
+            ul,
+            word_text,
+            suffix,
+        )
+    elif evt_type == "MIDROW":
+        ul = " Und" if evt.get("underline", False) else ""
+        return "CMD : Mid-Row: %s%s%s" % (evt.get("color", "")[:3], ul, suffix)
+    elif evt_type == "CONTROL":
+        return "CMD : %s (%s)%s" % (
+            evt.get("name", "Unknown").split("(")[0].strip(),
+            word_text,
+            suffix,
+        )
+    elif evt_type == "INDENT":
+        n = evt.get("spaces", 0)
+        return "CMD : Indent %d %s (%s)%s" % (
+            n,
+            "space" if n == 1 else "spaces",
+            word_text,
+            suffix,
+        )
+    else:
+        return decode_single_code(word_text, False)
+
+
+def format_timestamp_description(hh, mm, ss, ff, word_idx, base_time, frame_rate):
+    """Format the timestamp description line for tooltip."""
+    if frame_rate:
+        try:
+            pkt_time, _ = add_frames(hh, mm, ss, ff, word_idx, frame_rate)
+        except (ValueError, TypeError):
+            return "TIME: %s (+%d)" % (base_time, word_idx)
+        pkt_word = "packet" if word_idx == 1 else "packets"
+        return "TIME: %s (+%d %s)" % (pkt_time, word_idx, pkt_word)
+    return "TIME: %s (+%d)" % (base_time, word_idx)
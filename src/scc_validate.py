@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Validate Module
+
+Fail-fast validation for CI gating. A pipeline that only needs to know whether a file
+has a parity error, an invalid timestamp or a CC buffer overflow does not need the
+timing analysis, caption decoding, annotations or every error: iter_violations() streams
+through the lines, checks the Scenarist_SCC V1.0 header and the line structure
+(timestamp, tab, space-separated 4-digit hex words) and yields each violation as soon
+as its line has been read, and validate() stops after the first (or first N). Each
+check only does its own work: words are looked up in a parity table without being
+decoded, timestamps are compared as integers, and frame numbers are computed only for
+the overflow check. A file with a problem near its start is rejected after reading a
+few lines, however large it is.
+
+Violations are scc_report Findings with the same rule names, columns and messages as
+the full report, so they can be written as JSON Lines.
+"""
+
+import argparse
+import io
+import re
+import sys
+
+from scc_data import DETECTION_RULES, VALID_BYTES
+from scc_decoder import HEX_PATTERN, TIMESTAMP_PATTERN, is_pairing_command
+from scc_report import Finding, JsonLinesWriter
+from scc_rules import CC_BUFFER_OVERFLOW, INVALID_TIMESTAMP, PARITY_ERROR
+from scc_timecode import Timestamp, detect_frame_rate, frame_packet_offset, frames_to_timestamp, packet_frame_offset, timestamp_to_frames
+
+HEADER = "Scenarist_SCC V1.0"
+SCC_HEADER = "scc_header"
+LINE_STRUCTURE = "line_structure"
+DEFAULT_CHECKS = (SCC_HEADER, LINE_STRUCTURE, PARITY_ERROR, INVALID_TIMESTAMP, CC_BUFFER_OVERFLOW)
+
+# A well-formed caption line: timestamp, tab, hex words separated by single spaces
+_LINE = re.compile(r"(\d\d):(\d\d):(\d\d)[:;](\d\d)\t[0-9a-fA-F]{4}(?: [0-9a-fA-F]{4})*[ \t]*$")
+# Words whose bytes both pass parity, in lower and upper case, so a line's words are checked
+# with one set operation; mixed-case words go through _parity_ok
+_VALID_WORDS = frozenset(text for high in VALID_BYTES for low in VALID_BYTES for text in ("{0:02x}{1:02x}".format(high, low), "{0:02X}{1:02X}".format(high, low)))
+_TOKEN = re.compile(r"\S+")
+# parity ok by word text (there are at most 65536 words)
+_PARITY = {}
+
+
+def _parity_ok(word):
+    ok = _PARITY.get(word)
+    if ok is None:
+        val = int(word, 16)
+        ok = _PARITY[word] = (val >> 8) in VALID_BYTES and (val & 0xFF) in VALID_BYTES
+    return ok
+
+
+def _structure_error(text):
+    """(start, end, message) of the first malformed part of a caption line."""
+    match = TIMESTAMP_PATTERN.match(text)
+    if match is None:
+        token = re.match(r"\s*\S*", text)
+        return 0, max(1, token.end()), "Line does not start with a timestamp"
+    pos = match.end()
+    if not text.startswith("\t", pos):
+        return pos, pos + 1, "Timestamp is not followed by a tab"
+    previous_end = pos
+    for token in _TOKEN.finditer(text, pos + 1):
+        start, end = token.span()
+        if text[previous_end:start] != ("\t" if previous_end == pos else " "):
+            return previous_end, start, "Hex words must be separated by single spaces"
+        if end - start != 4 or not HEX_PATTERN.match(token.group()):
+            return start, end, "{0} is not a 4-digit hex word".format(token.group())
+        previous_end = end
+    if previous_end == pos:
+        return pos, pos + 1, "Line has no hex words"
+    return 0, len(text), "Malformed line"
+
+
+def _with_frame_rate(lines):
+    """(frame_rate, lines) where the rate is detected from the first timestamps, as the
+    analysis does; only those lines are read ahead."""
+    head = []
+    count = 0
+    limit = DETECTION_RULES["sampleLimit"]
+    lines = iter(lines)
+    for text in lines:
+        head.append(text)
+        count += len(TIMESTAMP_PATTERN.findall(text))
+        if count >= limit:
+            break
+    frame_rate, _ = detect_frame_rate("".join(head))
+    return (None if frame_rate == "INVALID" else frame_rate), _chain(head, lines)
+
+
+def _chain(head, rest):
+    for text in head:
+        yield text
+    for text in rest:
+        yield text
+
+
+def iter_violations(lines, checks=DEFAULT_CHECKS, frame_rate=None):
+    """Yield a Finding for each violation of checks in lines (texts, with or without line
+    ends), in the order found.
+
+    The overflow check needs the frame rate; unless given it is detected from the first
+    timestamps. An overflow is reported when the next timestamped line is read. Parity
+    errors carry the timecode their packet plays at when the frame rate is known (given,
+    or detected for the overflow check), otherwise the line's timestamp.
+    """
+    checks = frozenset(checks)
+    check_header = SCC_HEADER in checks
+    check_structure = LINE_STRUCTURE in checks
+    check_parity = PARITY_ERROR in checks
+    check_timestamp = INVALID_TIMESTAMP in checks
+    check_overflow = CC_BUFFER_OVERFLOW in checks
+    if check_overflow and frame_rate is None:
+        frame_rate, lines = _with_frame_rate(lines)
+    check_overflow = check_overflow and frame_rate is not None
+
+    last_offsets = {}  # frame offset of the last packet by packet count
+    previous = None  # (line, column, timestamp, start frame, end frame, packet count) of the last timestamped line
+    for line_num, text in enumerate(lines, 1):
+        text = text.rstrip("\r\n")
+        if line_num == 1:
+            if text.lstrip(u"\ufeff").rstrip() == HEADER:  # fmt: skip
+                continue
+            if check_header:
+                yield Finding(SCC_HEADER, 1, 1, len(text) + 1, None, "First line is not the {0} header".format(HEADER), None)
+            if not TIMESTAMP_PATTERN.match(text):
+                continue  # a wrong header, not a caption line without one
+        if not text or text.isspace():
+            continue
+
+        match = _LINE.match(text)
+        if match is not None:
+            timestamp, ts_start = text[:11], 0
+            words = text[12:].split()
+            columns = None
+            hh, mm, ss, ff = int(match.group(1)), int(match.group(2)), int(match.group(3)), int(match.group(4))
+        else:
+            if check_structure:
+                start, end, message = _structure_error(text)
+                yield Finding(LINE_STRUCTURE, line_num, start + 1, end + 1, None, message, None)
+            # Read as the full analysis reads it: the first timestamp anywhere and every hex word
+            word_matches = list(HEX_PATTERN.finditer(text))
+            words = [m.group(0) for m in word_matches]
+            columns = [m.start() for m in word_matches]
+            ts_match = TIMESTAMP_PATTERN.search(text)
+            timestamp = ts_match.group(0) if ts_match else None
+            if timestamp is not None:
+                ts_start = ts_match.start()
+                hh, mm, ss, ff = (int(part) for part in timestamp.replace(";", ":").split(":"))
+
+        ts_valid = timestamp is not None and hh <= 23 and mm <= 59 and ss <= 59 and ff <= 29
+        if timestamp is not None and check_timestamp and not ts_valid:
+            yield Finding(INVALID_TIMESTAMP, line_num, ts_start + 1, ts_start + 12, timestamp, "Invalid timestamp {0}".format(timestamp), None)
+
+        frame = None
+        if timestamp is not None and check_overflow:
+            frame = timestamp_to_frames(Timestamp(hh, mm, ss, ff), frame_rate)
+            if previous is not None:
+                prev_line, prev_start, prev_timestamp, prev_frame, prev_end, prev_count = previous
+                if prev_frame <= frame <= prev_end:
+                    count = prev_count - frame_packet_offset(frame - prev_frame, frame_rate)
+                    message = "CC buffer overflow: {0} packet{1} still playing at {2}".format(count, "" if count == 1 else "s", timestamp)
+                    yield Finding(CC_BUFFER_OVERFLOW, prev_line, prev_start + 1, prev_start + 12, prev_timestamp, message, count)
+            last_offset = last_offsets.get(len(words))
+            if last_offset is None:
+                last_offset = last_offsets[len(words)] = packet_frame_offset(max(0, len(words) - 1), frame_rate)
+            end_frame = frame + last_offset
+            previous = (line_num, ts_start, timestamp, frame, end_frame, len(words))
+
+        if check_parity and not _VALID_WORDS.issuperset(words):
+            skip = False
+            for packet_idx, word in enumerate(words):
+                if skip:
+                    skip = False
+                    continue
+                word = word.lower()
+                # The second word of a doubled command is the same word, reported once
+                skip = packet_idx + 1 < len(words) and words[packet_idx + 1].lower() == word and is_pairing_command(int(word, 16))
+                if _parity_ok(word):
+                    continue
+                start = columns[packet_idx] if columns is not None else 12 + 5 * packet_idx
+                timecode = timestamp
+                if frame_rate is not None and ts_valid:
+                    if frame is None:
+                        frame = timestamp_to_frames(Timestamp(hh, mm, ss, ff), frame_rate)
+                    timecode = frames_to_timestamp(frame + packet_frame_offset(packet_idx, frame_rate), frame_rate)
+                message = "Invalid SCC code {0} (parity check failed)".format(word)
+                yield Finding(PARITY_ERROR, line_num, start + 1, start + 5, timecode, message, None)
+
+
+def validate(lines, checks=DEFAULT_CHECKS, max_violations=1, frame_rate=None):
+    """The first max_violations violations in lines (all of them if 0); reading stops there."""
+    found = []
+    for finding in iter_violations(lines, checks, frame_rate):
+        found.append(finding)
+        if len(found) == max_violations:
+            break
+    return found
+
+
+def validate_file(path, checks=DEFAULT_CHECKS, max_violations=1, frame_rate=None):
+    """validate() the lines of an SCC file, read as they are checked."""
+    with io.open(path, "r", encoding="utf-8", errors="replace") as f:
+        return validate(f, checks, max_violations, frame_rate)
+
+
+def main(argv=None):
+    """Check SCC files and exit with status 1 at the first violation."""
+    parser = argparse.ArgumentParser(prog="scc_validate.py", description="Fail-fast structure, parity, timestamp and overflow checks for CI.")
+    parser.add_argument("files", nargs="+", metavar="FILE")
+    parser.add_argument("--checks", default=",".join(DEFAULT_CHECKS), help="comma-separated checks (default: all of {0})".format(", ".join(DEFAULT_CHECKS)))
+    parser.add_argument("--max", type=int, default=1, dest="max_violations", help="violations to report per file before stopping (0: all; default: 1)")
+    parser.add_argument("--frame-rate", help="frame rate for the overflow check (default: detected)")
+    parser.add_argument("--format", choices=["text", "jsonl"], default="text", help="output format (default: text)")
+    parser.add_argument("--keep-going", action="store_true", help="check every file instead of stopping at the first that fails")
+    args = parser.parse_args(argv)
+    checks = [check.strip() for check in args.checks.split(",") if check.strip()]
+    unknown = [check for check in checks if check not in DEFAULT_CHECKS]
+    if unknown:
+        parser.error("unknown check {0}".format(", ".join(unknown)))
+
+    writer = None
+    if args.format == "jsonl":
+        writer = JsonLinesWriter(getattr(sys.stdout, "buffer", sys.stdout))
+    status = 0
+    try:
+        for path in args.files:
+            try:
+                found = validate_file(path, checks, args.max_violations, args.frame_rate)
+            except (IOError, OSError) as e:
+                sys.stderr.write("{0}: {1}\n".format(path, e))
+                return 2
+            for finding in found:
+                if writer is not None:
+                    writer.write(finding, path)
+                else:
+                    sys.stdout.write("{0}:{1}:{2}: {3}: {4}\n".format(path, finding.line, finding.column, finding.rule, finding.message))
+            if found:
+                status = 1
+                if not args.keep_going:
+                    break
+    finally:
+        if writer is not None:
+            writer.close()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+SCC Watch Module
+
+Headless watch-folder QC service. Ingest folders are polled for .scc files; a file is
+analyzed once its size and mtime have stopped changing for a settle period, so partially
+written deliveries are skipped until the writer is done. Analyses run on a bounded
+process pool (each worker imports the decode tables once and keeps them for every file
+it handles) and write one JSON report per file. At most a few jobs per worker are in
+flight and only paths are queued, so a burst of thousands of files costs a list of
+names, not their contents. Each report records the size, mtime and digest of the file
+it describes, so a restarted watcher skips files that have not changed.
+"""
+
+import argparse
+import collections
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from scc_cache import replace_file
+from scc_document import analyze
+from scc_errors import ERROR_TYPES
+
+REPORT_VERSION = 1
+REPORT_SUFFIX = ".json"
+# Seconds a file's size and mtime must stay unchanged before it is analyzed
+DEFAULT_SETTLE = 5.0
+DEFAULT_INTERVAL = 2.0
+# Jobs submitted to the pool per worker before new files wait in the queue
+JOBS_PER_WORKER = 2
+# Recycle workers after this many files to bound memory growth
+TASKS_PER_WORKER = 500
+
+
+def file_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def build_report(text, source=None):
+    """Analyze SCC text headlessly and return a JSON-serializable report dict.
+
+    source is copied into the report as-is (path, size, mtime, sha1).
+    """
+    return result_report(analyze(text), source)
+
+
+def result_report(result, source=None):
+    """The report dict of an AnalysisResult (see build_report())."""
+    qc = result.qc
+    index = result.error_index
+    errors = [{"type": error.error_type, "line": error.line + 1, "label": error.label} for error in result.errors()]
+    report = {
+        "version": REPORT_VERSION,
+        "source": source,
+        "frame_rate": result.frame_rate,
+        "status": "fail" if errors or result.frame_rate is None else "pass",
+        "counts": dict((error_type, index.count(error_type)) for error_type, _, _ in ERROR_TYPES if index.count(error_type)),
+        "errors": errors,
+        "summary": result.error_summary,
+        "qc": None,
+    }
+    if qc is not None:
+        report["qc"] = {
+            "summary": qc.format_summary(),
+            "violations": [{"line": v.lines[0] + 1, "kind": v.kind, "value": v.value, "limit": v.limit} for v in qc.violations],
+        }
+    return report
+
+
+def write_json(path, data):
+    """Write data as JSON to path via a temporary file, creating the directory if needed."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(data, indent=1, sort_keys=True).encode("utf-8"))
+    replace_file(tmp, path)
+
+
+def read_report_source(report_path):
+    """The 'source' record of an existing report, or None."""
+    try:
+        with io.open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(report, dict) or report.get("version") != REPORT_VERSION:
+        return None
+    return report.get("source")
+
+
+def _init_worker():
+    """Pool initializer: leave Ctrl+C to the parent, which shuts the pool down."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def analyze_job(task):
+    """Pool worker: analyze one file and write its report.
+
+    Returns (path, status, detail) where status is "pass", "fail", "unchanged" (same digest
+    as the existing report, only its stat fields were refreshed) or "error".
+    """
+    path, report_path, known = task
+    try:
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        source = {"path": path, "size": st.st_size, "mtime": st.st_mtime, "sha1": file_digest(data)}
+        if known and known.get("sha1") == source["sha1"]:
+            with io.open(report_path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+            report["source"] = source
+            write_json(report_path, report)
+            return path, "unchanged", None
+        report = build_report(data.decode("utf-8", "replace"), source)
+        write_json(report_path, report)
+        detail = report["summary"].splitlines()[0] if report["summary"] else None
+        if report["frame_rate"] is None:
+            detail = "invalid frame rate"
+        return path, report["status"], detail
+    except (IOError, OSError, ValueError) as e:
+        return path, "error", str(e)
+
+
+class FolderWatcher(object):
+    """Polls folders for new or changed .scc files and analyzes them on a bounded pool.
+
+    Call poll() periodically (run() does this in a loop); finished jobs are passed to
+    on_result(path, status, detail).
+    """
+
+    def __init__(self, folders, report_dir, workers=None, settle=DEFAULT_SETTLE, recursive=False, on_result=None, clock=time.time):
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.report_dir = os.path.abspath(report_dir)
+        self.workers = workers or multiprocessing.cpu_count()
+        self.settle = settle
+        self.recursive = recursive
+        self.on_result = on_result
+        self.clock = clock
+        self.max_in_flight = self.workers * JOBS_PER_WORKER
+        self._pool = None
+        self._stat = {}  # path -> (size, mtime, time the stat last changed)
+        self._done = {}  # path -> (size, mtime) last analyzed or found up to date
+        self._queue = collections.deque()
+        self._queued = set()
+        self._in_flight = {}  # path -> AsyncResult
+        self.unsettled = 0  # files the last scan found still changing
+
+    def report_path(self, path):
+        """Report location: the file's path relative to its watched folder, under report_dir."""
+        for folder in self.folders:
+            if path.startswith(folder + os.sep):
+                rel = os.path.relpath(path, folder)
+                if len(self.folders) > 1:
+                    rel = os.path.join(os.path.basename(folder), rel)
+                return os.path.join(self.report_dir, rel + REPORT_SUFFIX)
+        return os.path.join(self.report_dir, os.path.basename(path) + REPORT_SUFFIX)
+
+    def _iter_files(self):
+        for folder in self.folders:
+            for root, dirs, names in os.walk(folder):
+                if os.path.abspath(root) == self.report_dir or root.startswith(self.report_dir + os.sep):
+                    dirs[:] = []
+                    continue
+                for name in names:
+                    if name.lower().endswith(".scc"):
+                        yield os.path.join(root, name)
+                if not self.recursive:
+                    dirs[:] = []
+
+    def scan(self):
+        """Stat every file once and queue those that have settled and changed. Returns the number
+        queued; unsettled is set to the number still changing."""
+        now = self.clock()
+        seen = set()
+        queued = unsettled = 0
+        for path in self._iter_files():
+            seen.add(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key = (st.st_size, st.st_mtime)
+            previous = self._stat.get(path)
+            if previous is None or previous[:2] != key:
+                # New or still being written; a file already old when first seen counts as settled
+                changed_at = now
+                if previous is None and now - st.st_mtime >= self.settle:
+                    changed_at = now - self.settle
+                previous = self._stat[path] = key + (changed_at,)
+            if now - previous[2] < self.settle:
+                unsettled += 1
+                continue
+            if self._done.get(path) == key or path in self._queued or path in self._in_flight:
+                continue
+            self._queue.append(path)
+            self._queued.add(path)
+            queued += 1
+        for path in list(self._stat):
+            if path not in seen:
+                del self._stat[path]
+                self._done.pop(path, None)
+        self.unsettled = unsettled
+        return queued
+
+    def _pool_start(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers, _init_worker, maxtasksperchild=TASKS_PER_WORKER)
+        return self._pool
+
+    def _submit(self):
+        while self._queue and len(self._in_flight) < self.max_in_flight:
+            path = self._queue.popleft()
+            self._queued.discard(path)
+            stat = self._stat.get(path)
+            report_path = self.report_path(path)
+            known = read_report_source(report_path)
+            if stat and known and (known.get("size"), known.get("mtime")) == stat[:2]:
+                self._done[path] = stat[:2]  # reported before a restart and unchanged since
+                continue
+            self._in_flight[path] = self._pool_start().apply_async(analyze_job, ((path, report_path, known),))
+
+    def _collect(self):
+        finished = 0
+        for path, result in list(self._in_flight.items()):
+            if not result.ready():
+                continue
+            del self._in_flight[path]
+            try:
+                path, status, detail = result.get()
+            except Exception as e:  # a worker crash must not stop the service
+                status, detail = "error", str(e)
+            stat = self._stat.get(path)
+            if stat:
+                self._done[path] = stat[:2]  # an error too: retried once the file changes
+            finished += 1
+            if self.on_result is not None:
+                self.on_result(path, status, detail)
+        return finished
+
+    def poll(self):
+        """One scan/submit/collect round. Returns the number of files finished."""
+        self.scan()
+        finished = self._collect()
+        self._submit()
+        return finished
+
+    @property
+    def busy(self):
+        return bool(self._queue or self._in_flight)
+
+    def drain(self, interval=0.05):
+        """Wait until every queued file has been analyzed."""
+        while self.busy:
+            self._collect()
+            self._submit()
+            if self._in_flight:
+                time.sleep(interval)
+
+    def run(self, interval=DEFAULT_INTERVAL, once=False):
+        """Poll until interrupted (or, with once, until the current files are all analyzed,
+        waiting for those still being written to settle)."""
+        try:
+            if once:
+                while True:
+                    self.poll()
+                    if not self.busy and not self.unsettled:
+                        return
+                    time.sleep(min(interval, 0.2))
+            while True:
+                self.poll()
+                time.sleep(interval if not self.busy else min(interval, 0.2))
+        finally:
+            self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+def _print_result(path, status, detail):
+    sys.stdout.write("{0:9} {1}{2}\n".format(status.upper(), path, ": " + detail if detail else ""))
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    """Watch folders and write a QC report for every new or changed SCC file."""
+    parser = argparse.ArgumentParser(prog="scc_watch.py", description="Watch folders and write a QC report for every new or changed SCC file.")
+    parser.add_argument("folders", nargs="+", metavar="FOLDER")
+    parser.add_argument("--reports", required=True, help="directory for the JSON reports")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="seconds between scans")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE, help="seconds a file must be unchanged before it is analyzed")
+    parser.add_argument("--recursive", action="store_true", help="also watch subfolders")
+    parser.add_argument("--once", action="store_true", help="analyze what is there now (once it has settled) and exit")
+    args = parser.parse_args(argv)
+
+    watcher = FolderWatcher(args.folders, args.reports, args.workers, args.settle, args.recursive, _print_result)
+    try:
+        watcher.run(args.interval, args.once)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
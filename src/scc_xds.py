@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+SCC XDS Module
+
+Extended Data Services (field 2) packet assembly and checksum verification, based on
+libcaption's xds.c. A packet is a start code (class and type), up to 32 informational
+characters and an end code carrying a checksum. Caption control codes suspend the
+current packet and a continue code of the same class and type resumes it, so packets
+may span words, lines and interleaved CC3/CC4 data. The decoder is fed one word at a
+time in document order, alongside the render pass.
+"""
+
+from scc_data import XDS_CLASSES, XDS_RATINGS
+
+XDS_END = 0x0F
+XDS_MAX_CONTENT = 32
+
+XDS_CHECKSUM_ERROR = "xds_checksum"
+XDS_UNTERMINATED = "xds_unterminated"
+
+
+class XdsPacket(object):
+    """One XDS packet. start/end are document positions of its start and end words."""
+
+    __slots__ = ("xds_class", "xds_type", "content", "checksum", "start", "end", "label")
+
+    def __init__(self, xds_class, xds_type, start, label):
+        self.xds_class = xds_class
+        self.xds_type = xds_type
+        self.content = bytearray()
+        self.checksum = None
+        self.start = start
+        self.end = None
+        self.label = label
+
+    @property
+    def is_valid(self):
+        """Checksum check: start code, type, content, end code and checksum sum to 0 (mod 128)."""
+        if self.checksum is None:
+            return False
+        return (self.xds_class * 2 - 1 + self.xds_type + sum(self.content) + XDS_END + self.checksum) & 0x7F == 0
+
+
+class XdsDecoder(object):
+    """Assembles XDS packets from a stream of words.
+
+    feed() returns True for words that belong to XDS. Packets finished since the last
+    drain() are collected in `completed`; errors as (position, error_type, label) in `errors`.
+    Call finish() at the end of the document to report packets that never ended.
+    """
+
+    __slots__ = ("_open", "_current", "completed", "errors")
+
+    def __init__(self):
+        self._open = {}
+        self._current = None
+        self.completed = []
+        self.errors = []
+
+    def _close(self, key):
+        packet = self._open.pop(key)
+        self.errors.append((packet.start, XDS_UNTERMINATED, packet.label))
+        if self._current == key:
+            self._current = None
+
+    def feed(self, value, pos, label=None):
+        """Process one word (parity bits are ignored). pos is its document position."""
+        b1 = (value >> 8) & 0x7F
+        b2 = value & 0x7F
+        if 0x01 <= b1 < XDS_END:
+            key = ((b1 + 1) // 2, b2)
+            if b1 & 1:  # start
+                if key in self._open:
+                    self._close(key)
+                self._open[key] = XdsPacket(key[0], b2, pos, label)
+                self._current = key
+            else:  # continue a suspended packet (ignored if its start was never seen)
+                self._current = key if key in self._open else None
+            return True
+        if b1 == XDS_END:
+            key = self._current
+            self._current = None
+            if key is None:
+                return True
+            packet = self._open.pop(key)
+            packet.checksum = b2
+            packet.end = pos
+            self.completed.append(packet)
+            if not packet.is_valid:
+                self.errors.append((pos, XDS_CHECKSUM_ERROR, label))
+            return True
+        if b1 >= 0x20 and self._current is not None:
+            packet = self._open[self._current]
+            if len(packet.content) >= XDS_MAX_CONTENT:
+                self._close(self._current)  # no end code within 32 characters
+                return True
+            packet.content.append(b1)
+            if b2:
+                packet.content.append(b2)
+            return True
+        if 0x10 <= b1 < 0x20:
+            self._current = None  # caption data interrupts the packet
+        return False
+
+    def drain(self):
+        """Return and clear the packets and errors collected so far: (packets, errors)."""
+        completed, errors = self.completed, self.errors
+        self.completed, self.errors = [], []
+        return completed, errors
+
+    def finish(self):
+        """Report every packet still open as unterminated."""
+        for key in sorted(self._open, key=lambda k: self._open[k].start):
+            self._close(key)
+
+
+def _text(content):
+    return "".join(chr(b) for b in content if b >= 0x20).strip()
+
+
+def _format_program_id(c):
+    if len(c) < 4:
+        return None
+    return "{0:02d}-{1:02d} {2:02d}:{3:02d} UTC".format(c[3] & 0x0F, c[2] & 0x1F, c[1] & 0x1F, c[0] & 0x3F)
+
+
+def _format_length(c):
+    if len(c) < 2:
+        return None
+    text = "{0}h{1:02d}m".format(c[1] & 0x3F, c[0] & 0x3F)
+    if len(c) >= 4:
+        text += " (elapsed {0}h{1:02d}m".format(c[3] & 0x3F, c[2] & 0x3F)
+        text += " {0:02d}s)".format(c[4] & 0x3F) if len(c) >= 5 else ")"
+    return text
+
+
+def _format_content_advisory(c):
+    if len(c) < 2:
+        return None
+    system = (c[0] >> 3) & 0x03
+    if system in (0, 2):
+        return "MPA " + XDS_RATINGS["mpa"][c[0] & 0x07]
+    if system == 1:
+        rating = XDS_RATINGS["usTv"][c[1] & 0x07]
+        flags = [flag for bit, flag in ((c[0] & 0x20, "D"), (c[1] & 0x08, "L"), (c[1] & 0x10, "S"), (c[1] & 0x20, "V")) if bit]
+        if rating == "TV-Y7" and "V" in flags:
+            flags = ["FV"]
+        return rating + ("-" + "".join(flags) if flags else "")
+    return None
+
+
+def _format_time_of_day(c):
+    if len(c) < 6:
+        return None
+    return "{0}-{1:02d}-{2:02d} {3:02d}:{4:02d} UTC".format(1990 + (c[5] & 0x3F), c[3] & 0x0F, c[2] & 0x1F, c[1] & 0x1F, c[0] & 0x3F)
+
+
+_FORMATTERS = {
+    "program_id": _format_program_id,
+    "length": _format_length,
+    "content_advisory": _format_content_advisory,
+    "time_of_day": _format_time_of_day,
+}
+
+
+def describe_packet(packet):
+    """One-line description, e.g. 'XDS Current Program Name: "Big Buck Bunny"'."""
+    class_name, types = XDS_CLASSES.get(packet.xds_class, ("Class {0}".format(packet.xds_class), {}))
+    type_name, fmt = types.get(packet.xds_type, ("Type 0x{0:02x}".format(packet.xds_type), None))
+    if fmt == "text":
+        value = '"{0}"'.format(_text(packet.content))
+    else:
+        value = _FORMATTERS[fmt](packet.content) if fmt in _FORMATTERS else None
+        if value is None:
+            value = " ".join("{0:02x}".format(b) for b in packet.content)
+    text = "XDS {0} {1}: {2}".format(class_name, type_name, value)
+    if not packet.is_valid:
+        text += " (bad checksum)"
+    return text
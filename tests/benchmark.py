@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Benchmark
+
+Measures analyze() throughput at each analysis level on the benchmark corpus: the
+files in samples/ and a day-long document made of samples/big-buck-bunny.scc repeated
+every 10 minutes. Each figure is the best of several runs. With --calls it counts the
+Scintilla calls (and bytes of text through them) the plugin makes to activate each
+document and to show a hover, using the mock_npp stand-in. Not part of the test suite.
+
+    python tests/benchmark.py [--repeat N] [--calls] [FILE ...]
+"""
+
+import argparse
+import io
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from scc_decoder import HEX_PATTERN  # noqa: E402
+from scc_document import ANALYSIS_LEVELS, analyze  # noqa: E402
+from scc_retime import retime_text  # noqa: E402
+from scc_timecode import detect_frame_rate  # noqa: E402
+
+SAMPLES = os.path.join(ROOT, "samples")
+# Copies of the sample in the day-long document, one every 10 minutes
+DAY_COPIES = 144
+# Lines whose words are hovered over for the per-hover call counts
+HOVER_LINES = 200
+
+
+def _read(path):
+    with io.open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def day_long_document(text):
+    """text's caption lines repeated every 10 minutes for a day, under one header."""
+    frame_rate, _ = detect_frame_rate(text)
+    header, _, body = text.partition("\n")
+    parts = [header + "\n"]
+    for copy in range(DAY_COPIES):
+        minutes = copy * 10
+        shifted, _ = retime_text(body, frame_rate, "{0:02d}:{1:02d}:00:00".format(minutes // 60, minutes % 60))
+        parts.append(shifted)
+    return "".join(parts)
+
+
+def corpus(paths=None):
+    """(name, text) of each benchmark document."""
+    if paths:
+        return [(os.path.basename(path), _read(path)) for path in paths]
+    documents = [(name, _read(os.path.join(SAMPLES, name))) for name in sorted(os.listdir(SAMPLES)) if name.lower().endswith(".scc")]
+    sample = dict(documents).get("big-buck-bunny.scc")
+    if sample is not None:
+        documents.append(("big-buck-bunny x{0} (day)".format(DAY_COPIES), day_long_document(sample)))
+    return documents
+
+
+def best_time(text, level, repeat):
+    """Shortest of repeat analyses of text at level, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        analyze(text, level=level)
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def scintilla_calls(documents):
+    """Print the Scintilla calls and bytes of an activation and of a hover, per level."""
+    import mock_npp
+
+    npp = mock_npp.install()
+    sys.path.insert(0, ROOT)
+    import scc_inspector
+
+    scc_inspector.analysis_cache = None
+    editor, notepad = npp.editor, npp.notepad
+    print("{0:<32} {1:>9} {2:>12} {3:>12} {4:>12} {5:>12}".format("document", "level", "open calls", "open KB", "hover calls", "hover bytes"))
+    for name, text in documents:
+        for level in ANALYSIS_LEVELS:
+            scc_inspector.ANALYSIS_LEVEL = level
+            editor.reset_counts()
+            notepad.activate("{0} ({1}).scc".format(name, level), text)  # a new buffer, so analyzed in full
+            opened = (editor.total_calls(), sum(editor.volume.values()))
+            positions = []
+            for line_num in range(min(HOVER_LINES, editor.getLineCount())):
+                start = editor.positionFromLine(line_num)
+                positions.extend(start + match.start() for match in HEX_PATTERN.finditer(editor.getLine(line_num)))
+            editor.reset_counts()
+            for pos in positions:
+                editor.dwell(pos)
+            hovers = max(1, len(positions))
+            print(
+                "{0:<32} {1:>9} {2:>12} {3:>12.1f} {4:>12.2f} {5:>12.0f}".format(
+                    name, level, opened[0], opened[1] / 1024.0, editor.total_calls() / float(hovers), sum(editor.volume.values()) / float(hovers)
+                )
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="analyze() throughput per analysis level.")
+    parser.add_argument("files", nargs="*", metavar="FILE", help="documents to measure (default: the benchmark corpus)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per level; the best is reported (default: 5)")
+    parser.add_argument("--calls", action="store_true", help="count Scintilla calls per activation and per hover instead of timing")
+    args = parser.parse_args(argv)
+    if args.calls:
+        scintilla_calls(corpus(args.files))
+        return 0
+
+    print("{0:<32} {1:>9} {2:>9} {3:>10} {4:>8} {5:>11}".format("document", "KB", "level", "ms", "MB/s", "lines/s"))
+    for name, text in corpus(args.files):
+        size = len(text.encode("utf-8"))
+        lines = text.count("\n") + 1
+        analyze(text)  # load the decode tables before timing
+        for level in ANALYSIS_LEVELS:
+            seconds = best_time(text, level, args.repeat)
+            print("{0:<32} {1:>9.0f} {2:>9} {3:>10.1f} {4:>8.2f} {5:>11.0f}".format(name, size / 1024.0, level, seconds * 1000, size / seconds / 1e6, lines / seconds))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
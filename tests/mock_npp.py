@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+"""
+Notepad++ Stand-In
+
+In-memory stand-ins for the PythonScript Npp module, realistic enough to run the
+plugin's render and hover paths: MockScintilla keeps the document as UTF-8 bytes with
+Scintilla's line and position math, stores indicator ranges, annotations and styles,
+captures call tips and moves indicators and annotations with edits, which fire
+MODIFIED callbacks. Every Scintilla call is counted, with the bytes of text passed in
+and returned, so tests can assert on what was rendered and benchmarks can track the
+calls an activation or a hover costs.
+
+    npp = install()           # before importing scc_inspector
+    import scc_inspector
+    npp.notepad.activate("a.scc", text)
+    npp.editor.reset_counts()
+    npp.editor.dwell(position)
+    npp.editor.calls["callTipShow"], npp.editor.calltip
+"""
+
+import bisect
+import re
+import sys
+import types
+from collections import Counter
+
+# Scintilla / Notepad++ constants the plugin uses (Scintilla's values where it has them)
+SCINTILLANOTIFICATION = type("SCINTILLANOTIFICATION", (object,), {"MODIFIED": 2008, "DWELLSTART": 2016, "DWELLEND": 2017, "UPDATEUI": 2007})
+NOTIFICATION = type("NOTIFICATION", (object,), {"BUFFERACTIVATED": 1010, "FILECLOSED": 1003})
+MODIFICATIONFLAGS = type("MODIFICATIONFLAGS", (object,), {"INSERTTEXT": 0x1, "DELETETEXT": 0x2})
+INDICATORSTYLE = type("INDICATORSTYLE", (object,), {"PLAIN": 0, "SQUIGGLE": 1, "BOX": 6, "ROUNDBOX": 7, "STRAIGHTBOX": 8, "DOTBOX": 12})
+ANNOTATIONVISIBLE = type("ANNOTATIONVISIBLE", (object,), {"HIDDEN": 0, "STANDARD": 1, "BOXED": 2})
+
+_LINE_END = re.compile(b"\r\n|\r|\n")
+
+
+def _as_bytes(text):
+    if text is None:
+        return None
+    return text if isinstance(text, bytes) else text.encode("utf-8")
+
+
+def _payload(values):
+    """UTF-8 bytes of the text among values."""
+    return sum(len(_as_bytes(value)) for value in values if isinstance(value, (bytes, type(u""))))  # fmt: skip
+
+
+def _clear(handlers, *args):
+    """clearCallbacks([notifications]), clearCallbacks(handler) or clearCallbacks(handler, [notifications]); all with no arguments."""
+    handler = args[0] if args and callable(args[0]) else None
+    notifications = args[-1] if args and not callable(args[-1]) else None
+    kept = []
+    for registered, wanted in handlers:
+        if handler is None or registered == handler:
+            wanted = [n for n in wanted if notifications is not None and n not in notifications]
+        if wanted:
+            kept.append((registered, wanted))
+    handlers[:] = kept
+
+
+def _fire(handlers, notification, args):
+    for handler, notifications in list(handlers):
+        if notification in notifications:
+            handler(args)
+
+
+class MockScintilla(object):
+    """The editor object: document, indicators, annotations, styles and call tips.
+
+    calls counts each API method called and volume the bytes of text passed to and
+    returned by it. The helpers that are not Scintilla calls (activate through
+    MockNotepad, dwell, indicator_ranges, annotations, reset_counts) are not counted.
+    """
+
+    # Scintilla methods, wrapped to count calls and bytes below
+    API = (
+        "setText",
+        "getText",
+        "getCharacterPointer",
+        "getLength",
+        "getLineCount",
+        "getLine",
+        "getTextRange",
+        "positionFromLine",
+        "lineFromPosition",
+        "getLineEndPosition",
+        "insertText",
+        "deleteRange",
+        "getCurrentPos",
+        "gotoPos",
+        "gotoLine",
+        "beginUndoAction",
+        "endUndoAction",
+        "setIndicatorCurrent",
+        "getIndicatorCurrent",
+        "indicatorFillRange",
+        "indicatorClearRange",
+        "indicatorValueAt",
+        "indicatorAllOnFor",
+        "indicSetStyle",
+        "indicSetFore",
+        "indicSetUnder",
+        "annotationSetText",
+        "annotationGetText",
+        "annotationSetStyles",
+        "annotationGetStyles",
+        "annotationClearAll",
+        "annotationSetVisible",
+        "annotationGetVisible",
+        "styleSetFore",
+        "styleSetBack",
+        "styleSetBold",
+        "styleSetItalic",
+        "styleGetFore",
+        "styleGetBack",
+        "callTipShow",
+        "callTipCancel",
+        "callTipActive",
+        "setMouseDwellTime",
+        "callback",
+        "clearCallbacks",
+    )
+
+    def __init__(self):
+        self.data = b""
+        self.current_pos = 0
+        self.indicator_current = 0
+        self.indicators = {}  # indicator -> sorted, merged [start, end) ranges
+        self.indicator_styles = {}  # indicator -> {"style": ..., "fore": ..., "under": ...}
+        self.annotation_text = {}  # line -> text bytes
+        self.annotation_styles = {}  # line -> style bytes
+        self.annotation_visible = ANNOTATIONVISIBLE.HIDDEN
+        self.styles = {}  # style -> {"fore": ..., "back": ..., "bold": ..., "italic": ...}
+        self.calltip = None  # (position, text) of the call tip showing
+        self.calltips = []  # every call tip shown
+        self.dwell_time = 10000000
+        self.handlers = []  # (handler, notifications)
+        self.undo_depth = 0
+        self.calls = Counter()
+        self.volume = Counter()
+        self._starts = None
+
+    # Counters
+
+    def reset_counts(self):
+        self.calls.clear()
+        self.volume.clear()
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    # Document and positions (UTF-8 bytes, lines ending in \r\n, \r or \n)
+
+    def load(self, text):
+        """Replace the document without notifications, as opening a file does."""
+        self.data = _as_bytes(text)
+        self._starts = None
+        self.annotation_text.clear()
+        self.annotation_styles.clear()
+        self.indicators.clear()
+        self.calltip = None
+
+    def _line_starts(self):
+        if self._starts is None:
+            self._starts = [0] + [match.end() for match in _LINE_END.finditer(self.data)]
+        return self._starts
+
+    def _line_of(self, pos):
+        return max(0, bisect.bisect_right(self._line_starts(), min(max(pos, 0), len(self.data))) - 1)
+
+    def _line_start(self, line):
+        starts = self._line_starts()
+        return starts[line] if 0 <= line < len(starts) else -1
+
+    def _line_text(self, line):
+        starts = self._line_starts()
+        if not 0 <= line < len(starts):
+            return ""
+        end = starts[line + 1] if line + 1 < len(starts) else len(self.data)
+        return self.data[starts[line] : end].decode("utf-8", "replace")
+
+    # The API methods below call each other only through the helpers above, so each
+    # counts the plugin's own calls alone
+
+    def setText(self, text):
+        if self.data:
+            self._delete(0, len(self.data))
+        self._insert(0, text)
+
+    def getText(self):
+        return self.data.decode("utf-8", "replace")
+
+    def getCharacterPointer(self):
+        return self.data.decode("utf-8", "replace")
+
+    def getLength(self):
+        return len(self.data)
+
+    def getLineCount(self):
+        return len(self._line_starts())
+
+    def getLine(self, line):
+        return self._line_text(line)
+
+    def getTextRange(self, start, end):
+        return self.data[start:end].decode("utf-8", "replace")
+
+    def positionFromLine(self, line):
+        return self._line_start(line)
+
+    def lineFromPosition(self, pos):
+        return self._line_of(pos)
+
+    def getLineEndPosition(self, line):
+        text = self._line_text(line)
+        return self._line_start(line) + len(_as_bytes(text.rstrip("\r\n"))) if text else len(self.data)
+
+    def insertText(self, pos, text):
+        self._insert(pos if pos >= 0 else self.current_pos, text)
+
+    def deleteRange(self, pos, length):
+        self._delete(pos, length)
+
+    def _insert(self, pos, text):
+        inserted = _as_bytes(text)
+        if not inserted:
+            return
+        line = self._line_of(pos)
+        lines_added = len(_LINE_END.findall(inserted))
+        self.data = self.data[:pos] + inserted + self.data[pos:]
+        self._starts = None
+        length = len(inserted)
+        self._map_positions(lambda x: x + length if x > pos else x, lambda s, e: (s + length, e + length) if s >= pos else (s, e + length if e > pos else e))
+        self._move_annotations(line, lines_added)
+        _fire(self.handlers, SCINTILLANOTIFICATION.MODIFIED, {"modificationType": MODIFICATIONFLAGS.INSERTTEXT, "position": pos, "length": length, "linesAdded": lines_added, "text": text})
+
+    def _delete(self, pos, length):
+        if length <= 0:
+            return
+        line = self._line_of(pos)
+        lines_added = -len(_LINE_END.findall(self.data[pos : pos + length]))
+        self.data = self.data[:pos] + self.data[pos + length :]
+        self._starts = None
+        end = pos + length
+
+        def moved(x):
+            return x if x < pos else (pos if x < end else x - length)
+
+        self._map_positions(moved, lambda s, e: (moved(s), moved(e)))
+        self._move_annotations(line, lines_added)
+        _fire(self.handlers, SCINTILLANOTIFICATION.MODIFIED, {"modificationType": MODIFICATIONFLAGS.DELETETEXT, "position": pos, "length": length, "linesAdded": lines_added, "text": None})
+
+    def _map_positions(self, point, span):
+        self.current_pos = point(self.current_pos)
+        for indicator, ranges in self.indicators.items():
+            self.indicators[indicator] = _merge(span(start, end) for start, end in ranges)
+
+    def _move_annotations(self, line, lines_added):
+        """Annotations below an edit move with their lines; those of deleted lines go."""
+        if lines_added == 0:
+            return
+        for store in (self.annotation_text, self.annotation_styles):
+            moved = {}
+            for line_num, value in store.items():
+                if line_num <= line:
+                    moved[line_num] = value
+                elif line_num > line - lines_added:
+                    moved[line_num + lines_added] = value
+            store.clear()
+            store.update(moved)
+
+    def getCurrentPos(self):
+        return self.current_pos
+
+    def gotoPos(self, pos):
+        self.current_pos = min(max(pos, 0), len(self.data))
+
+    def gotoLine(self, line):
+        self.current_pos = max(self._line_start(min(line, len(self._line_starts()) - 1)), 0)
+
+    def beginUndoAction(self):
+        self.undo_depth += 1
+
+    def endUndoAction(self):
+        self.undo_depth -= 1
+
+    # Indicators
+
+    def setIndicatorCurrent(self, indicator):
+        self.indicator_current = indicator
+
+    def getIndicatorCurrent(self):
+        return self.indicator_current
+
+    def indicatorFillRange(self, start, length):
+        if length > 0:
+            ranges = self.indicators.get(self.indicator_current, [])
+            self.indicators[self.indicator_current] = _merge(ranges + [(start, min(start + length, len(self.data)))])
+
+    def indicatorClearRange(self, start, length):
+        end = start + length
+        kept = []
+        for s, e in self.indicators.get(self.indicator_current, []):
+            kept.extend(piece for piece in ((s, min(e, start)), (max(s, end), e)) if piece[0] < piece[1])
+        self.indicators[self.indicator_current] = kept
+
+    def _value_at(self, indicator, pos):
+        return int(any(s <= pos < e for s, e in self.indicators.get(indicator, [])))
+
+    def indicatorValueAt(self, indicator, pos):
+        return self._value_at(indicator, pos)
+
+    def indicatorAllOnFor(self, pos):
+        return sum(1 << indicator for indicator in self.indicators if self._value_at(indicator, pos))
+
+    def indicSetStyle(self, indicator, style):
+        self.indicator_styles.setdefault(indicator, {})["style"] = style
+
+    def indicSetFore(self, indicator, fore):
+        self.indicator_styles.setdefault(indicator, {})["fore"] = fore
+
+    def indicSetUnder(self, indicator, under):
+        self.indicator_styles.setdefault(indicator, {})["under"] = under
+
+    def indicator_ranges(self, indicator):
+        """Filled [start, end) ranges of an indicator, merged and in order (not a Scintilla call)."""
+        return list(self.indicators.get(indicator, []))
+
+    # Annotations and styles
+
+    def annotationSetText(self, line, text):
+        text = _as_bytes(text)
+        self.annotation_styles.pop(line, None)  # new text starts in the default style
+        if text:
+            self.annotation_text[line] = text
+        else:
+            self.annotation_text.pop(line, None)
+
+    def annotationGetText(self, line):
+        return self.annotation_text.get(line, b"").decode("utf-8", "replace")
+
+    def annotationSetStyles(self, line, styles):
+        if line in self.annotation_text:
+            self.annotation_styles[line] = _as_bytes(styles)
+
+    def annotationGetStyles(self, line):
+        return self.annotation_styles.get(line, b"")
+
+    def annotationClearAll(self):
+        self.annotation_text.clear()
+        self.annotation_styles.clear()
+
+    def annotationSetVisible(self, visible):
+        self.annotation_visible = visible
+
+    def annotationGetVisible(self):
+        return self.annotation_visible
+
+    def annotations(self):
+        """{line: (text_bytes, style_bytes)} of every annotation (not a Scintilla call)."""
+        return dict((line, (text, self.annotation_styles.get(line, b""))) for line, text in self.annotation_text.items())
+
+    def styleSetFore(self, style, fore):
+        self.styles.setdefault(style, {})["fore"] = fore
+
+    def styleSetBack(self, style, back):
+        self.styles.setdefault(style, {})["back"] = back
+
+    def styleSetBold(self, style, bold):
+        self.styles.setdefault(style, {})["bold"] = bold
+
+    def styleSetItalic(self, style, italic):
+        self.styles.setdefault(style, {})["italic"] = italic
+
+    def styleGetFore(self, style):
+        return self.styles.get(style, {}).get("fore", (0, 0, 0))
+
+    def styleGetBack(self, style):
+        return self.styles.get(style, {}).get("back", (255, 255, 255))
+
+    # Call tips, dwell and callbacks
+
+    def callTipShow(self, pos, text):
+        self.calltip = (pos, _as_bytes(text).decode("utf-8", "replace"))
+        self.calltips.append(self.calltip)
+
+    def callTipCancel(self):
+        self.calltip = None
+
+    def callTipActive(self):
+        return self.calltip is not None
+
+    def setMouseDwellTime(self, milliseconds):
+        self.dwell_time = milliseconds
+
+    def callback(self, handler, notifications):
+        self.handlers.append((handler, list(notifications)))
+
+    def clearCallbacks(self, *args):
+        _clear(self.handlers, *args)
+
+    def dwell(self, pos):
+        """Rest the mouse over a position: fire DWELLSTART as Scintilla does (not a Scintilla call)."""
+        _fire(self.handlers, SCINTILLANOTIFICATION.DWELLSTART, {"position": pos, "x": 0, "y": 0})
+
+
+def _merge(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _counted(name, method):
+    def api(self, *args):
+        self.calls[name] += 1
+        result = method(self, *args)
+        self.volume[name] += _payload(args) + _payload((result,))
+        return result
+
+    api.__name__ = method.__name__
+    api.__doc__ = method.__doc__
+    return api
+
+
+for _name in MockScintilla.API:
+    setattr(MockScintilla, _name, _counted(_name, MockScintilla.__dict__[_name]))
+
+
+class MockNotepad(object):
+    """The notepad object: one editor view with buffers switched by activate()."""
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.filename = "new 1"
+        self.buffer_id = 1
+        self.buffers = {}  # filename -> buffer id
+        self.handlers = []
+        self.answers = []  # replies for prompt(), oldest first (None when empty)
+        self.messages = []
+        self.opened = []
+
+    def activate(self, filename, text):
+        """Show a document in the editor and fire BUFFERACTIVATED, as switching tabs does."""
+        self.buffer_id = self.buffers.setdefault(filename, len(self.buffers) + 1)
+        self.filename = filename
+        self.editor.load(text)
+        _fire(self.handlers, NOTIFICATION.BUFFERACTIVATED, {"bufferID": self.buffer_id})
+
+    def close(self, filename):
+        """Close a document's buffer and fire FILECLOSED."""
+        buffer_id = self.buffers.pop(filename)
+        _fire(self.handlers, NOTIFICATION.FILECLOSED, {"bufferID": buffer_id})
+
+    def getCurrentFilename(self):
+        return self.filename
+
+    def getCurrentBufferID(self):
+        return self.buffer_id
+
+    def callback(self, handler, notifications):
+        self.handlers.append((handler, list(notifications)))
+
+    def clearCallbacks(self, *args):
+        _clear(self.handlers, *args)
+
+    def prompt(self, prompt, title, default=""):
+        return self.answers.pop(0) if self.answers else None
+
+    def messageBox(self, message, title="", flags=0):
+        self.messages.append(message)
+
+    def open(self, path):
+        self.opened.append(path)
+
+
+class MockConsole(object):
+    """The console object; keeps what is written."""
+
+    def __init__(self):
+        self.output = []
+        self.errors = []
+
+    def write(self, text):
+        self.output.append(text)
+
+    def writeError(self, text):
+        self.errors.append(text)
+
+
+def install():
+    """Create an Npp module with a fresh editor, notepad and console and register it
+    as sys.modules["Npp"]. Returns the module."""
+    npp = types.ModuleType("Npp")
+    npp.editor = MockScintilla()
+    npp.notepad = MockNotepad(npp.editor)
+    npp.console = MockConsole()
+    for name, value in (
+        ("SCINTILLANOTIFICATION", SCINTILLANOTIFICATION),
+        ("NOTIFICATION", NOTIFICATION),
+        ("MODIFICATIONFLAGS", MODIFICATIONFLAGS),
+        ("INDICATORSTYLE", INDICATORSTYLE),
+        ("ANNOTATIONVISIBLE", ANNOTATIONVISIBLE),
+    ):
+        setattr(npp, name, value)
+    sys.modules["Npp"] = npp
+    return npp
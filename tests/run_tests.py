@@ -31,6 +31,24 @@ if __name__ == "__main__":
         "test_all.py",
         "test_buffer.py",
         "test_overflow.py",
+        "test_analysis.py",
+        "test_navigation.py",
+        "test_diff.py",
+        "test_cache.py",
+        "test_memory.py",
+        "test_mpegts.py",
+        "test_xds.py",
+        "test_retime.py",
+        "test_qc.py",
+        "test_watch.py",
+        "test_report.py",
+        "test_lines.py",
+        "test_document.py",
+        "test_schedule.py",
+        "test_rules.py",
+        "test_server.py",
+        "test_validate.py",
+        "test_render_path.py",
     ]
 
     results = {}
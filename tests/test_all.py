@@ -44,6 +44,9 @@ class MockEditor:
     def getText(self):
         return "\n".join(self.lines)
 
+    def getCharacterPointer(self):
+        return "\n".join(self.lines)
+
     def lineFromPosition(self, pos):
         return 0
 
@@ -118,7 +121,7 @@ sys.modules["Npp"] = MockNpp()
 sys.modules["Npp"].editor = MockEditor()
 sys.modules["Npp"].notepad = MockNotepad()
 sys.modules["Npp"].console = MockConsole()
-sys.modules["Npp"].SCINTILLANOTIFICATION = type("obj", (object,), {"DWELLSTART": 0, "UPDATEUI": 1})
+sys.modules["Npp"].SCINTILLANOTIFICATION = type("obj", (object,), {"DWELLSTART": 0, "UPDATEUI": 1, "MODIFIED": 2})
 sys.modules["Npp"].NOTIFICATION = type("obj", (object,), {"BUFFERACTIVATED": 0, "FILECLOSED": 1})
 sys.modules["Npp"].INDICATORSTYLE = type("obj", (object,), {"SQUIGGLE": 0, "ROUNDBOX": 1})
 sys.modules["Npp"].ANNOTATIONVISIBLE = type("obj", (object,), {"BOXED": 0})
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Tests
+
+Tests for the editor-independent analysis pipeline (time map stitching, captions).
+"""
+
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_analysis import (  # noqa: E402
+    DUPLICATE_TIMESTAMP,
+    PACKET_OVERLAP,
+    TIMECODE_GAP,
+    TIMECODE_ORDER,
+    _analyze_chunk,
+    build_time_map_lines,
+    build_time_map_parallel,
+    describe_timing_issue,
+    find_chunk_boundaries,
+    stitch_chunks,
+    TimestampIndex,
+)
+from scc_captions import Caption, CaptionIndex, build_captions  # noqa: E402
+from scc_timecode import frames_to_timestamp, packet_frame_offset, timestamp_to_frames  # noqa: E402
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples", "big-buck-bunny.scc")
+
+# Captions that straddle lines: loads without blank separators, ENM mid-load, EDM-only lines
+STRADDLE_LINES = [
+    "Scenarist_SCC V1.0\n",
+    "00:00:01:00\t9420 9420 94d0 94d0 c1c2\n",
+    "00:00:02:00\tc4c4 942f 942f\n",
+    "00:00:03:00\t9420 9420 9470 9470 e5e6\n",
+    "\n",
+    "00:00:04:00\t94ae 94ae 9420 9420 9470 9470 c1c1\n",
+    "00:00:05:00\t942f 942f\n",
+    "00:00:06:00\t942c 942c\n",
+    "00:00:07:00\t9420 9420 94d0 94d0 c1c2 942f 942f 9420 9420 94d0 94d0 c4c4\n",
+    "\n",
+    "00:00:09:00\t942f 942f\n",
+    "00:00:10:00\t942c 942c\n",
+]
+
+
+def _load_sample():
+    with open(SAMPLE_PATH, "r") as f:
+        return f.read().splitlines(True)
+
+
+def _stitched(lines, frame_rate, boundaries):
+    edges = [0] + boundaries + [len(lines)]
+    results = [_analyze_chunk((lines[start:end], frame_rate, start)) for start, end in zip(edges, edges[1:])]
+    return stitch_chunks(results)
+
+
+def test_stitch_every_split_point():
+    """Test any single split of a file stitches back to the serial result"""
+    expected = build_time_map_lines(STRADDLE_LINES, "29.97 NDF")
+    for split in range(1, len(STRADDLE_LINES)):
+        if _stitched(STRADDLE_LINES, "29.97 NDF", [split]) != expected:
+            return False
+    return True
+
+
+def test_stitch_every_line_a_chunk():
+    """Test one chunk per line still matches the serial result"""
+    lines = _load_sample()
+    expected = build_time_map_lines(lines, "23.98")
+    return _stitched(lines, "23.98", list(range(1, len(lines)))) == expected
+
+
+def test_chunk_boundaries_follow_eoc():
+    """Test boundaries land on timestamped lines after an EOC/EDM line"""
+    lines = _load_sample()
+    boundaries = find_chunk_boundaries(lines, 4)
+    if len(boundaries) != 3 or boundaries != sorted(boundaries):
+        return False
+    for idx in boundaries:
+        if not lines[idx][:2].isdigit():
+            return False
+        prev = idx - 1
+        while not lines[prev].strip():
+            prev -= 1
+        if "942f" not in lines[prev] and "942c" not in lines[prev]:
+            return False
+    return True
+
+
+def test_parallel_matches_serial():
+    """Test the process pool result is identical to the serial scan"""
+    lines = _load_sample() * 4
+    expected = build_time_map_lines(lines, "23.98")
+    return build_time_map_parallel(lines, "23.98", workers=3, min_lines=0) == expected
+
+
+def test_build_captions_sample():
+    """Test captions are built from the time map with frames, rows and channel"""
+    lines = _load_sample()
+    time_map, _, line_texts = build_time_map_lines(lines, "23.98")
+    captions = build_captions(time_map, line_texts, "23.98")
+    first = captions[0]
+    if first.lines != (4,) or first.channel != 1 or first.rows != (" [SERENE MUSIC]",):
+        return False
+    if (first.start_frame, first.end_frame) != (59, 153):
+        return False
+    timed = sum(1 for times in time_map.values() if times[0] is not None)
+    return sum(len(c.lines) for c in captions) == timed
+
+
+def test_caption_index_matches_scan():
+    """Test interval index queries match a linear scan"""
+    rng = random.Random(7)
+    captions = []
+    for _ in range(300):
+        start = rng.randint(0, 5000)
+        end = None if rng.random() < 0.05 else start + rng.randint(0, 200)
+        captions.append(Caption((len(captions),), 1, start, end, ("x",), ((),)))
+    index = CaptionIndex(captions)
+
+    def showing(c, frame):
+        return c.start_frame <= frame and (c.end_frame is None or frame < c.end_frame)
+
+    def overlaps(c, lo, hi):
+        return c.start_frame < hi and (c.end_frame is None or c.end_frame > lo) and (c.start_frame >= lo or showing(c, lo))
+
+    for frame in range(-10, 5300, 13):
+        expected = sorted((c for c in captions if showing(c, frame)), key=lambda c: (c.start_frame, c.lines))
+        if index.at(frame) != expected:
+            return False
+    for _ in range(200):
+        lo = rng.randint(0, 5200)
+        hi = lo + rng.randint(1, 400)
+        expected = sorted((c for c in captions if overlaps(c, lo, hi)), key=lambda c: (c.start_frame, c.lines))
+        if index.between(lo, hi) != expected:
+            return False
+    return True
+
+
+def test_overflow_ignores_line_layout():
+    """Test overflow is found against the next timestamped line whatever lies between them"""
+    packets = " ".join(["8080"] * 40)
+    for separator in ("", "\n", "\n\n\n"):
+        lines = ["Scenarist_SCC V1.0\n", "\n", "00:00:01:00\t" + packets + "\n", separator, "00:00:02:00\t942c 942c\n"]
+        lines = "".join(lines).splitlines(True)
+        _, timestamp_map, _ = build_time_map_lines(lines, "25")
+        index = TimestampIndex(timestamp_map, "25")
+        # 40 packets sent at ~30/s from frame 25 run through frame 58; the next line starts at frame 50
+        if index.overflow(2) != (True, 10) or index.gap(2) != -9:
+            return False
+        if index.next_line(2) != len(lines) - 1 or index.prev_line(len(lines) - 1) != 2:
+            return False
+    return True
+
+
+def test_overflow_counts_match_packet_times():
+    """Test overflow counts equal the packets timed at or after the next line (2:3 cadence included)"""
+    rng = random.Random(11)
+    for frame_rate in ("23.98", "29.97 NDF", "25"):
+        timestamp_map = {}
+        frame = 0
+        for line_num in range(0, 400, 2):
+            frame += rng.randint(0, 30)
+            timestamp_map[line_num] = (frames_to_timestamp(frame, frame_rate), rng.randint(1, 40))
+        index = TimestampIndex(timestamp_map, frame_rate)
+        for line_num in range(0, 398, 2):
+            start = timestamp_to_frames(timestamp_map[line_num][0], frame_rate)
+            next_start = timestamp_to_frames(timestamp_map[line_num + 2][0], frame_rate)
+            late = sum(1 for p in range(timestamp_map[line_num][1]) if start + packet_frame_offset(p, frame_rate) >= next_start)
+            if index.overflow(line_num) != (late > 0, late):
+                return False
+    return True
+
+
+def test_timing_issues():
+    """Test out-of-order, duplicate and overlapping starts and long gaps are found against earlier lines"""
+    timestamp_map = {
+        0: ("00:00:01:00", 40),  # plays through frame 57
+        2: ("00:00:01:10", 1),  # overflow of line 0, not an issue of this line
+        4: ("00:00:01:20", 1),  # line 0 is still playing
+        6: ("00:00:01:20", 1),
+        8: ("00:00:01:15", 1),
+        10: ("00:00:03:00", 1),
+        12: ("00:10:00:00", 1),
+    }
+    index = TimestampIndex(timestamp_map, "25")
+    expected = {4: (PACKET_OVERLAP, 0), 6: (DUPLICATE_TIMESTAMP, 4), 8: (TIMECODE_ORDER, 5), 12: (TIMECODE_GAP, 14924)}
+    if index.issues != expected or index.timing_issue(10) is not None or index.overflow(0) != (True, 28):
+        return False
+    if describe_timing_issue(index.timing_issue(12), "25") != "597.0s gap after the previous line":
+        return False
+    return describe_timing_issue(expected[4], "25") == "Starts while packets of line 1 are still playing"
+
+
+if __name__ == "__main__":
+    print("=== Analysis Tests ===\n")
+
+    tests = [
+        ("Stitch Every Split Point", test_stitch_every_split_point),
+        ("Stitch Every Line A Chunk", test_stitch_every_line_a_chunk),
+        ("Chunk Boundaries Follow EOC", test_chunk_boundaries_follow_eoc),
+        ("Parallel Matches Serial", test_parallel_matches_serial),
+        ("Build Captions Sample", test_build_captions_sample),
+        ("Caption Index Matches Scan", test_caption_index_matches_scan),
+        ("Overflow Ignores Line Layout", test_overflow_ignores_line_layout),
+        ("Overflow Counts Match Packet Times", test_overflow_counts_match_packet_times),
+        ("Timing Issues", test_timing_issues),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Cache Tests
+
+Tests for render plans and the persistent on-disk analysis cache.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_analysis import TimestampIndex, build_time_map_lines  # noqa: E402
+import scc_cache  # noqa: E402
+from scc_cache import AnalysisCache, pack_analysis, unpack_analysis  # noqa: E402
+from scc_render import build_render_plan, line_start_positions  # noqa: E402
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples", "big-buck-bunny.scc")
+
+
+def _analyze(text, frame_rate="23.98"):
+    lines = text.splitlines(True)
+    time_map, timestamp_map, line_texts = build_time_map_lines(lines, frame_rate)
+    plan = build_render_plan(time_map, TimestampIndex(timestamp_map, frame_rate), line_texts, line_start_positions(lines))
+    return frame_rate, time_map, timestamp_map, plan
+
+
+def _sample_text():
+    with open(SAMPLE_PATH, "r") as f:
+        return f.read()
+
+
+def _with_cache(test, max_bytes=1 << 30):
+    tmp = tempfile.mkdtemp()
+    try:
+        return test(AnalysisCache(os.path.join(tmp, "cache"), max_bytes), tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _write(path, text):
+    with open(path, "wb") as f:
+        f.write(text.encode("utf-8"))
+    return text.encode("utf-8")
+
+
+def test_render_plan_positions():
+    """Test plan ranges and errors land on the right document positions"""
+    text = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 94d0 94d0 c1c2 942f 942f\n\n00:00:02:00\t942c 942c 1234\n"
+    _, _, _, plan = _analyze(text)
+    pairs = [text[plan.pair_ranges[i] : plan.pair_ranges[i] + plan.pair_ranges[i + 1]] for i in range(0, len(plan.pair_ranges), 2)]
+    if pairs != ["9420 9420", "94d0 94d0", "942f 942f", "942c 942c"]:
+        return False
+    if [text[p : p + 4] for p in plan.parity_ranges[::2]] != ["1234"]:
+        return False
+    return [line for line, _, _ in plan.annotations] == [2] and list(plan.error_index.positions) == [text.index("1234")]
+
+
+def test_round_trip():
+    """Test a stored analysis loads back identical, by content digest and by size/mtime"""
+    text = _sample_text()
+    analysis = _analyze(text)
+
+    def run(cache, tmp):
+        path = os.path.join(tmp, "sample.scc")
+        data = _write(path, text)
+        if not cache.store(path, data, pack_analysis(*analysis)):
+            return False
+        for payload in (cache.load(path, data), cache.load(path)):
+            if payload is None:
+                return False
+            frame_rate, time_map, timestamp_map, plan, level = unpack_analysis(payload)
+            if (frame_rate, time_map, timestamp_map, plan.to_data(), level) != (analysis[0], analysis[1], analysis[2], analysis[3].to_data(), "full"):
+                return False
+        return list(plan.error_index.positions) == list(analysis[3].error_index.positions)
+
+    return _with_cache(run)
+
+
+def test_changed_content_misses():
+    """Test edited content, a touched file or a corrupt entry are cache misses, the first two without hashing"""
+    text = _sample_text()
+
+    def run(cache, tmp):
+        path = os.path.join(tmp, "sample.scc")
+        data = _write(path, text)
+        cache.store(path, data, pack_analysis(*_analyze(text)))
+        edited = data.replace(b"942f", b"942c", 1)
+        if cache.load(path, edited) is not None:
+            return False
+        with open(cache.entry_path(path), "r+b") as f:
+            f.seek(-16, 2)
+            f.write(b"\x00" * 16)
+        if cache.load(path, data) is not None:
+            return False
+        # Content of another length, or a touched file, is rejected before it is hashed
+        cache.store(path, data, pack_analysis(*_analyze(text)))
+        hashed = []
+        digest = scc_cache.document_digest
+        scc_cache.document_digest = lambda data: hashed.append(data) or digest(data)
+        try:
+            if cache.load(path, data + b"\n") is not None or cache.load(path, text[:-1]) is not None:
+                return False
+            st = os.stat(path)
+            os.utime(path, (st.st_atime, st.st_mtime + 10))
+            if cache.load(path) is not None or cache.load(path, data) is not None or hashed:
+                return False
+            cache.store(path, data, pack_analysis(*_analyze(text)))
+            del hashed[:]
+            return cache.load(path, data) is not None and len(hashed) == 1
+        finally:
+            scc_cache.document_digest = digest
+
+    return _with_cache(run)
+
+
+def test_text_matches_bytes():
+    """Test an entry stored for a document's bytes is found from its text, digested in chunks"""
+    text = _sample_text() + u"\u00e9"  # fmt: skip
+
+    def run(cache, tmp):
+        path = os.path.join(tmp, "sample.scc")
+        data = _write(path, text)
+        cache.store(path, data, pack_analysis(*_analyze(text)))
+        if scc_cache.document_digest(text) != (len(data), scc_cache.content_digest(data)):
+            return False
+        scc_cache.DIGEST_CHUNK = 7
+        try:
+            return cache.load(path, text) is not None and cache.load(path, text[:-1]) is None
+        finally:
+            scc_cache.DIGEST_CHUNK = 1 << 20
+
+    return _with_cache(run)
+
+
+def test_lru_eviction():
+    """Test the cache stays under its size cap and evicts the least recently used entry"""
+    text = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 94d0 94d0 c1c2 942f 942f\n"
+    payload = pack_analysis(*_analyze(text))
+
+    def run(cache, tmp):
+        paths = [os.path.join(tmp, "f{0}.scc".format(i)) for i in range(4)]
+        datas = [_write(p, text) for p in paths]
+        cache.store(paths[0], datas[0], payload)
+        entry_size = os.path.getsize(cache.entry_path(paths[0]))
+        cache.max_bytes = entry_size * 3
+        for i, path in enumerate(paths[1:3], 1):
+            os.utime(cache.entry_path(paths[i - 1]), (1000 + i, 1000 + i))
+            cache.store(path, datas[i], payload)
+        os.utime(cache.entry_path(paths[2]), (1010, 1010))
+        cache.load(paths[0], datas[0])  # most recently used now
+        cache.store(paths[3], datas[3], payload)
+        present = [os.path.exists(cache.entry_path(p)) for p in paths]
+        total = sum(os.path.getsize(os.path.join(cache.cache_dir, n)) for n in os.listdir(cache.cache_dir))
+        return present == [True, False, True, True] and total <= cache.max_bytes
+
+    return _with_cache(run)
+
+
+def test_non_ascii_path():
+    """Test a path with non-ASCII characters, as bytes (Python 2 file names) or text, is cached"""
+    text = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 94d0 94d0 c1c2 942f 942f\n"
+    payload = pack_analysis(*_analyze(text))
+
+    def run(cache, tmp):
+        name = u"caf\u00e9.scc"  # fmt: skip
+        if sys.version_info[0] == 2:
+            name = name.encode("utf-8")
+        path = os.path.join(tmp, name)
+        data = _write(path, text)
+        cache.variant = "no_xds"
+        if not cache.store(path, data, payload) or cache.load(path, data) is None:
+            return False
+        cache.variant = ""
+        return cache.load(path, data) is None
+
+    return _with_cache(run)
+
+
+if __name__ == "__main__":
+    print("=== Analysis Cache Tests ===\n")
+
+    tests = [
+        ("Render Plan Positions", test_render_plan_positions),
+        ("Round Trip", test_round_trip),
+        ("Changed Content Misses", test_changed_content_misses),
+        ("Text Matches Bytes", test_text_matches_bytes),
+        ("LRU Eviction", test_lru_eviction),
+        ("Non-ASCII Path", test_non_ascii_path),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
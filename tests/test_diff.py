@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Caption Diff Tests
+
+Tests for caption-level semantic diffs between SCC files, across frame rates and with
+the editor's line numbering.
+"""
+
+import sys
+import os
+import re
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_diff import ADDED, CHANGED, REMOVED, RETIMED, align, diff_texts, load_captions, summarize  # noqa: E402
+from scc_retime import retime_text  # noqa: E402
+from scc_timecode import frames_to_timestamp, timestamp_to_frames  # noqa: E402
+
+TIMESTAMP_LINE = re.compile(r"\d\d:\d\d:\d\d[:;]\d\d\t")
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples", "big-buck-bunny.scc")
+
+
+def _load_sample():
+    with open(SAMPLE_PATH, "r") as f:
+        return f.read()
+
+
+def _shift(text, frames, frame_rate="23.98"):
+    return re.sub(
+        r"^\d\d:\d\d:\d\d[:;]\d\d",
+        lambda m: frames_to_timestamp(timestamp_to_frames(m.group(0), frame_rate) + frames, frame_rate),
+        text,
+        flags=re.M,
+    )
+
+
+def test_identical_files():
+    """Test a file diffed against itself has no entries"""
+    text = _load_sample()
+    _, entries = diff_texts(text, text)
+    return entries == []
+
+
+def test_retimed_whole_file():
+    """Test a uniformly shifted file reports every caption retimed by the shift"""
+    text = _load_sample()
+    _, entries = diff_texts(text, _shift(text, 48))
+    counts = summarize(entries)
+    if counts[ADDED] or counts[REMOVED] or counts[CHANGED]:
+        return False
+    return counts[RETIMED] > 80 and all(e.start_delta == 48 for e in entries)
+
+
+def test_changed_and_removed_under_shift():
+    """Test edits inside a retimed file pair up as changed plus removed"""
+    text = _load_sample()
+    new_text = _shift(text, 48).replace("5bc2 4952 c420 5457 4545 54d3 5d80", "5bc2 4952 c420 5457 4545 5d80 8080", 1)
+    lines = new_text.split("\n")
+    del lines[20:24]  # drops "[WINGS FLAP]"
+    _, entries = diff_texts(text, "\n".join(lines))
+    changed = [e for e in entries if e.kind == CHANGED]
+    removed = [e for e in entries if e.kind == REMOVED]
+    if len(changed) != 1 or len(removed) != 1:
+        return False
+    return changed[0].old.rows == (" [BIRD TWEETS]",) and changed[0].new.rows == (" [BIRD TWEE]",) and "WINGS" in removed[0].old.rows[0]
+
+
+def test_resplit_lines_match():
+    """Test a caption re-split across lines compares equal to the single-line load"""
+    old = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 94d0 94d0 c1c2 c4c4 942f 942f\n\n00:00:03:00\t942c 942c\n"
+    new = "Scenarist_SCC V1.0\n\n00:00:00:20\t9420 9420 94d0 94d0 c1c2\n00:00:00:28\tc4c4 942f 942f\n\n00:00:03:00\t942c 942c\n"
+    _, entries = diff_texts(old, new)
+    return entries == [] or all(e.kind == RETIMED for e in entries)
+
+
+def test_added_caption():
+    """Test a new caption is reported as added"""
+    old = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 94d0 94d0 c1c2 942f 942f\n\n00:00:02:00\t942c 942c\n"
+    new = old + "\n00:00:05:00\t9420 9420 94d0 94d0 c4c4 942f 942f\n\n00:00:06:00\t942c 942c\n"
+    _, entries = diff_texts(old, new)
+    return [e.kind for e in entries] == [ADDED] and entries[0].new.rows == ("DD",)
+
+
+def test_converted_frame_rate_unchanged():
+    """Test an exact frame-rate conversion of a 2-hour file diffs as unchanged, 1000/1001 clocks included"""
+    header, _, body = _load_sample().partition("\n")
+    ten_minutes = timestamp_to_frames("00:10:00:00", "23.98")
+    text = header + "\n" + "".join(_shift(body, copy * ten_minutes) for copy in range(12))
+    for to_rate in ("25", "29.97 DF"):
+        converted, _ = retime_text(text, "23.98", 0, to_rate)
+        frame_rate, entries = diff_texts(text, converted)
+        if frame_rate != to_rate or entries:
+            return False
+    return True
+
+
+def test_caption_lines_match_editor():
+    """Test captions point at the lines the editor shows when a comment holds a form feed"""
+    header, _, body = _load_sample().partition("\n")
+    text = header + "\n\x0c page\n" + body
+    _, captions = load_captions(text)
+    lines = text.split("\n")
+    return all(TIMESTAMP_LINE.match(lines[line_num]) for caption in captions for line_num in caption.lines) and len(captions) > 80
+
+
+def test_align_order_preserving():
+    """Test alignment only returns increasing, key-equal pairs"""
+    a = list("abcabbacxyzq")
+    b = list("cbabacxqzy")
+    matches = align(a, b)
+    if any(a[i] != b[j] for i, j in matches):
+        return False
+    return all(i1 < i2 and j1 < j2 for (i1, j1), (i2, j2) in zip(matches, matches[1:])) and len(matches) >= 6
+
+
+if __name__ == "__main__":
+    print("=== Caption Diff Tests ===\n")
+
+    tests = [
+        ("Identical Files", test_identical_files),
+        ("Retimed Whole File", test_retimed_whole_file),
+        ("Changed And Removed Under Shift", test_changed_and_removed_under_shift),
+        ("Re-split Lines Match", test_resplit_lines_match),
+        ("Added Caption", test_added_caption),
+        ("Converted Frame Rate Unchanged", test_converted_frame_rate_unchanged),
+        ("Caption Lines Match Editor", test_caption_lines_match_editor),
+        ("Align Order Preserving", test_align_order_preserving),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
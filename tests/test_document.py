@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Document Analysis Tests
+
+Tests for the editor-independent analyze() API: sources, errors, hover tooltips and
+snapshots, restoring from cache data, reusing an earlier analysis, analysis levels and
+the parallel timing analysis.
+"""
+
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import scc_analysis  # noqa: E402
+from scc_document import FULL, QUICK, STANDARD, AnalysisResult, analyze, level_for_size, restore  # noqa: E402
+from scc_rules import PARITY_ERROR, RuleSet, default_rules  # noqa: E402
+
+# Pop-on "Hello" at 00:00:01:00, then a bad parity word, then a clear
+TEXT = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 9470 9470 c8e5 ecec ef80 942f 942f\n\n00:00:03:00\t9420 4865 942f\n\n00:00:05:29\t942c 942c\n"
+
+
+def test_sources():
+    """Test text, UTF-8 bytes and binary or text streams give the same analysis"""
+    results = [analyze(TEXT), analyze(TEXT.encode("utf-8")), analyze(io.BytesIO(TEXT.encode("utf-8"))), analyze(io.StringIO(TEXT.encode("utf-8").decode("utf-8")))]
+    first = results[0]
+    if not isinstance(first, AnalysisResult) or first.frame_rate != "29.97 NDF" or first.time_map[2] != ["00:00:01:05", "00:00:03:02"]:
+        return False
+    return all((r.frame_rate, r.time_map, r.annotations) == (first.frame_rate, first.time_map, first.annotations) for r in results[1:])
+
+
+def test_errors():
+    """Test errors carry their line and column, and the summary and QC metrics are available"""
+    result = analyze(TEXT)
+    errors = result.errors()
+    if [(e.line, e.column, e.error_type) for e in errors] != [(4, 17, "parity_error")]:
+        return False
+    if result.line_errors(4) != [(17, 21, "parity_error", None)] or result.line_errors(2) != []:
+        return False
+    return result.error_summary.startswith("ERRORS: 1 parity error") and result.qc is not None and result.qc.duration.count == 1
+
+
+def test_tooltips_and_snapshots():
+    """Test hover text and caption buffer snapshots are built without an editor"""
+    result = analyze(TEXT)
+    col, text = result.tooltip(2, TEXT.splitlines()[2].index("ecec"))
+    if col != 0 or not text.startswith('TEXT: "ll" (ecec)') or "TIME: 00:00:01:05 (+5 packets)" not in text:
+        return False
+    if result.tooltip(4, 18) != (17, "Invalid SCC code (parity check failed)") or result.tooltip(0, 3) is not None:
+        return False
+    buffer_text, hl_start, hl_end = result.snapshot(2, 3)
+    return buffer_text == "{R14 C00 Whi}Hell" and buffer_text[hl_start:hl_end] == "ll"
+
+
+def test_timing_issues_marked():
+    """Test out-of-order and duplicate starts are indicated, summarized, explained on hover and reported"""
+    text = "Scenarist_SCC V1.0\n\n00:00:02:00\t942c 942c\n\n00:00:01:00\t942c 942c\n\n00:00:01:00\t942c 942c\n\n00:00:05:29\t942c 942c\n"
+    result = analyze(text)
+    errors = [(e.line, e.error_type) for e in result.errors()]
+    if errors != [(4, "cc_buffer_overflow"), (4, "timecode_order"), (6, "duplicate_timestamp")]:
+        return False
+    if "1 out-of-order timestamp, 1 duplicate timestamp" not in result.error_summary or text.index("00:00:01:00") not in result.plan.error_ranges:
+        return False
+    findings = [(f.rule, f.line, f.message) for f in result.findings() if f.rule != "cc_buffer_overflow"]
+    expected = [("timecode_order", 5, "Starts 30 frames before the previous line"), ("duplicate_timestamp", 7, "Same start time as line 5")]
+    return findings == expected and result.tooltip(6, 3) == (0, "Same start time as line 5")
+
+
+def test_restore_matches_analysis():
+    """Test a result restored from its cache data answers like the original and indexes text on first search"""
+    original = analyze(TEXT)
+    restored = restore(TEXT, original.pack())
+    if restored.errors() != original.errors() or restored.annotations != original.annotations:
+        return False
+    if restored.tooltip(2, 25) != original.tooltip(2, 25) or restored.locate_timecode(31) != original.locate_timecode(31):
+        return False
+    return not restored.text_index_ready and restored.search("hello") == original.search("hello") == [2]
+
+
+def test_reanalysis_reuses_lines():
+    """Test passing an earlier analysis's line cache and text index only reparses edited lines"""
+    first = analyze(TEXT)
+    edited = analyze(TEXT.replace("4865", "c8e5"), line_cache=first.line_cache, text_index=first.text_index)
+    return edited.line_cache.parsed == 1 and edited.errors() == [] and edited.search("he*") == [2, 4]
+
+
+def test_analysis_levels():
+    """Test each level finds its own checks, findings stay complete and the level survives the cache"""
+    # Line 6 overflows into line 8, which repeats its start time; line 10 has an invalid timestamp
+    text = TEXT + "\n00:00:05:29\t942c 942c\n\n24:00:00:00\t942c\n"
+    quick, standard, full = [analyze(text, level=level) for level in (QUICK, STANDARD, FULL)]
+    if [(e.line, e.error_type) for e in quick.errors()] != [(4, "parity_error"), (10, "invalid_timestamp")]:
+        return False
+    # Quick scans the lines without parsing them, and finds and labels the same errors as the full walk
+    checked = [e for e in full.errors() if e.error_type in ("parity_error", "invalid_timestamp")]
+    if quick.line_cache.lines or quick.plan.pair_ranges or quick.plan.parity_ranges != full.plan.parity_ranges or quick.errors() != checked:
+        return False
+    rules = RuleSet(default_rules())
+    rules.enable(PARITY_ERROR, False)
+    if [e.error_type for e in analyze(text, level=QUICK, rules=rules).errors()] != ["invalid_timestamp"]:
+        return False
+    if quick.time_map or quick.annotations or quick.qc is not None or quick.search("hello") != [2]:
+        return False
+    if "shown at the full analysis level" not in quick.tooltip(2, 12)[1] or "shown at" in full.tooltip(2, 12)[1]:
+        return False
+    if [e.error_type for e in standard.errors()] != [e.error_type for e in full.errors()] or standard.annotations != full.annotations:
+        return False
+    if standard.qc is not None or full.qc is None or list(quick.findings()) != list(full.findings()):
+        return False
+    try:
+        analyze(text, level="thorough")
+        return False
+    except ValueError:
+        pass
+    sizes = [level_for_size(size) for size in (512 << 10, 2 << 20, 5 << 20)]
+    return sizes == [FULL, STANDARD, QUICK] and restore(text, quick.pack()).level == QUICK
+
+
+def test_parallel_timing_matches_serial():
+    """Test analyzing with worker processes gives the serial result and still fills the line cache"""
+    with io.open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples", "big-buck-bunny.scc"), encoding="utf-8") as f:
+        text = f.read()
+    scc_analysis.PARALLEL_MIN_LINES = 0
+    try:
+        for level, qc in ((STANDARD, True), (FULL, False)):
+            serial, parallel = analyze(text, level=level, qc=qc), analyze(text, level=level, qc=qc, workers=3)
+            if (parallel.time_map, parallel.timestamp_map, parallel.plan.to_data()) != (serial.time_map, serial.timestamp_map, serial.plan.to_data()):
+                return False
+            if len(parallel.line_cache.lines) != len(serial.line_cache.lines) or list(parallel.findings()) != list(serial.findings()):
+                return False
+    finally:
+        scc_analysis.PARALLEL_MIN_LINES = 20000
+    return True
+
+
+if __name__ == "__main__":
+    print("=== Document Analysis Tests ===\n")
+
+    tests = [
+        ("Sources", test_sources),
+        ("Errors", test_errors),
+        ("Tooltips And Snapshots", test_tooltips_and_snapshots),
+        ("Timing Issues Marked", test_timing_issues_marked),
+        ("Restore Matches Analysis", test_restore_matches_analysis),
+        ("Reanalysis Reuses Lines", test_reanalysis_reuses_lines),
+        ("Analysis Levels", test_analysis_levels),
+        ("Parallel Timing Matches Serial", test_parallel_timing_matches_serial),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
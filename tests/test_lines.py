@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Parsed Line Tests
+
+Tests for the parse-once line representation and the per-line cache shared by the
+analysis, render plan and findings.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_analysis import TimestampIndex, build_time_map_lines  # noqa: E402
+from scc_lines import LineCache, ParsedLine, TextLines  # noqa: E402
+from scc_render import build_render_plan, line_start_positions  # noqa: E402
+from scc_report import iter_findings  # noqa: E402
+
+HEADER = "Scenarist_SCC V1.0\n\n"
+
+
+def _scc(*lines):
+    return HEADER + "".join(line + "\n\n" for line in lines)
+
+
+def test_parsed_line_fields():
+    """Test the timestamp span and frame, packet and logical indices, events and parity flags"""
+    parsed = ParsedLine("00:00:01:05\t9420 9420 c1c2 4865 942f 942f\n", "29.97 NDF")
+    if (parsed.timestamp, parsed.ts_start, parsed.ts_end, parsed.frame, parsed.ts_valid) != ("00:00:01:05", 0, 11, 35, True):
+        return False
+    if parsed.packet_count != 6 or [code.packet_idx for code in parsed.codes] != [0, 2, 3, 4]:
+        return False
+    if [code.event["type"] for code in parsed.codes] != ["CONTROL", "TEXT", "ERROR", "CONTROL"] or parsed.bad_parity != [3]:
+        return False
+    rcl = parsed.words[0]
+    return (rcl.pair_start, rcl.pair_end) == (12, 21) and parsed.codes[1].event["text"] == "AB"
+
+
+def test_word_at():
+    """Test a column inside a doubled command maps to its first word's logical and packet index"""
+    parsed = ParsedLine("00:00:01:00\t9420 9420 c1c2 942f 942f")
+    word, logical_idx, packet_idx = parsed.word_at(19)  # second 9420
+    if word.start != 12 or (logical_idx, packet_idx) != (0, 0):
+        return False
+    word, logical_idx, packet_idx = parsed.word_at(33)
+    return (logical_idx, packet_idx) == (2, 3) and parsed.word_at(3) == (None, -1, -1) and ParsedLine("").timestamp is None
+
+
+def test_cache_reparses_only_changed_lines():
+    """Test a second analysis reuses unchanged (and moved) lines and parses only edited ones"""
+    text = _scc("00:00:01:00\t9420 9420 c1c2 942f 942f", "00:00:03:00\t942c 942c")
+    cache = LineCache()
+    build_time_map_lines(text.splitlines(True), "29.97 NDF", line_cache=cache)
+    first = cache.lines[4]
+    if cache.parsed != 3:
+        return False
+    edited = "00:00:00:10\t942c 942c\n\n" + text.replace("c1c2", "c1c1")
+    build_time_map_lines(edited.splitlines(True), "29.97 NDF", line_cache=cache)
+    if cache.parsed != 2 or cache.lines[6] is not first or len(cache.lines) != 4:
+        return False
+    build_time_map_lines(edited.splitlines(True), "25", line_cache=cache)
+    return cache.parsed == 4 and cache.lines[6] is not first and cache.lines[6].frame == 75
+
+
+def test_consumers_share_one_parse():
+    """Test the render plan and findings read the analysis' lines without parsing them again"""
+    lines = _scc("00:00:01:00\t9420 9420 9470 9470 c8e5 4865 942f 942f", "00:00:01:04\t942c 942c", "00:00:02:00\t9420 9420 c1c2").splitlines(True)
+    cache = LineCache()
+    time_map, timestamp_map, line_texts = build_time_map_lines(lines, "29.97 NDF", line_cache=cache)
+    timestamp_index = TimestampIndex(timestamp_map, "29.97 NDF")
+    segments = cache.lines[2].segments()
+    plan = build_render_plan(time_map, timestamp_index, line_texts, line_start_positions(lines), line_cache=cache)
+    findings = list(iter_findings(lines, "29.97 NDF", time_map, timestamp_index, cache))
+    if cache.parsed != 4 or cache.lines[2].segments() is not segments:
+        return False
+    uncached = build_render_plan(time_map, timestamp_index, line_texts, line_start_positions(lines))
+    return plan.to_data() == uncached.to_data() and findings == list(iter_findings(lines, "29.97 NDF"))
+
+
+def test_text_lines():
+    """Test TextLines splits like splitlines(True) at Scintilla line ends and reads from parsed lines once released"""
+    for text in ("", "a", "a\n", "a\r\nb\rc\n\nd", "\n\r\n", _scc("00:00:01:00\t942c 942c")):
+        lines = TextLines(text)
+        if list(lines) != text.splitlines(True) or len(lines) != len(text.splitlines(True)):
+            return False
+    lines = TextLines("a\x0cb\n")
+    if list(lines) != ["a\x0cb\n"] or lines[-1] != "a\x0cb\n" or lines[0:5] != ["a\x0cb\n"]:
+        return False
+    lines = TextLines("x\n\ny")
+    lines.release({0: "x\n", 2: "y"})
+    return lines.text is None and list(lines) == ["x\n", "", "y"]
+
+
+if __name__ == "__main__":
+    print("=== Parsed Line Tests ===\n")
+
+    tests = [
+        ("Parsed Line Fields", test_parsed_line_fields),
+        ("Word At Column", test_word_at),
+        ("Cache Reparses Only Changed Lines", test_cache_reparses_only_changed_lines),
+        ("Consumers Share One Parse", test_consumers_share_one_parse),
+        ("Text Lines", test_text_lines),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
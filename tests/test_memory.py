@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Caption Memory Tests
+
+Tests for the EIA-608 displayed/non-displayed memory model.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_buffer_format import render_line_annotation  # noqa: E402
+from scc_memory import CaptionMemory, PAINT_ON, ROLL_UP, snapshot_text  # noqa: E402
+
+
+def _feed(*lines):
+    memory = CaptionMemory()
+    for line in lines:
+        memory.feed_line(line)
+    return memory
+
+
+def _rows(buffer):
+    return [(row, buffer.row_text(row)) for row in range(15) if buffer.row_text(row)]
+
+
+def test_pop_on_flip():
+    """Test pop-on loads stay hidden until EOC swaps the memories"""
+    memory = _feed("94ae 94ae 9420 9420 9470 9470 c1c2")
+    if _rows(memory.displayed) or _rows(memory.non_displayed) != [(14, "AB")]:
+        return False
+    loaded = memory.non_displayed
+    memory.feed_line("942f 942f")
+    if memory.displayed is not loaded or _rows(memory.non_displayed):
+        return False
+    memory.feed_line("942c 942c")
+    return not _rows(memory.displayed)
+
+
+def test_backspace_and_delete_to_end():
+    """Test backspace clears the previous cell and DER clears the rest of the row"""
+    memory = _feed("9420 9470 c1c2 c4c4 94a1 94a1")
+    if _rows(memory.non_displayed) != [(14, "ABD")]:
+        return False
+    memory = _feed("9420 9470 c1c2 c4c4 c1c1 9470 97a2 94a4")
+    return _rows(memory.non_displayed) == [(14, "AB")]
+
+
+def test_tab_offsets_and_columns():
+    """Test PAC indents and tab offsets address columns, and text stops at column 32"""
+    memory = _feed("9420 9452 97a2 c1c2")
+    buffer = memory.non_displayed
+    if buffer.chars[13][6:8] != ["A", "B"] or buffer.row_text(13) != "  AB":
+        return False
+    memory = _feed("9420 9470 " + " ".join(["c1c1"] * 20))
+    return buffer.row_span(13) == (4, 8) and memory.non_displayed.row_text(14) == "A" * 32 and memory.col == 32
+
+
+def test_roll_up():
+    """Test roll-up text goes straight to the screen and carriage returns scroll the window"""
+    memory = _feed("9425 9425 94ad 94ad 9470 9470 c1c2", "94ad 94ad c4c4", "94ad 94ad e5e6")
+    if memory.mode != ROLL_UP or _rows(memory.non_displayed):
+        return False
+    return _rows(memory.displayed) == [(13, "DD"), (14, "ef")]
+
+
+def test_paint_on_and_extended_characters():
+    """Test paint-on writes to displayed memory and extended characters replace their fallback"""
+    memory = _feed("9429 9429 9470 9470 c1e5 9232 9232")
+    return memory.mode == PAINT_ON and _rows(memory.displayed) == [(14, u"AÇ")]  # fmt: skip
+
+
+def test_annotation_rows_and_styles():
+    """Test annotations render rows in screen order with italic runs"""
+    segments = render_line_annotation("9420 9420 94f2 94f2 c1c2 91ae 91ae c4c4 9152 9152 e5e6 942f 942f")
+    return segments == [("ef", False), (u"⏎", "newline"), ("AB", False), ("DD", True)]  # fmt: skip
+
+
+def test_snapshot_format():
+    """Test tooltip snapshots keep the {Rxx Cxx Col} row prefix format with highlights"""
+    memory = _feed("9420 9420 9152 9152 c1c2 91ae 91ae c4c4")
+    text, start, end = snapshot_text(memory.non_displayed, memory.pen, highlight_cells=memory.last_cells)
+    return text == "{R00 C04 Whi}AB<i>DD" and text[start:end] == "DD"
+
+
+if __name__ == "__main__":
+    print("=== Caption Memory Tests ===\n")
+
+    tests = [
+        ("Pop-on Flip", test_pop_on_flip),
+        ("Backspace And Delete To End", test_backspace_and_delete_to_end),
+        ("Tab Offsets And Columns", test_tab_offsets_and_columns),
+        ("Roll-up", test_roll_up),
+        ("Paint-on And Extended Characters", test_paint_on_and_extended_characters),
+        ("Annotation Rows And Styles", test_annotation_rows_and_styles),
+        ("Snapshot Format", test_snapshot_format),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
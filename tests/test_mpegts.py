@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+MPEG-TS Extraction Tests
+
+Tests for extracting EIA-608 caption data from transport streams. Fixture streams
+are generated here: a PAT, a PMT and one video PES per picture carrying A/53 cc_data.
+"""
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_mpegts import (  # noqa: E402
+    PTS_WRAP,
+    STREAM_TYPE_H262,
+    STREAM_TYPE_H264,
+    detect_packet_layout,
+    detect_ts_frame_rate,
+    extract_scc_text,
+    iter_scc_lines,
+    parse_picture_header,
+)
+
+PMT_PID = 0x1000
+VIDEO_PID = 0x100
+
+
+def _add_emulation_prevention(rbsp):
+    """Insert 0x03 after every 00 00 that is followed by a byte <= 3 (inverse of RBSP extraction)."""
+    out = bytearray()
+    zeros = 0
+    for byte in bytearray(rbsp):
+        if zeros >= 2 and byte <= 3:
+            out.append(3)
+            zeros = 0
+        out.append(byte)
+        zeros = zeros + 1 if byte == 0 else 0
+    return bytes(out)
+
+
+def _cc_data(words, field=1):
+    data = bytearray([0x40 | len(words), 0xFF])
+    for word in words:
+        data += bytearray([0xFC | (field - 1), word >> 8, word & 0xFF])
+    return bytes(data) + b"\xff"
+
+
+def _sei_message(payload_type, payload):
+    return bytes(bytearray([payload_type, len(payload)])) + payload
+
+
+def _h264_picture(words, filler=0):
+    """Access unit: AUD, SEI (optionally after a large unregistered message), IDR slice."""
+    t35 = b"\xb5\x00\x31GA94\x03" + _cc_data(words)
+    sei = b""
+    if filler:
+        sei += b"".join(_sei_message(5, b"\x00" * 200) for _ in range(filler))
+    sei += _sei_message(4, t35) + b"\x80"
+    slice_body = b"\x88\x84" + b"\x00\x00\x01\x06\x04\x08" * 20  # would misparse if read past the slice
+    return b"\x00\x00\x00\x01\x09\xf0" + b"\x00\x00\x01\x06" + _add_emulation_prevention(sei) + b"\x00\x00\x01\x65" + slice_body
+
+
+def _h262_picture(words):
+    """Picture header, GA94 user data, slice."""
+    return b"\x00\x00\x01\x00\x00\x0f\xff\xf8" + b"\x00\x00\x01\xb2GA94\x03" + _cc_data(words) + b"\x00\x00\x01\x01" + b"\x12" * 300
+
+
+def _timestamp_bytes(prefix, ts):
+    ts %= PTS_WRAP
+    return struct.pack(">BHH", (prefix << 4) | ((ts >> 30) & 0x07) << 1 | 1, ((ts >> 15) & 0x7FFF) << 1 | 1, (ts & 0x7FFF) << 1 | 1)
+
+
+def _pes(pts, dts, es):
+    if dts is None:
+        header = b"\x80\x80\x05" + _timestamp_bytes(2, pts)
+    else:
+        header = b"\x80\xc0\x0a" + _timestamp_bytes(3, pts) + _timestamp_bytes(1, dts)
+    return b"\x00\x00\x01\xe0\x00\x00" + header + es
+
+
+def _packets(pid, payload, counter, packet_size):
+    """Split a PES or PSI section into TS packets, stuffing the last one with an adaptation field."""
+    out = []
+    pos = 0
+    first = True
+    while first or pos < len(payload):
+        chunk = payload[pos : pos + 184]
+        pos += len(chunk)
+        header = struct.pack(">BHB", 0x47, (0x4000 if first else 0) | pid, 0x10 | (counter[0] & 0x0F))
+        if len(chunk) < 184:
+            stuffing = 183 - len(chunk)
+            header = header[:3] + struct.pack(">B", 0x30 | (counter[0] & 0x0F))
+            header += struct.pack(">B", stuffing) + (b"\x00" + b"\xff" * (stuffing - 1) if stuffing else b"")
+        counter[0] += 1
+        out.append(b"\x00" * (packet_size - 188) + header + chunk)
+        first = False
+    return b"".join(out)
+
+
+def _psi(table_id, body):
+    section = struct.pack(">BH", table_id, 0xB000 | (len(body) + 4)) + body + b"\x00\x00\x00\x00"
+    return b"\x00" + section
+
+
+def build_stream(pictures, stream_type=STREAM_TYPE_H264, packet_size=188):
+    """Transport stream for (pts, dts, es_bytes) pictures in decode order."""
+    pat = _psi(0x00, struct.pack(">HBBBHH", 1, 0xC1, 0, 0, 1, 0xE000 | PMT_PID))
+    pmt = _psi(0x02, struct.pack(">HBBBHHBHH", 1, 0xC1, 0, 0, 0xE000 | VIDEO_PID, 0xF000, stream_type, 0xE000 | VIDEO_PID, 0xF000))
+    counters = {}
+    parts = [_packets(0, pat, counters.setdefault(0, [0]), packet_size), _packets(PMT_PID, pmt, counters.setdefault(PMT_PID, [0]), packet_size)]
+    for pts, dts, es in pictures:
+        parts.append(_packets(VIDEO_PID, _pes(pts, dts, es), counters.setdefault(VIDEO_PID, [0]), packet_size))
+    return b"".join(parts)
+
+
+def _words(text):
+    return [int(w, 16) for w in text.split()]
+
+
+def test_extract_pop_on_lines():
+    """Test caption pairs between padding become SCC lines timed from each picture's PTS, across a PTS rollover"""
+    pairs = _words("8080 9420 9420 c1c2 942f 942f 8080 8080 942c 942c 8080")
+    base = PTS_WRAP - 3 * 3003
+    stream = build_stream([(base + i * 3003, None, _h264_picture([w])) for i, w in enumerate(pairs)])
+    if detect_ts_frame_rate(stream) != "29.97 DF":
+        return False
+    lines = list(iter_scc_lines(stream))
+    return lines == ["00:00:00;01\t9420 9420 c1c2 942f 942f", "00:00:00;08\t942c 942c"]
+
+
+def test_b_frame_reordering():
+    """Test pictures sent in decode order are timed in presentation order"""
+    order = [0, 3, 1, 2, 6, 4, 5, 7]  # I P B B P B B P
+    pairs = _words("9420 9420 c1c2 c4c4 e5e6 942f 942f 8080")
+    pictures = [(90000 + n * 3003, 90000 + (i - 1) * 3003, _h264_picture([pairs[n]])) for i, n in enumerate(order)]
+    return list(iter_scc_lines(build_stream(pictures), "29.97 NDF")) == ["00:00:00:00\t9420 9420 c1c2 c4c4 e5e6 942f 942f"]
+
+
+def test_sei_spanning_packets_with_emulation_prevention():
+    """Test an SEI split over several TS packets, with emulation prevention bytes, is reassembled"""
+    es = _h264_picture(_words("9420 9420"), filler=3)
+    if es.count(b"\x00\x00\x03") < 3:
+        return False
+    stream = build_stream([(0, None, es), (3003, None, _h264_picture([0x8080]))])
+    head = es[: es.index(b"\x00\x00\x01\x65")]
+    return parse_picture_header(STREAM_TYPE_H264, bytearray(head)) == [0x9420, 0x9420] and list(iter_scc_lines(stream)) == ["00:00:00;00\t9420 9420"]
+
+
+def test_h262_m2ts_and_field_two():
+    """Test H.262 user data in 192-byte packets, field selection and the start timecode"""
+    pairs = _words("9420 9420 c1c2 8080 8080 8080")
+    pictures = [(i * 3003, None, _h262_picture([w])) for i, w in enumerate(pairs)]
+    field_two = [(6 * 3003, None, b"\x00\x00\x01\xb2GA94\x03" + _cc_data([0x1520], field=2) + b"\x00\x00\x01\x01\x00")]
+    stream = build_stream(pictures + field_two, stream_type=STREAM_TYPE_H262, packet_size=192)
+    if detect_packet_layout(stream) != (192, 0):
+        return False
+    lines = list(iter_scc_lines(stream, "29.97 NDF", start_timecode="01:00:00:00"))
+    field_lines = list(iter_scc_lines(stream, "29.97 NDF", field=2))
+    return lines == ["01:00:00:00\t9420 9420 c1c2"] and field_lines == ["00:00:00:06\t1520"]
+
+
+def test_23_98_cadence_and_file_extraction():
+    """Test 23.98 streams carry five pairs per four pictures and extract from a file on disk"""
+    pairs = _words("9420 9420 c1c2 c4c4 e5e6 942f 942f 8080 8080 8080")
+    pictures = []
+    i = 0
+    frame = 0
+    while i < len(pairs):
+        count = 2 if frame % 4 == 0 else 1
+        pictures.append((frame * 3754 - frame // 4, None, _h264_picture(pairs[i : i + count])))
+        i += count
+        frame += 1
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "fixture.ts")
+        with open(path, "wb") as f:
+            f.write(build_stream(pictures))
+        text = extract_scc_text(path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    expected = "Scenarist_SCC V1.0\n\n00:00:00:00\t9420 9420 c1c2 c4c4 e5e6 942f 942f\n"
+    return text == expected
+
+
+if __name__ == "__main__":
+    print("=== MPEG-TS Extraction Tests ===\n")
+
+    tests = [
+        ("Extract Pop-on Lines", test_extract_pop_on_lines),
+        ("B-frame Reordering", test_b_frame_reordering),
+        ("SEI Spanning Packets", test_sei_spanning_packets_with_emulation_prevention),
+        ("H.262, M2TS And Field 2", test_h262_m2ts_and_field_two),
+        ("23.98 Cadence And File Extraction", test_23_98_cadence_and_file_extraction),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
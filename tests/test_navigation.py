@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Navigation Tests
+
+Tests for go-to-timecode lookups, caption text search and error navigation.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_analysis import build_time_map_lines  # noqa: E402
+from scc_buffer_format import render_line_annotation  # noqa: E402
+from scc_errors import ErrorIndex, format_error_summary  # noqa: E402
+from scc_document import analyze  # noqa: E402
+from scc_navigation import TimecodeIndex, parse_goto_timecode  # noqa: E402
+from scc_search import CaptionTextIndex  # noqa: E402
+from scc_timecode import add_frames, parse_timestamp_str  # noqa: E402
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples", "big-buck-bunny.scc")
+
+
+def _load_sample():
+    with open(SAMPLE_PATH, "r") as f:
+        return f.read().splitlines(True)
+
+
+def test_parse_goto_separators():
+    """Test timecodes parse with any separator and DF skipped labels snap forward"""
+    ndf = [parse_goto_timecode(t, "29.97 NDF") for t in ("00:01:00:00", "00;01;00;00", "0:1:0.0", "00,01,00,00")]
+    if ndf != [1800] * 4:
+        return False
+    if parse_goto_timecode("00:01:00:00", "29.97 DF") != parse_goto_timecode("00:01:00;02", "29.97 DF"):
+        return False
+    return parse_goto_timecode("00:00:00:30", "29.97 NDF") is None and parse_goto_timecode("hello", "25") is None
+
+
+def test_locate_every_packet():
+    """Test every packet's add_frames time locates back to a packet at that frame"""
+    lines = _load_sample()
+    _, timestamp_map, line_texts = build_time_map_lines(lines, "23.98")
+    index = TimecodeIndex(timestamp_map, "23.98")
+    for line_num, (ts_str, packet_count) in timestamp_map.items():
+        ts = parse_timestamp_str(ts_str)
+        for packet_idx in range(packet_count):
+            pkt_time, _ = add_frames(ts.hours, ts.minutes, ts.seconds, ts.frames, packet_idx, "23.98")
+            found_line, found_packet, exact = index.locate(parse_goto_timecode(pkt_time, "23.98"))
+            if found_line != line_num or not exact:
+                return False
+            found_time, _ = add_frames(ts.hours, ts.minutes, ts.seconds, ts.frames, found_packet, "23.98")
+            if found_time != pkt_time or found_packet > packet_idx:
+                return False
+    return True
+
+
+def test_locate_gaps_and_column():
+    """Test frames between lines point at the previous line's last packet"""
+    lines = _load_sample()
+    _, timestamp_map, _ = build_time_map_lines(lines, "23.98")
+    index = TimecodeIndex(timestamp_map, "23.98")
+    if index.locate(0) is not None:
+        return False
+    # 00:00:00:03 line has 10 packets; 00:00:01:00 falls in the gap before 00:00:02:11
+    frame = parse_goto_timecode("00:00:01:00", "23.98")
+    line_num, packet_idx, exact = index.locate(frame)
+    if (line_num, packet_idx, exact) != (4, 9, False):
+        return False
+    # The editor lands on the start of that packet's word
+    line_num, column, exact = analyze("".join(lines)).locate_timecode(frame)
+    return (line_num, exact) == (4, False) and lines[4][column:].startswith("435d")
+
+
+def _sample_index():
+    index = CaptionTextIndex()
+    lines = _load_sample()
+    for line_num, text in enumerate(lines):
+        index.set_line(line_num, text, render_line_annotation(text))
+    return index, lines
+
+
+def test_search_terms_phrase_prefix():
+    """Test word, phrase and prefix queries against decoded sample text"""
+    index, lines = _sample_index()
+    if index.search("brook") != [10] or index.search("BROOK babbles") != [10]:
+        return False
+    if index.search('"babbles brook"') or index.search('"brook babbles"') != [10]:
+        return False
+    buzz = index.search("buzz*")
+    return 10 in buzz and all("buzz" in "".join(t for t, _ in render_line_annotation(lines[n])).lower() for n in buzz)
+
+
+def test_search_incremental_update():
+    """Test edited lines are re-indexed and removed lines drop out"""
+    index, lines = _sample_index()
+    if index.set_line(10, lines[10], render_line_annotation(lines[10])):
+        return False  # unchanged text is a no-op
+    edited = "00:00:11:18\t9420 9420 94d0 94d0 c2ef ef6b 942f 942f\n"  # "Book"
+    index.set_line(10, edited, render_line_annotation(edited))
+    if index.search("brook") or index.search("book") != [10]:
+        return False
+    index.retain(set(range(10)))
+    return index.search("book") == [] and index.search("serene") == [4]
+
+
+def test_error_index_navigation():
+    """Test next/previous error bisect from a position, wrap around and filter by type"""
+    index = ErrorIndex()
+    for pos, error_type in ((50, "parity_error"), (10, "invalid_timestamp"), (90, "parity_error"), (70, "never_displayed")):
+        index.add(pos, error_type, str(pos))
+    index.finish()
+    if list(index.positions) != [10, 50, 70, 90]:
+        return False
+    if index.next_error(10) != 50 or index.next_error(95) != 10 or index.previous_error(50) != 10 or index.previous_error(5) != 90:
+        return False
+    if index.next_error(50, "parity_error") != 90 or index.previous_error(60, "parity_error") != 50:
+        return False
+    return index.next_error(0, "cc_buffer_overflow") is None and ErrorIndex().finish().next_error(0) is None
+
+
+def test_error_summary_bounded():
+    """Test the summary lists counts and only the first N locations per type"""
+    index = ErrorIndex()
+    for n in range(25):
+        index.add(n * 10, "parity_error", "00:00:{0:02d}:00".format(n))
+    index.add(5, "cc_buffer_overflow", "00:00:00:05")
+    summary = format_error_summary(index.finish(), max_entries=3)
+    lines = summary.split("\n")
+    if lines[0] != "ERRORS: 25 parity errors, 1 buffer overflow":
+        return False
+    return lines[1] == "Parity errors: 00:00:00:00, 00:00:01:00, 00:00:02:00 (+22 more)" and lines[2] == "Buffer overflows: 00:00:00:05"
+
+
+if __name__ == "__main__":
+    print("=== Navigation Tests ===\n")
+
+    tests = [
+        ("Parse Go-To Separators", test_parse_goto_separators),
+        ("Locate Every Packet", test_locate_every_packet),
+        ("Locate Gaps And Column", test_locate_gaps_and_column),
+        ("Search Terms Phrase Prefix", test_search_terms_phrase_prefix),
+        ("Search Incremental Update", test_search_incremental_update),
+        ("Error Index Navigation", test_error_index_navigation),
+        ("Error Summary Bounded", test_error_summary_bounded),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
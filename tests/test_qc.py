@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+QC Metrics Tests
+
+Tests for the caption QC metrics collected during the timing analysis and the
+indicators and notes they add to the render plan.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_analysis import TimestampIndex, build_time_map_lines  # noqa: E402
+from scc_qc import QcMetrics, StreamingStats, describe_violation  # noqa: E402
+from scc_render import RenderPlan, build_render_plan, line_start_positions  # noqa: E402
+
+HEADER = "Scenarist_SCC V1.0\n\n"
+
+
+def _parity(byte):
+    return byte | 0x80 if bin(byte).count("1") % 2 == 0 else byte
+
+
+def _text_words(text):
+    data = bytearray(text.encode("ascii"))
+    if len(data) % 2:
+        data.append(0)
+    return " ".join("{0:02x}{1:02x}".format(_parity(data[i]), _parity(data[i + 1]) if data[i + 1] else 0x80) for i in range(0, len(data), 2))
+
+
+def _caption(timestamp, *rows):
+    """A pop-on load line: RCL, then a PAC (rows 14, 15, ...) and text per row, then EOC."""
+    pacs = ["9470", "94d0", "13d0", "1370", "9770"]
+    parts = ["9420 9420"]
+    for i, row in enumerate(rows):
+        parts.append("{0} {0} {1}".format(pacs[i], _text_words(row)))
+    return "{0}\t{1} 942f 942f".format(timestamp, " ".join(parts))
+
+
+def _analyze(*lines):
+    text = HEADER + "".join(line + "\n\n" for line in lines)
+    qc = QcMetrics("29.97 NDF")
+    time_map, timestamp_map, line_texts = build_time_map_lines(text.splitlines(True), "29.97 NDF", qc)
+    return text, qc, time_map, timestamp_map, line_texts
+
+
+def test_streaming_stats():
+    """Test min/max/mean and bucketed percentiles, including merging two streams"""
+    low = StreamingStats(1)
+    high = StreamingStats(1)
+    for value in range(50):
+        low.add(value)
+    for value in range(50, 100):
+        high.add(value)
+    stats = low.merge(high)
+    if (stats.count, stats.minimum, stats.maximum, stats.mean) != (100, 0, 99, 49.5):
+        return False
+    return abs(stats.percentile(50) - 50) <= 1 and abs(stats.percentile(95) - 95) <= 1 and StreamingStats().percentile(50) is None
+
+
+def test_caption_metrics():
+    """Test duration, reading rate, words, rows and characters per row of timed captions"""
+    _, qc, time_map, _, _ = _analyze(
+        _caption("00:00:01:00", "Hello there", "General Kenobi"),
+        _caption("00:00:04:00", "Second"),
+        "00:00:06:00\t942c 942c",
+    )
+    # EOCs are the 17th and 6th codes: 00:00:01:16 -> 00:00:04:05 -> 00:00:06:00 (EDM)
+    if time_map[2] != ["00:00:01:16", "00:00:04:05"] or time_map[4] != ["00:00:04:05", "00:00:06:00"]:
+        return False
+    if qc.rows.count != 2 or qc.rows.maximum != 2 or qc.chars_per_row.maximum != 14 or qc.duration.count != 2:
+        return False
+    first_seconds = (125 - 46) * 1001 / 30000.0
+    if abs(qc.duration.maximum - first_seconds) > 1e-9 or abs(qc.cps.maximum - 25 / first_seconds) > 1e-9:
+        return False
+    return abs(qc.wpm.maximum - 4 * 60 / first_seconds) < 1e-9 and qc.gap.count == 1 and qc.gap.minimum == 0
+
+
+def test_extended_characters_and_backspace():
+    """Test extended characters replace their fallback and backspace removes a character"""
+    line = "00:00:01:00\t9420 9420 9470 9470 c1e5 92b0 92b0 c243 94a1 94a1 942f 942f"  # "Ae" -> "Á" ... "BC" -> "B"
+    _, qc, _, _, _ = _analyze(line, "00:00:03:00\t942c 942c")
+    return qc.chars_per_row.maximum == 3 and qc.chars_per_row.count == 1
+
+
+def test_threshold_violations():
+    """Test short, fast, crowded and closely spaced captions are reported against their load lines"""
+    long_row = _caption("00:00:01:00", "This line of caption text is far too long to fit")
+    five_rows = _caption("00:00:03:01", "One", "Two", "Three", "Four", "Five")
+    _, qc, _, _, _ = _analyze(
+        long_row[: -len(" 942f 942f")],
+        "00:00:03:00\t942f 942f",
+        five_rows[: -len(" 942f 942f")],
+        "00:00:03:24\t942c 942c 942f 942f",  # shown for 24 frames, then a 1-frame gap
+    )
+    kinds = sorted((v.lines[0], v.kind) for v in qc.violations)
+    expected = [(2, "max_chars_per_row"), (2, "max_cps"), (2, "min_duration"), (6, "max_rows"), (6, "min_gap_frames")]
+    if kinds != expected:
+        return False
+    rows_violation = [v for v in qc.violations if v.kind == "max_rows"][0]
+    return describe_violation(rows_violation) == "5 rows > 4"
+
+
+def test_render_plan_marks_violations():
+    """Test violating captions get a QC indicator on their timestamp, a note and a summary that survive a cache round trip"""
+    text, qc, time_map, timestamp_map, line_texts = _analyze(_caption("00:00:01:00", "Much too quick"), "00:00:01:20\t942c 942c")
+    lines = text.splitlines(True)
+    plan = build_render_plan(time_map, TimestampIndex(timestamp_map, "29.97 NDF"), line_texts, line_start_positions(lines), qc=qc)
+    if list(plan.qc_ranges) != [text.index("00:00:01:00"), 11]:
+        return False
+    note = plan.annotations[0][1].decode("utf-8")
+    if "QC: shown 0.37s < 1.0s, 38.1 cps > 20.0 | " not in note:
+        return False
+    restored = RenderPlan.from_data(plan.to_data())
+    return list(restored.qc_ranges) == list(plan.qc_ranges) and restored.qc_summary == plan.qc_summary and plan.qc_summary.startswith("QC: 1 caption |")
+
+
+if __name__ == "__main__":
+    print("=== QC Metrics Tests ===\n")
+
+    tests = [
+        ("Streaming Stats", test_streaming_stats),
+        ("Caption Metrics", test_caption_metrics),
+        ("Extended Characters And Backspace", test_extended_characters_and_backspace),
+        ("Threshold Violations", test_threshold_violations),
+        ("Render Plan Marks Violations", test_render_plan_marks_violations),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Render Path Tests
+
+Tests for the plugin's Scintilla side, run against the in-memory stand-in of
+mock_npp: position math and edits, what an activation draws, the calls it and a
+hover cost, hover call tips, redrawing only what changed after an edit and redrawing
+after a cancelled run.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+import mock_npp  # noqa: E402
+
+npp = mock_npp.install()
+
+import scc_inspector  # noqa: E402
+from scc_render import annotation_changes, shown_annotations  # noqa: E402
+from scc_schedule import DirtyLines  # noqa: E402
+
+editor, notepad = npp.editor, npp.notepad
+
+# Pop-on "Hello" at 00:00:01:00, then a bad parity word, then a clear
+TEXT = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 9470 9470 c8e5 ecec ef80 942f 942f\n\n00:00:03:00\t9420 4865 942f\n\n00:00:05:29\t942c 942c\n"
+
+
+def _result():
+    return scc_inspector.buffer_state[notepad.getCurrentBufferID()]["result"]
+
+
+def test_positions_and_edits():
+    """Test byte positions across multi-byte text and CRLF, and that edits move indicators and annotations"""
+    editor.load(u"é\r\nab\n\ncd")  # fmt: skip
+    if (editor.getLength(), editor.getLineCount(), editor.getLine(0), editor.getLine(3)) != (10, 4, u"é\r\n", "cd"):  # fmt: skip
+        return False
+    if [editor.positionFromLine(n) for n in range(5)] != [0, 4, 7, 8, -1] or [editor.lineFromPosition(p) for p in (0, 3, 4, 7, 10, 99)] != [0, 0, 1, 2, 3, 3]:
+        return False
+    modified = []
+    editor.callback(modified.append, [mock_npp.SCINTILLANOTIFICATION.MODIFIED])
+    editor.setIndicatorCurrent(5)
+    editor.indicatorFillRange(8, 2)
+    editor.annotationSetText(3, "note")
+    editor.insertText(4, "x\n")
+    if editor.indicator_ranges(5) != [(10, 12)] or editor.annotationGetText(4) != "note" or editor.getTextRange(10, 12) != "cd":
+        return False
+    editor.deleteRange(4, 2)
+    editor.clearCallbacks(modified.append)
+    if editor.indicator_ranges(5) != [(8, 10)] or editor.annotations() != {3: (b"note", b"")}:
+        return False
+    return [(m["modificationType"], m["position"], m["linesAdded"]) for m in modified] == [(1, 4, 1), (2, 4, -1)]
+
+
+def test_activation_draws_plan():
+    """Test activating an SCC buffer draws its annotations, error summary and indicators"""
+    notepad.activate("draw.scc", TEXT)
+    result = _result()
+    if editor.annotations() != shown_annotations(result.plan) or not editor.annotationGetText(0).startswith("ERRORS: 1 parity error"):
+        return False
+    if editor.annotationGetText(2) != " | 00:00:01:05 -> 00:00:03:02 | Hello":
+        return False
+    parity = [editor.getTextRange(s, e) for s, e in editor.indicator_ranges(scc_inspector.INDICATOR_PARITY)]
+    pairs = [editor.getTextRange(s, e) for s, e in editor.indicator_ranges(scc_inspector.INDICATOR_PAIR)]
+    if parity != ["4865"] or pairs != ["9420 9420", "9470 9470", "942f 942f", "942c 942c"]:
+        return False
+    if editor.indicatorAllOnFor(editor.positionFromLine(4) + 18) != 1 << scc_inspector.INDICATOR_PARITY:
+        return False
+    return editor.annotationGetVisible() == mock_npp.ANNOTATIONVISIBLE.STANDARD and editor.dwell_time == 300
+
+
+def test_activation_call_budget():
+    """Test an activation reads the document once and makes one call per annotation and range, and a revisit does not re-analyze"""
+    editor.reset_counts()
+    notepad.activate("budget.scc", TEXT)
+    plan = _result().plan
+    ranges = (len(plan.error_ranges) + len(plan.parity_ranges) + len(plan.pair_ranges) + len(plan.qc_ranges)) // 2
+    calls = editor.calls
+    if calls["getCharacterPointer"] != 1 or calls["getLine"] != 0 or calls["getText"] != 0:
+        return False
+    if calls["annotationSetText"] != len(shown_annotations(plan)) or calls["indicatorFillRange"] != ranges or calls["indicatorClearRange"] != 4:
+        return False
+    if editor.volume["annotationSetText"] != sum(len(text) for text, _ in shown_annotations(plan).values()):
+        return False
+    result = _result()
+    notepad.activate("other.txt", "plain text")
+    editor.reset_counts()
+    notepad.activate("budget.scc", TEXT)
+    return _result() is result and editor.calls["getCharacterPointer"] == 1 and editor.calls["annotationSetText"] == len(shown_annotations(plan))
+
+
+def test_hover_call_tips():
+    """Test hovering shows the error or code under the mouse for two position lookups and one call tip"""
+    notepad.activate("hover.scc", TEXT)
+    parity_pos, code_pos = editor.positionFromLine(4) + 18, editor.positionFromLine(2) + 12
+    editor.reset_counts()
+    editor.dwell(parity_pos)
+    if editor.calltip != (parity_pos - 1, "Invalid SCC code (parity check failed)"):
+        return False
+    if dict(editor.calls) != {"lineFromPosition": 1, "positionFromLine": 1, "callTipShow": 1}:
+        return False
+    editor.dwell(code_pos)
+    anchor, text = editor.calltip
+    if anchor != editor.positionFromLine(2) or not text.startswith("CMD : Resume Caption Loading (9420)"):
+        return False
+    shown = len(editor.calltips)
+    editor.dwell(-1)
+    notepad.activate("notes.txt", TEXT)
+    editor.dwell(code_pos)
+    return len(editor.calltips) == shown
+
+
+def test_edit_redraws_changed_annotations():
+    """Test a live edit re-analyzes once the edits pause and only sets the annotations that changed"""
+    now = [0.0]
+    scc_inspector.edit_scheduler.clock = lambda: now[0]
+    scc_inspector._arm_tick = lambda: None  # ticks are driven below instead of by a timer thread
+    notepad.activate("edit.scc", TEXT)
+    before = _result().plan
+    pos = TEXT.index("4865")
+    editor.deleteRange(pos, 4)
+    editor.insertText(pos, "c8e5")  # fix the parity error
+    scc_inspector.edit_scheduler.tick()
+    if _result().plan is not before:
+        return False  # still inside the quiet period
+    editor.reset_counts()
+    now[0] += 1.0
+    while scc_inspector.edit_scheduler.busy:
+        scc_inspector.edit_scheduler.tick()
+    after = _result().plan
+    if editor.annotations() != shown_annotations(after) or editor.indicator_ranges(scc_inspector.INDICATOR_PARITY):
+        return False
+    changed = annotation_changes(after, before)
+    return 0 < len(changed) < len(shown_annotations(before)) + len(shown_annotations(after)) and editor.calls["annotationSetText"] == len(changed)
+
+
+def test_cancelled_run_redrawn_after_undo():
+    """Test an edit undone after a run was cancelled mid-draw still redraws the analysis it left"""
+    notepad.activate("cancel.scc", TEXT)
+    pos = TEXT.index("4865")
+    editor.deleteRange(pos, 4)
+    editor.insertText(pos, "c8e5")
+    scc_inspector.edit_scheduler.reset()  # the runs are driven below
+    run = scc_inspector.reanalysis_run(DirtyLines())
+    next(run)  # analyzed; a newer edit cancels the run before it draws
+    run.close()
+    result = _result()
+    editor.insertText(pos, "x")
+    editor.deleteRange(pos, 1)
+    scc_inspector.edit_scheduler.reset()
+    for _ in scc_inspector.reanalysis_run(DirtyLines()):
+        pass
+    if _result() is not result or editor.annotations() != shown_annotations(result.plan):
+        return False
+    return not editor.indicator_ranges(scc_inspector.INDICATOR_PARITY)
+
+
+if __name__ == "__main__":
+    print("=== Render Path Tests ===\n")
+
+    tests = [
+        ("Positions And Edits", test_positions_and_edits),
+        ("Activation Draws Plan", test_activation_draws_plan),
+        ("Activation Call Budget", test_activation_call_budget),
+        ("Hover Call Tips", test_hover_call_tips),
+        ("Edit Redraws Changed Annotations", test_edit_redraws_changed_annotations),
+        ("Cancelled Run Redrawn After Undo", test_cancelled_run_redrawn_after_undo),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Report Tests
+
+Tests for the streamed findings (serial and with worker processes) and the JSON Lines
+and SARIF writers.
+"""
+
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import scc_analysis  # noqa: E402
+from scc_analysis import TimestampIndex, build_time_map_lines  # noqa: E402
+from scc_document import analyze  # noqa: E402
+from scc_render import build_render_plan, line_start_positions  # noqa: E402
+from scc_report import JsonLinesWriter, SarifWriter, iter_findings, iter_text_findings  # noqa: E402
+
+HEADER = "Scenarist_SCC V1.0\n\n"
+FRAME_RATE = "29.97 NDF"
+
+
+def _scc(*lines):
+    return HEADER + "".join(line + "\n\n" for line in lines)
+
+
+ERRORS = _scc(
+    "00:00:01:00\t9420 9420 9470 9470 4865 c8e5 942f 942f",  # parity error on the 5th packet
+    "00:00:01:06\t942c 942c",  # the previous line's last 2 packets play at or after this frame
+    "00:00:04:00\t9420 9420 9470 9470 c8e5 ecec ef80",  # loaded, never displayed
+    "24:00:05:29\t942c 942c",  # invalid timestamp (hours)
+)
+
+
+class _Sink(object):
+    """Binary stream that only counts what is written."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+    def flush(self):
+        pass
+
+
+def _analysis(lines):
+    time_map, timestamp_map, line_texts = build_time_map_lines(lines, FRAME_RATE)
+    return time_map, TimestampIndex(timestamp_map, FRAME_RATE), line_texts
+
+
+def test_finding_details():
+    """Test each finding carries its rule, line, column range, timecode and message"""
+    _, findings = iter_text_findings(ERRORS)
+    got = [(f.rule, f.line, f.column, f.end_column, f.timecode, f.packets) for f in findings]
+    expected = [
+        ("cc_buffer_overflow", 3, 1, 12, "00:00:01:00", 2),
+        ("parity_error", 3, 33, 37, "00:00:01:04", None),
+        ("never_displayed", 7, 1, 47, "00:00:04:00", None),
+        ("invalid_timestamp", 9, 1, 12, "24:00:05:29", None),
+    ]
+    return got == expected
+
+
+def test_findings_match_render_plan():
+    """Test the streamed findings are the errors the render plan records for the editor"""
+    lines = _scc(
+        "00:00:01:00\t9420 9420 0101 c1c2 4865 942f 942f",  # unterminated XDS packet, parity error
+        "00:00:02:00\t9420 9420 9470 9470 c8e5 942f 942f 4865",
+        "00:00:02:02\t942c 942c",
+        "00:00:99:00\t942c 942c",
+    ).splitlines(True)
+    time_map, timestamp_index, line_texts = _analysis(lines)
+    plan = build_render_plan(time_map, timestamp_index, line_texts, line_start_positions(lines))
+    starts = line_start_positions(lines)
+    found = sorted((starts[f.line - 1] + (f.column - 1 if f.rule != "never_displayed" else 0), f.rule) for f in iter_findings(lines, FRAME_RATE))
+    index = plan.error_index
+    return len(found) == 5 and found == sorted(zip(index.positions, index.types))
+
+
+def test_parallel_findings_match_serial():
+    """Test findings computed with worker processes are the serial ones"""
+    text = ERRORS * 50
+    _, serial = iter_text_findings(text)
+    _, parallel = iter_text_findings(text, workers=3)
+    serial = list(serial)
+    scc_analysis.PARALLEL_MIN_LINES = 0
+    try:
+        return len(serial) > 150 and list(parallel) == serial
+    finally:
+        scc_analysis.PARALLEL_MIN_LINES = 20000
+
+
+def test_line_numbers_match_editor():
+    """Test findings count lines as the editor does: form feeds and Unicode separators do not end a line"""
+    text = ERRORS.replace(HEADER, HEADER + u"\x0c note \u2028 not a line end\x1c\n\n", 1)  # fmt: skip
+    _, findings = iter_text_findings(text)
+    lines = [f.line for f in findings]
+    return lines == [f.line for f in analyze(text).findings()] and lines[0] == 5
+
+
+def test_json_lines_writer():
+    """Test one JSON object is written per finding with the file it came from"""
+    out = io.BytesIO()
+    with JsonLinesWriter(out) as writer:
+        for finding in iter_text_findings(ERRORS)[1]:
+            writer.write(finding, "reel1.scc")
+    records = [json.loads(line) for line in out.getvalue().decode("utf-8").splitlines()]
+    if writer.count != 4 or len(records) != 4:
+        return False
+    first = records[0]
+    return first["rule"] == "cc_buffer_overflow" and first["packets"] == 2 and first["file"] == "reel1.scc" and "00:00:01:06" in first["message"]
+
+
+def test_sarif_writer():
+    """Test the streamed SARIF log is one valid run with rule metadata and a located result per finding"""
+    out = io.BytesIO()
+    with SarifWriter(out) as writer:
+        for finding in iter_text_findings(ERRORS)[1]:
+            writer.write(finding, "reel1.scc")
+    log = json.loads(out.getvalue().decode("utf-8"))
+    run = log["runs"][0]
+    rules = run["tool"]["driver"]["rules"]
+    results = run["results"]
+    if log["version"] != "2.1.0" or len(results) != 4:
+        return False
+    parity = results[1]
+    region = parity["locations"][0]["physicalLocation"]["region"]
+    if rules[parity["ruleIndex"]]["id"] != "parity_error" or region != {"startLine": 3, "startColumn": 33, "endColumn": 37}:
+        return False
+    empty = io.BytesIO()
+    SarifWriter(empty).close()
+    return parity["properties"]["timecode"] == "00:00:01:04" and json.loads(empty.getvalue().decode("utf-8"))["runs"][0]["results"] == []
+
+
+def test_streaming_memory():
+    """Test findings are yielded before the document is walked and writing thousands of them keeps memory flat"""
+    lines = _scc(*["00:{0:02d}:{1:02d}:00\t9420 9420 4865 4865 4865 4865 942f 942f".format(i // 60, i % 60) for i in range(3000)]).splitlines(True)
+    time_map, timestamp_index, _ = _analysis(lines)
+    findings = iter_findings(lines, FRAME_RATE, time_map, timestamp_index)
+    if next(findings).line != 3:
+        return False
+    try:
+        import tracemalloc
+    except ImportError:  # Python 2: check the count only
+        tracemalloc = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+    sink = _Sink()
+    with SarifWriter(sink) as writer:
+        for finding in iter_findings(lines, FRAME_RATE, time_map, timestamp_index):
+            writer.write(finding, "big.scc")
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if peak > 256 * 1024:
+            return False
+    return writer.count == 12000 and sink.size > 12000 * 300
+
+
+if __name__ == "__main__":
+    print("=== Report Tests ===\n")
+
+    tests = [
+        ("Finding Details", test_finding_details),
+        ("Findings Match Render Plan", test_findings_match_render_plan),
+        ("Parallel Findings Match Serial", test_parallel_findings_match_serial),
+        ("Line Numbers Match Editor", test_line_numbers_match_editor),
+        ("JSON Lines Writer", test_json_lines_writer),
+        ("SARIF Writer", test_sarif_writer),
+        ("Streaming Memory", test_streaming_memory),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Retime Tests
+
+Tests for shifting SCC timestamps and converting them between frame rates.
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_retime import parse_offset, retime_files, retime_text  # noqa: E402
+
+HEADER = "Scenarist_SCC V1.0\n\n"
+
+
+def _scc(*lines):
+    return HEADER + "".join(line + "\n\n" for line in lines)
+
+
+def test_offset_round_trip():
+    """Test shifting by an hour and back restores the file, leaving payloads and line endings untouched"""
+    text = "Scenarist_SCC V1.0\r\n\r\n01:00:00;00\t9420 9420 c1c2 942f 942f\r\n\r\n01:00:59;29\t942c 942c\r\n"
+    shifted, result = retime_text(text, "29.97 DF", "-01:00:00;00")
+    if shifted != "Scenarist_SCC V1.0\r\n\r\n00:00:00;00\t9420 9420 c1c2 942f 942f\r\n\r\n00:00:59;29\t942c 942c\r\n":
+        return False
+    if result.lines != 2 or result.overflows:
+        return False
+    restored, _ = retime_text(shifted, "29.97 DF", "+01:00:00;00")
+    return restored == text and parse_offset(-90, "25") == -90
+
+
+def test_ndf_to_df_is_exact():
+    """Test NDF to DF keeps every frame, relabelling across dropped minute boundaries"""
+    text = _scc("00:00:59:28\t942c 942c", "00:01:00:00\t942c 942c", "00:10:00:00\t942c 942c", "10:00:00:00\t942c 942c")
+    converted, result = retime_text(text, "29.97 NDF", 0, "29.97 DF")
+    expected = _scc("00:00:59;28\t942c 942c", "00:01:00;02\t942c 942c", "00:10:00;18\t942c 942c", "10:00:36;00\t942c 942c")
+    if converted != expected or result.frame_rate != "29.97 DF":
+        return False
+    back, _ = retime_text(converted, "29.97 DF", 0, "29.97 NDF")
+    return back == text
+
+
+def test_frame_rate_conversion_and_overflow():
+    """Test a rate change keeps real time and re-checks the retimed lines for buffer overflow"""
+    text = _scc("00:00:01:00\t9420 9420 c1c2 942f 942f", "00:00:01:06\t942c 942c", "00:01:00:00\t942c 942c")
+    converted, result = retime_text(text, "29.97 NDF", 0, "23.98")
+    if converted != _scc("00:00:01:00\t9420 9420 c1c2 942f 942f", "00:00:01:05\t942c 942c", "00:01:00:00\t942c 942c"):
+        return False
+    # Six packets at 23.98 take five frames (01:00-01:04), so the last one lands on the next line's frame
+    tight = _scc("00:00:01:00\t9420 9420 c1c2 942f 942f 8080", "00:00:01:04\t942c 942c")
+    _, tight_result = retime_text(tight, "23.98", "00:00:00:10")
+    return result.overflows == [] and tight_result.overflows == [(2, 1)]
+
+
+def test_offset_before_zero_fails():
+    """Test a shift that would make a timestamp negative is rejected with its line number"""
+    try:
+        retime_text(_scc("00:00:10:00\t942c 942c", "00:00:00:05\t942c 942c"), "25", "-00:00:01:00")
+    except ValueError as e:
+        return "Line 5" in str(e)
+    return False
+
+
+def test_retime_files_in_parallel():
+    """Test several files are retimed on a pool, with a bad file reported without stopping the rest"""
+    tmp = tempfile.mkdtemp()
+    try:
+        jobs = []
+        for i, text in enumerate([_scc("01:00:00:00\t942c 942c"), _scc(*["01:00:{0:02d}:00\t942c 942c".format(i) for i in range(3)]), _scc("01:00:00:45\t942c 942c")]):
+            src = os.path.join(tmp, "in{0}.scc".format(i))
+            with open(src, "wb") as f:
+                f.write(text.encode("utf-8"))
+            jobs.append((src, os.path.join(tmp, "out{0}.scc".format(i))))
+        results = retime_files(jobs, "-01:00:00:00", workers=2)
+        with io.open(jobs[1][1], "r", encoding="utf-8", newline="") as f:
+            second = f.read()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if [r[0] for r in results] != [src for src, _ in jobs] or [r[1].lines if r[1] else None for r in results] != [1, 3, None]:
+        return False
+    return second == _scc("00:00:00:00\t942c 942c", "00:00:01:00\t942c 942c", "00:00:02:00\t942c 942c") and "frame rate" in results[2][2]
+
+
+if __name__ == "__main__":
+    print("=== Retime Tests ===\n")
+
+    tests = [
+        ("Offset Round Trip", test_offset_round_trip),
+        ("NDF To DF Is Exact", test_ndf_to_df_is_exact),
+        ("Frame Rate Conversion And Overflow", test_frame_rate_conversion_and_overflow),
+        ("Offset Before Zero Fails", test_offset_before_zero_fails),
+        ("Retime Files In Parallel", test_retime_files_in_parallel),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
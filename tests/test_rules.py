@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Validation Rule Tests
+
+Tests for the rule registry: the built-in rules, disabling a rule, registering a custom
+rule, per-rule call/hit/time counters and the settings signature that keys the cache.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_cache import AnalysisCache  # noqa: E402
+from scc_document import analyze  # noqa: E402
+from scc_report import SarifWriter  # noqa: E402
+from scc_rules import EVENTS, INDICATOR_QC, LINE, WORD, Rule, RuleSet, default_rules  # noqa: E402
+
+# Pop-on "Hello" at 00:00:01:00, then a bad parity word, then a clear
+TEXT = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 9470 9470 c8e5 ecec ef80 942f 942f\n\n00:00:03:00\t9420 4865 942f\n\n00:00:05:29\t942c 942c\n"
+
+
+class MidRowRule(Rule):
+    """Flags every mid-row code (91xx words), as a project-specific house rule would."""
+
+    __slots__ = ()
+
+    def __init__(self):
+        Rule.__init__(self, "mid_row_code", (WORD,), "note", INDICATOR_QC, "Mid-row code")
+
+    def word(self, ctx, packet_idx, word):
+        if word.text.startswith("91"):
+            ctx.report(self, word.start, word.end, packet_idx)
+
+
+def test_default_rules():
+    """Test the built-in rules, their events and SARIF levels"""
+    rules = RuleSet(default_rules())
+    names = [rule.name for rule in rules]
+    expected = [
+        "invalid_timestamp",
+        "cc_buffer_overflow",
+        "timecode_order",
+        "duplicate_timestamp",
+        "packet_overlap",
+        "timecode_gap",
+        "parity_error",
+        "xds_checksum",
+        "xds_unterminated",
+        "never_displayed",
+    ]
+    if names != expected or len(rules) != 10 or "parity_error" not in rules:
+        return False
+    if any(event not in EVENTS for rule in rules for event in rule.events):
+        return False
+    out = io.BytesIO()
+    with SarifWriter(out, rules):
+        pass
+    levels = dict((r["id"], r["defaultConfiguration"]["level"]) for r in json.loads(out.getvalue().decode("utf-8"))["runs"][0]["tool"]["driver"]["rules"])
+    return levels["parity_error"] == "error" and levels["timecode_gap"] == "warning" and levels["never_displayed"] == "warning"
+
+
+def test_disabled_rule_finds_nothing():
+    """Test a disabled rule's errors are neither marked, indexed, summarized nor reported"""
+    rules = RuleSet(default_rules())
+    rules.enable("parity_error", False)
+    result = analyze(TEXT, rules=rules)
+    if result.errors() or result.plan.parity_ranges or "parity" in (result.error_summary or ""):
+        return False
+    if list(result.findings()) or result.line_errors(4) or result.tooltip(4, 18)[0] != 0:
+        return False
+    return rules.get("parity_error").calls == 0 and analyze(TEXT).errors()[0].error_type == "parity_error"
+
+
+def test_custom_rule():
+    """Test a registered word rule is called for every word, marked with its indicator and reported"""
+    rules = RuleSet(default_rules())
+    rule = rules.register(MidRowRule())
+    text = TEXT.replace("9470 9470 c8e5", "9470 9470 91ae 91ae c8e5")
+    result = analyze(text, rules=rules)
+    errors = [(e.line, e.column, e.error_type) for e in result.errors()]
+    if errors != [(2, 32, "mid_row_code"), (2, 37, "mid_row_code"), (4, 17, "parity_error")]:
+        return False
+    line_start = result.line_starts[2]
+    if list(result.plan.qc_ranges[:2]) != [line_start + 32, 4] or rule.calls != 16 or rule.hits != 2:
+        return False
+    findings = [(f.rule, f.message) for f in result.findings()]
+    if findings[0] != ("mid_row_code", "Mid-row code") or result.tooltip(2, 33) != (32, "Mid-row code"):
+        return False
+    return rules.signature() == "+mid_row_code"
+
+
+def test_rule_stats():
+    """Test each rule counts its calls, hits and time, and the stats can be reset and listed"""
+    rules = RuleSet(default_rules())
+    rules.enable("timecode_gap", False)
+    analyze(TEXT, rules=rules)
+    parity = rules.get("parity_error")
+    if parity.calls != 4 or parity.hits != 1 or parity.seconds <= 0 or rules.get("never_displayed").calls != 1:
+        return False
+    table = rules.format_stats().splitlines()
+    if len(table) != 11 or not table[0].startswith("rule") or not any(row.startswith("timecode_gap (off)") for row in table):
+        return False
+    rules.reset_stats()
+    return all(rule.calls == rule.hits == 0 and rule.seconds == 0 for rule in rules)
+
+
+def test_registration_and_signature():
+    """Test bad registrations are refused and changed settings give the cache a separate entry"""
+    rules = RuleSet(default_rules())
+    for bad in (Rule("parity_error", (LINE,)), Rule("spelling", ("paragraph",))):
+        try:
+            rules.register(bad)
+            return False
+        except ValueError:
+            pass
+    if rules.signature() != "":
+        return False
+    rules.enable("never_displayed", False)
+    rules.get("timecode_gap").indicator = None
+    signature = rules.signature()
+    cache_dir = tempfile.mkdtemp()
+    plain, variant = AnalysisCache(cache_dir), AnalysisCache(cache_dir, variant=signature)
+    return signature == "timecode_gap=None,-never_displayed" and plain.entry_path("a.scc") != variant.entry_path("a.scc")
+
+
+if __name__ == "__main__":
+    print("=== Validation Rule Tests ===\n")
+
+    tests = [
+        ("Default Rules", test_default_rules),
+        ("Disabled Rule Finds Nothing", test_disabled_rule_finds_nothing),
+        ("Custom Rule", test_custom_rule),
+        ("Rule Stats", test_rule_stats),
+        ("Registration And Signature", test_registration_and_signature),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Edit Scheduler Tests
+
+Tests for coalescing edits into dirty line ranges, debounced and budgeted re-analysis
+runs, cancelling stale runs and diffing the annotations to redraw.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_document import analyze  # noqa: E402
+from scc_render import annotation_changes  # noqa: E402
+from scc_schedule import DONE, IDLE, RUNNING, WAITING, DirtyLines, EditScheduler  # noqa: E402
+
+TEXT = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 9470 9470 c8e5 ecec ef80 942f 942f\n\n00:00:03:00\t9420 4865 942f\n\n00:00:05:29\t942c 942c\n"
+
+
+class FakeClock(object):
+    """Clock advanced by hand; each read can also advance it by step seconds."""
+
+    def __init__(self, step=0.0):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def _scheduler(steps, clock, budget=0.02):
+    """EditScheduler whose runs take steps steps, recording the dirty ranges and steps taken."""
+    record = {"ranges": [], "steps": 0, "closed": 0}
+
+    def start_run(dirty):
+        record["ranges"].append(dirty.ranges())
+        try:
+            for _ in range(steps):
+                record["steps"] += 1
+                yield
+        except GeneratorExit:
+            record["closed"] += 1
+            raise
+
+    return EditScheduler(start_run, quiet=0.5, budget=budget, clock=clock), record
+
+
+def test_dirty_lines_merge_and_shift():
+    """Test edits merge into line ranges and inserted or removed lines shift later ranges"""
+    dirty = DirtyLines()
+    for line in (10, 11, 12, 30, 5):
+        dirty.add(line)
+    if dirty.ranges() != [(5, 6), (10, 13), (30, 31)] or len(dirty) != 5 or 11 not in dirty or 13 in dirty or dirty.moved:
+        return False
+    dirty.add(8, 2)
+    if dirty.ranges() != [(5, 6), (8, 11), (12, 15), (32, 33)] or not dirty.moved:
+        return False
+    dirty.add(20, -5)
+    if dirty.ranges() != [(5, 6), (8, 11), (12, 15), (20, 21), (27, 28)] or dirty.lines_added != -3:
+        return False
+    # A range inside removed lines collapses onto the edited line
+    dirty.add(14, -20)
+    return dirty.ranges() == [(5, 6), (8, 11), (12, 15)]
+
+
+def test_burst_coalesced_into_one_run():
+    """Test a burst of edits waits for the quiet period and starts a single run over the merged lines"""
+    clock = FakeClock()
+    scheduler, record = _scheduler(3, clock)
+    if scheduler.tick() != IDLE:
+        return False
+    for i in range(1000):
+        clock.now += 0.001
+        scheduler.edited(100 + i % 50)
+    if scheduler.tick() != WAITING or not scheduler.busy:
+        return False
+    clock.now += 0.5
+    if scheduler.tick() != DONE or scheduler.busy or scheduler.tick() != IDLE:
+        return False
+    return scheduler.runs == 1 and record["ranges"] == [[(100, 150)]] and record["steps"] == 3
+
+
+def test_new_edit_cancels_run():
+    """Test an edit during a run closes it and the next run still covers the earlier lines"""
+    clock = FakeClock(step=0.015)
+    scheduler, record = _scheduler(10, clock)
+    scheduler.edited(4)
+    clock.now += 1
+    if scheduler.tick() != RUNNING:
+        return False
+    scheduler.edited(9)
+    if scheduler.cancelled != 1 or record["closed"] != 1 or scheduler.tick() != WAITING:
+        return False
+    clock.now += 1
+    while scheduler.tick() == RUNNING:
+        pass
+    return scheduler.runs == 2 and record["ranges"] == [[(4, 5)], [(4, 5), (9, 10)]] and not scheduler.busy
+
+
+def test_budget_caps_work_per_tick():
+    """Test each tick stops taking steps once its time budget is spent, but always takes one"""
+    clock = FakeClock(step=0.01)
+    scheduler, record = _scheduler(12, clock, budget=0.035)
+    scheduler.edited(0)
+    clock.now += 1
+    if scheduler.tick() != RUNNING or record["steps"] != 4:
+        return False
+    scheduler.budget = 0
+    if scheduler.tick() != RUNNING or record["steps"] != 5:
+        return False
+    scheduler.budget = 1
+    return scheduler.tick() == DONE and record["steps"] == 12
+
+
+def test_annotation_changes():
+    """Test only changed annotations are redrawn and removed ones (the fixed error's summary) are cleared"""
+    before = analyze(TEXT).plan
+    after = analyze(TEXT.replace("4865", "c8e5")).plan
+    full = annotation_changes(after)
+    if [change[0] for change in full] != sorted(line for line, _, _ in after.annotations):
+        return False
+    changes = annotation_changes(after, before)
+    if [(line, text is None) for line, text, _ in changes] != [(0, True), (4, False)]:
+        return False
+    return annotation_changes(before, before) == [] and annotation_changes(before, after)[0][0] == 0
+
+
+if __name__ == "__main__":
+    print("=== Edit Scheduler Tests ===\n")
+
+    tests = [
+        ("Dirty Lines Merge And Shift", test_dirty_lines_merge_and_shift),
+        ("Burst Coalesced Into One Run", test_burst_coalesced_into_one_run),
+        ("New Edit Cancels Run", test_new_edit_cancels_run),
+        ("Budget Caps Work Per Tick", test_budget_caps_work_per_tick),
+        ("Annotation Changes", test_annotation_changes),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Lint Server Tests
+
+Tests for the local lint server: the JSON line protocol, shared and cached analyses,
+requests in flight on one connection, bad requests and the blocking client helper.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_server import LintServer, analysis_record, request  # noqa: E402
+
+# Pop-on "Hello" at 00:00:01:00, then a bad parity word, then a clear
+TEXT = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 9470 9470 c8e5 ecec ef80 942f 942f\n\n00:00:03:00\t9420 4865 942f\n\n00:00:05:29\t942c 942c\n"
+
+
+def _run(server, client):
+    """Run client(port) against server listening on a free localhost port, then shut down."""
+
+    async def main():
+        listener = await server.start(port=0)
+        try:
+            return await client(listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            await listener.wait_closed()
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        server.close()
+        loop.close()
+
+
+async def _exchange(port, *messages):
+    """Send raw request lines on one connection and return the decoded responses."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for message in messages:
+        writer.write(message if isinstance(message, bytes) else json.dumps(message).encode("utf-8") + b"\n")
+    writer.write_eof()
+    responses = [json.loads(line.decode("utf-8")) for line in (await reader.read()).splitlines()]
+    writer.close()
+    return responses
+
+
+def test_analysis_record():
+    """Test the result carries the frame rate, errors, timing and decoded captions"""
+    record = analysis_record(TEXT.encode("utf-8"))
+    json.dumps(record)
+    if record["frame_rate"] != "29.97 NDF" or record["status"] != "fail" or record["counts"] != {"parity_error": 1}:
+        return False
+    if record["timing"] != [[3, "00:00:01:05", "00:00:03:02"]]:
+        return False
+    return record["captions"] == [{"lines": [3], "start": "00:00:01:05", "end": "00:00:03:02", "text": "Hello"}]
+
+
+def test_concurrent_requests_share_analysis():
+    """Test concurrent requests for the same content run one analysis and later ones hit the cache"""
+    server = LintServer(workers=0)
+
+    async def client(port):
+        first = await asyncio.gather(*[_exchange(port, {"id": n, "text": TEXT}) for n in range(5)])
+        again = await _exchange(port, {"id": 9, "text": TEXT}, {"id": 10, "op": "stats"})
+        return [r[0] for r in first], again
+
+    first, (again, stats) = _run(server, client)
+    if [r["id"] for r in first] != list(range(5)) or not all(r["ok"] and r["result"] == first[0]["result"] for r in first):
+        return False
+    if not again["cached"] or again["digest"] != first[0]["digest"]:
+        return False
+    return stats["result"]["analyses"] == 1 and stats["result"]["cache_hits"] == 5 and stats["result"]["requests"] == 7
+
+
+def test_pipelined_requests_and_paths():
+    """Test several requests on one connection are each answered, by id, and paths are read by the server"""
+    server = LintServer(workers=1)
+    fd, path = tempfile.mkstemp(suffix=".scc")
+    with os.fdopen(fd, "wb") as f:
+        f.write(TEXT.encode("utf-8"))
+    clean = TEXT.replace("4865", "c8e5")
+
+    async def client(port):
+        return await _exchange(port, {"id": "a", "path": path}, {"id": "b", "text": clean}, {"id": "c", "text": TEXT})
+
+    try:
+        responses = dict((r["id"], r) for r in _run(server, client))
+    finally:
+        os.remove(path)
+    if sorted(responses) != ["a", "b", "c"] or not all(r["ok"] for r in responses.values()):
+        return False
+    if responses["a"]["digest"] != responses["c"]["digest"] or responses["b"]["result"]["status"] != "pass":
+        return False
+    return server.analyses == 2 and responses["a"]["result"]["counts"] == {"parity_error": 1}
+
+
+def test_bad_requests():
+    """Test malformed lines, unknown ops and unreadable paths get error responses and the connection stays usable"""
+    server = LintServer(workers=0)
+
+    async def client(port):
+        return await _exchange(port, b"{not json\n", b"[1, 2]\n", {"id": 1, "op": "lint"}, {"id": 2, "path": "/no/such/file.scc"}, {"id": 3}, {"id": 4, "text": TEXT})
+
+    responses = _run(server, client)
+    by_id = dict((r["id"], r) for r in responses if r["id"] is not None)
+    if len(responses) != 6 or [r["ok"] for r in responses if r["id"] is None] != [False, False]:
+        return False
+    if "Unknown op" not in by_id[1]["error"] or by_id[2]["ok"] or by_id[3]["ok"]:
+        return False
+    return by_id[4]["ok"] and server.failures == 5
+
+
+def test_cache_eviction_and_blocking_client():
+    """Test the least recently used result is dropped at the cache limit, through the blocking request() helper"""
+    server = LintServer(workers=0, cache_entries=2)
+    texts = [TEXT, TEXT.replace("4865", "c8e5"), TEXT.replace("00:00:05:29", "00:00:06:29")]
+
+    async def client(port):
+        loop = asyncio.get_event_loop()
+        results = []
+        for text in texts + [TEXT]:
+            response = await loop.run_in_executor(None, request, {"text": text}, ("127.0.0.1", port), 10)
+            results.append(response["cached"])
+        return results
+
+    cached = _run(server, client)
+    return cached == [False, False, False, False] and len(server.cache) == 2 and server.analyses == 4
+
+
+if __name__ == "__main__":
+    print("=== Lint Server Tests ===\n")
+
+    tests = [
+        ("Analysis Record", test_analysis_record),
+        ("Concurrent Requests Share Analysis", test_concurrent_requests_share_analysis),
+        ("Pipelined Requests And Paths", test_pipelined_requests_and_paths),
+        ("Bad Requests", test_bad_requests),
+        ("Cache Eviction And Blocking Client", test_cache_eviction_and_blocking_client),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
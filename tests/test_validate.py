@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Fail-Fast Validation Tests
+
+Tests for the CI validation mode: agreement with the full report, stopping early,
+header and line structure checks, selecting checks and the command-line exit status.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_report import iter_text_findings  # noqa: E402
+from scc_validate import LINE_STRUCTURE, SCC_HEADER, iter_violations, main, validate  # noqa: E402
+
+HEADER = "Scenarist_SCC V1.0\n\n"
+
+
+def _scc(*lines):
+    return HEADER + "".join(line + "\n\n" for line in lines)
+
+
+ERRORS = _scc(
+    "00:00:01:00\t9420 9420 9470 9470 4865 c8e5 942f 942f",  # parity error on the 5th packet
+    "00:00:01:06\t942c 942c",  # the previous line's last 2 packets play at or after this frame
+    "00:00:04:00\t9420 9420 9470 9470 c8e5 ecec ef80",
+    "24:00:05:29\t942c 942c",  # invalid timestamp (hours)
+    "00:00:06:00\t9420 9420 4865 4865",  # a parity error in a doubled word is still two words
+)
+
+
+class _Console(object):
+    """Text stream that keeps what is written."""
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, text):
+        self.written.append(text)
+
+
+class _Lines(object):
+    """Iterable of lines that counts how many were read."""
+
+    def __init__(self, text):
+        self.lines = text.splitlines(True)
+        self.read = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+
+def test_matches_full_report():
+    """Test the parity, timestamp and overflow violations are the full report's findings"""
+    _, findings = iter_text_findings(ERRORS)
+    expected = sorted(f for f in findings if f.rule in ("parity_error", "invalid_timestamp", "cc_buffer_overflow"))
+    found = list(iter_violations(ERRORS.splitlines(True)))
+    if sorted(found) != expected or len(found) != 5:
+        return False
+    overflow = [f for f in found if f.rule == "cc_buffer_overflow"][0]
+    return (overflow.line, overflow.column, overflow.packets, overflow.message) == (3, 1, 2, "CC buffer overflow: 2 packets still playing at 00:00:01:06")
+
+
+def test_stops_at_first_violations():
+    """Test reading stops at the Nth violation instead of going through the whole file"""
+    text = ERRORS + "".join("00:00:{0:02d}:00\t942c 942c\n\n".format(s) for s in range(10, 60)) * 100
+    lines = _Lines(text)
+    first = validate(lines, checks=("parity_error",))
+    if [(f.rule, f.line, f.column, f.timecode) for f in first] != [("parity_error", 3, 33, "00:00:01:00")] or lines.read != 3:
+        return False
+    lines = _Lines(text)
+    found = validate(lines, max_violations=3)
+    # The overflow check reads ahead until it has the first 50 timestamps to detect the frame rate
+    if [f.rule for f in found] != ["parity_error", "cc_buffer_overflow", "invalid_timestamp"] or lines.read > 120:
+        return False
+    return len(validate(text.splitlines(True), max_violations=0)) == 5
+
+
+def test_header_and_structure():
+    """Test a missing header and malformed lines are located precisely"""
+    text = "Scenarist_SCC V2.0\n\n00:00:01:00 9420\n00:00:02:00\t9420  942c\n00:00:03:00\t9420 94zz\n00:00:04:00\t\nhello 9420\n00:00:05:00\t9420\t942c\n"
+    found = [(f.rule, f.line, f.column, f.end_column) for f in iter_violations(text.splitlines(True), checks=(SCC_HEADER, LINE_STRUCTURE))]
+    expected = [
+        (SCC_HEADER, 1, 1, 19),
+        (LINE_STRUCTURE, 3, 12, 13),  # space instead of a tab
+        (LINE_STRUCTURE, 4, 17, 19),  # two spaces
+        (LINE_STRUCTURE, 5, 18, 22),  # not a hex word
+        (LINE_STRUCTURE, 6, 12, 13),  # no words
+        (LINE_STRUCTURE, 7, 1, 6),  # no timestamp
+        (LINE_STRUCTURE, 8, 17, 18),  # tab between words
+    ]
+    if found != expected:
+        return False
+    # A file that starts with a caption line is missing its header; the line itself is still checked
+    found = list(iter_violations(["00:00:01:00\t9420 4865\n"]))
+    return [(f.rule, f.line) for f in found] == [(SCC_HEADER, 1), ("parity_error", 1)] and validate([HEADER]) == []
+
+
+def test_selected_checks():
+    """Test only the selected checks report, and the overflow check alone reads ahead for the frame rate"""
+    only_timestamps = list(iter_violations(ERRORS.splitlines(True), checks=("invalid_timestamp",)))
+    if [(f.rule, f.line) for f in only_timestamps] != [("invalid_timestamp", 9)]:
+        return False
+    found = list(iter_violations(ERRORS.splitlines(True), checks=("cc_buffer_overflow",), frame_rate="29.97 NDF"))
+    if [(f.rule, f.line) for f in found] != [("cc_buffer_overflow", 3)]:
+        return False
+    # Parity timecodes are the packet's own when the frame rate is known, else the line's timestamp
+    with_rate = validate(ERRORS.splitlines(True), checks=("parity_error",), frame_rate="29.97 NDF")
+    return with_rate[0].timecode == "00:00:01:04"
+
+
+def test_command_line():
+    """Test the exit status, the text and JSON Lines output, and stopping at the first failing file"""
+    tmp = tempfile.mkdtemp()
+    good, bad = os.path.join(tmp, "good.scc"), os.path.join(tmp, "bad.scc")
+    for path, text in ((good, _scc("00:00:01:00\t942c 942c")), (bad, ERRORS)):
+        with open(path, "wb") as f:
+            f.write(text.encode("utf-8"))
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = out, err = _Console(), _Console()
+    try:
+        statuses = [main([good]), main([bad, good]), main([os.path.join(tmp, "missing.scc")])]
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+    lines = "".join(out.written).splitlines()
+    if statuses != [0, 1, 2] or "missing.scc" not in "".join(err.written) or lines != ["{0}:3:33: parity_error: Invalid SCC code 4865 (parity check failed)".format(bad)]:
+        return False
+
+    class _Stdout(object):
+        buffer = io.BytesIO()
+
+    sys.stdout = _Stdout
+    try:
+        status = main(["--format", "jsonl", "--max", "0", "--keep-going", bad, good])
+    finally:
+        sys.stdout = stdout
+    records = [json.loads(line) for line in _Stdout.buffer.getvalue().decode("utf-8").splitlines()]
+    return status == 1 and len(records) == 5 and all(r["file"] == bad for r in records)
+
+
+if __name__ == "__main__":
+    print("=== Fail-Fast Validation Tests ===\n")
+
+    tests = [
+        ("Matches Full Report", test_matches_full_report),
+        ("Stops At First Violations", test_stops_at_first_violations),
+        ("Header And Structure", test_header_and_structure),
+        ("Selected Checks", test_selected_checks),
+        ("Command Line", test_command_line),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Watch Folder Tests
+
+Tests for the headless watch-folder QC service: settling, bounded submission,
+reports, skipping unchanged files after a restart, and failed or unsettled files.
+"""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_watch import FolderWatcher, build_report  # noqa: E402
+
+GOOD = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 9470 9470 c8e5 ecec ef80 942f 942f\n\n00:00:03:00\t942c 942c\n"
+BAD_PARITY = "Scenarist_SCC V1.0\n\n00:00:01:00\t9420 9420 9470 9470 4865 942f 942f\n\n00:00:03:00\t942c 942c\n"
+
+
+class _Clock(object):
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _write(folder, name, text):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(text.encode("utf-8"))
+    return path
+
+
+def _run_once(inbox, reports, workers=2):
+    results = []
+    watcher = FolderWatcher([inbox], reports, workers=workers, settle=0, on_result=lambda *r: results.append(r))
+    watcher.run(once=True)
+    return sorted((os.path.basename(path), status) for path, status, _ in results)
+
+
+def test_build_report():
+    """Test a report carries the verdict, per-type counts with line numbers and the QC summary"""
+    good = build_report(GOOD)
+    bad = build_report(BAD_PARITY)
+    if good["status"] != "pass" or good["errors"] or not good["qc"]["summary"].startswith("QC: 1 caption"):
+        return False
+    return bad["status"] == "fail" and bad["counts"] == {"parity_error": 1} and bad["errors"][0]["line"] == 3
+
+
+def test_settle_before_analysis():
+    """Test a file is only queued once its size and mtime have been stable for the settle period"""
+    tmp = tempfile.mkdtemp()
+    try:
+        path = _write(tmp, "growing.scc", GOOD[:20])
+        clock = _Clock(os.stat(path).st_mtime)
+        watcher = FolderWatcher([tmp], os.path.join(tmp, "reports"), workers=1, settle=5, clock=clock)
+        first = watcher.scan()
+        clock.now += 3
+        _write(tmp, "growing.scc", GOOD)  # still being written
+        os.utime(path, (clock.now, clock.now))
+        second = watcher.scan()
+        clock.now += 4
+        third = watcher.scan()
+        clock.now += 2
+        fourth = watcher.scan()
+        return (first, second, third, fourth) == (0, 0, 0, 1)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_bounded_in_flight():
+    """Test a burst of files is queued as paths with only a few jobs submitted per worker"""
+    tmp = tempfile.mkdtemp()
+    try:
+        for i in range(40):
+            _write(tmp, "f{0:02d}.scc".format(i), GOOD)
+        watcher = FolderWatcher([tmp], os.path.join(tmp, "reports"), workers=2, settle=0)
+        try:
+            queued = watcher.scan()
+            watcher._submit()
+            if queued != 40 or len(watcher._in_flight) != 4 or len(watcher._queue) != 36:
+                return False
+            watcher.drain()
+        finally:
+            watcher.close()
+        return len(os.listdir(os.path.join(tmp, "reports"))) == 40
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_restart_skips_unchanged_files():
+    """Test reports are written, a restart skips unchanged files, and touched or edited files are handled"""
+    tmp = tempfile.mkdtemp()
+    try:
+        inbox = os.path.join(tmp, "inbox")
+        reports = os.path.join(tmp, "reports")
+        os.makedirs(inbox)
+        _write(inbox, "a.scc", GOOD)
+        bad = _write(inbox, "b.scc", BAD_PARITY)
+        touched = _write(inbox, "c.scc", GOOD)
+        if _run_once(inbox, reports) != [("a.scc", "pass"), ("b.scc", "fail"), ("c.scc", "pass")]:
+            return False
+        with io.open(os.path.join(reports, "b.scc.json"), "r", encoding="utf-8") as f:
+            report = json.load(f)
+        if report["counts"] != {"parity_error": 1} or report["source"]["path"] != bad:
+            return False
+        if _run_once(inbox, reports) != []:
+            return False
+        st = os.stat(touched)
+        os.utime(touched, (st.st_atime, st.st_mtime + 10))
+        _write(inbox, "b.scc", GOOD)
+        os.utime(bad, (st.st_atime, st.st_mtime + 20))
+        return _run_once(inbox, reports) == [("b.scc", "pass"), ("c.scc", "unchanged")] and _run_once(inbox, reports) == []
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_errors_and_unsettled_files():
+    """Test a file that fails is retried only once it changes, and a one-off run waits for files still being written"""
+    tmp = tempfile.mkdtemp()
+    try:
+        inbox = os.path.join(tmp, "inbox")
+        reports = os.path.join(tmp, "reports")
+        os.makedirs(inbox)
+        path = _write(inbox, "a.scc", GOOD)
+        results = []
+        watcher = FolderWatcher([inbox], reports, workers=1, settle=0, on_result=lambda *r: results.append(r))
+        try:
+            os.makedirs(watcher.report_path(path))  # the report cannot be written
+            watcher.scan()
+            watcher._submit()
+            watcher.drain()
+            if [status for _, status, _ in results] != ["error"] or watcher.scan() != 0:
+                return False
+            st = os.stat(path)
+            os.utime(path, (st.st_atime, st.st_mtime + 10))
+            if watcher.scan() != 1:
+                return False
+        finally:
+            watcher.close()
+        os.rmdir(os.path.join(reports, "a.scc.json"))
+        watcher = FolderWatcher([inbox], reports, workers=1, settle=0.5, on_result=lambda *r: results.append(r))
+        _write(inbox, "b.scc", BAD_PARITY)  # just written: not settled yet
+        watcher.run(once=True)
+        return sorted((os.path.basename(p), status) for p, status, _ in results[1:]) == [("a.scc", "pass"), ("b.scc", "fail")]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print("=== Watch Folder Tests ===\n")
+
+    tests = [
+        ("Build Report", test_build_report),
+        ("Settle Before Analysis", test_settle_before_analysis),
+        ("Bounded In-flight Jobs", test_bounded_in_flight),
+        ("Restart Skips Unchanged Files", test_restart_skips_unchanged_files),
+        ("Errors And Unsettled Files", test_errors_and_unsettled_files),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)
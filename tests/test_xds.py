@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+XDS Tests
+
+Tests for Extended Data Services packet assembly, checksums and their annotations
+and error markers in the render pass.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from scc_analysis import TimestampIndex, build_time_map_lines  # noqa: E402
+from scc_errors import format_error_summary  # noqa: E402
+from scc_render import build_render_plan, line_start_positions  # noqa: E402
+from scc_xds import XdsDecoder, describe_packet  # noqa: E402
+
+
+def _parity(byte):
+    return byte | 0x80 if bin(byte).count("1") % 2 == 0 else byte
+
+
+def _word(b1, b2):
+    return "{0:02x}{1:02x}".format(_parity(b1), _parity(b2))
+
+
+def _content_words(data):
+    data = bytearray(data)
+    if len(data) % 2:
+        data.append(0)
+    return [_word(data[i], data[i + 1]) for i in range(0, len(data), 2)]
+
+
+def _checksum(start, xds_type, data):
+    return -(start + xds_type + sum(bytearray(data)) + 0x0F) & 0x7F
+
+
+def _packet(start, xds_type, data, checksum=None):
+    """Words of a complete packet: start code, informational characters, end code."""
+    if checksum is None:
+        checksum = _checksum(start, xds_type, data)
+    return [_word(start, xds_type)] + _content_words(data) + [_word(0x0F, checksum)]
+
+
+def _decode(words):
+    decoder = XdsDecoder()
+    consumed = [decoder.feed(int(w, 16), i * 5) for i, w in enumerate(words)]
+    decoder.finish()
+    packets, errors = decoder.drain()
+    return consumed, packets, errors
+
+
+def _plan(text):
+    lines = text.splitlines(True)
+    time_map, timestamp_map, line_texts = build_time_map_lines(lines, "29.97 NDF")
+    return build_render_plan(time_map, TimestampIndex(timestamp_map, "29.97 NDF"), line_texts, line_start_positions(lines))
+
+
+def test_program_name_packet():
+    """Test a packet assembles, passes its checksum and decodes its text"""
+    consumed, packets, errors = _decode(_packet(0x01, 0x03, b"Big Buck Bunny"))
+    if not all(consumed) or errors or len(packets) != 1:
+        return False
+    return packets[0].is_valid and describe_packet(packets[0]) == 'XDS Current Program Name: "Big Buck Bunny"'
+
+
+def test_interrupted_packet_across_lines():
+    """Test caption codes suspend a packet, a continue code resumes it on a later line, and XDS words are not caption text"""
+    words = _packet(0x05, 0x01, b"PBS")
+    first = " ".join(words[:2])
+    second = " ".join([_word(0x06, 0x01)] + words[2:])
+    text = "Scenarist_SCC V1.0\n\n00:00:01:00\t{0} 1520 1520 1570 1570 c1c2 152f 152f\n\n00:00:02:00\t152c 152c {1}\n".format(first, second)
+    plan = _plan(text)
+    if len(plan.error_index):
+        return False
+    notes = dict((line, text_bytes.decode("utf-8")) for line, text_bytes, _ in plan.annotations)
+    return "AB" in notes[2] and "XDS" not in notes[2] and "P" not in notes[2] and notes[4] == 'XDS Channel Network Name: "PBS"'
+
+
+def test_checksum_and_unterminated_errors():
+    """Test bad checksums and packets without an end code are reported at their words"""
+    bad = _packet(0x01, 0x03, b"Title", checksum=0x11)
+    unterminated = [_word(0x07, 0x01), _word(0x41, 0x42)]
+    text = "Scenarist_SCC V1.0\n\n00:00:01:00\t{0}\n\n00:00:03:00\t{1}\n".format(" ".join(bad), " ".join(unterminated))
+    plan = _plan(text)
+    bad_pos = text.index(bad[-1])
+    start_pos = text.index(unterminated[0])
+    if plan.error_index.types_at(bad_pos) != ["xds_checksum"] or plan.error_index.types_at(start_pos) != ["xds_unterminated"]:
+        return False
+    if list(plan.error_ranges) != [bad_pos, 4, start_pos, 4]:
+        return False
+    summary = format_error_summary(plan.error_index)
+    return "1 XDS checksum error" in summary and "1 unterminated XDS packet" in summary and "(bad checksum)" in plan.annotations[0][1].decode("utf-8")
+
+
+def test_restarted_packet_is_unterminated():
+    """Test a second start of the same packet closes the first as unterminated, and overlong packets are cut off"""
+    words = [_word(0x01, 0x03), _word(0x41, 0x42)] + _packet(0x01, 0x03, b"Ok")
+    _, packets, errors = _decode(words)
+    if [e[1] for e in errors] != ["xds_unterminated"] or errors[0][0] != 0 or len(packets) != 1:
+        return False
+    _, packets, errors = _decode(_packet(0x01, 0x03, b"x" * 40))
+    return not packets and [e[1] for e in errors] == ["xds_unterminated"]
+
+
+def test_decoded_fields():
+    """Test content advisory, time of day and program length decoding"""
+    rating = _packet(0x01, 0x05, bytearray([0x48, 0x74]))  # US TV system, TV-PG with S and V flags
+    rating_d = _packet(0x01, 0x05, bytearray([0x68, 0x55]))  # TV-14 with D (first byte) and S
+    mpa = _packet(0x01, 0x05, bytearray([0x43, 0x40]))
+    time_of_day = _packet(0x07, 0x01, bytearray([0x40 | 30, 0x40 | 14, 0x40 | 9, 0x40 | 7, 0x40 | 1, 0x40 | 34]))
+    length = _packet(0x01, 0x02, bytearray([0x40 | 30, 0x40 | 1, 0x40 | 5, 0x40]))
+    texts = [describe_packet(_decode(words)[1][0]) for words in (rating, rating_d, mpa, time_of_day, length)]
+    return texts == [
+        "XDS Current Content Advisory: TV-PG-SV",
+        "XDS Current Content Advisory: TV-14-DS",
+        "XDS Current Content Advisory: MPA PG-13",
+        "XDS Miscellaneous Time of Day: 2024-07-09 14:30 UTC",
+        "XDS Current Length/Time-in-Show: 1h30m (elapsed 0h05m)",
+    ]
+
+
+if __name__ == "__main__":
+    print("=== XDS Tests ===\n")
+
+    tests = [
+        ("Program Name Packet", test_program_name_packet),
+        ("Interrupted Packet Across Lines", test_interrupted_packet_across_lines),
+        ("Checksum And Unterminated Errors", test_checksum_and_unterminated_errors),
+        ("Restarted Packet Is Unterminated", test_restarted_packet_is_unterminated),
+        ("Decoded Fields", test_decoded_fields),
+    ]
+
+    passed = failed = 0
+    for name, test_func in tests:
+        try:
+            if test_func():
+                print("[PASS] {}".format(name))
+                passed += 1
+            else:
+                print("[FAIL] {}".format(name))
+                failed += 1
+        except Exception as e:
+            print("[FAIL] {} - {}".format(name, str(e)))
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print("Results: {} passed, {} failed".format(passed, failed))
+    print("=" * 50)
+
+    if failed == 0:
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ {} test(s) failed!".format(failed))
+        sys.exit(1)